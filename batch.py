@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import Dict, List, Optional, Set, Tuple
+
+from dependency_graph import DependencyGraph
+from npm_parser import node_key, split_node_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchRoot:
+    """
+    Корень пакетного анализа: пакет реестра со спецификатором или манифест package.json.
+    У манифеста зависимости уже известны (dependencies), у пакета реестра - None.
+    """
+    label: str
+    package: str
+    spec: str = "latest"
+    dependencies: Optional[Dict[str, str]] = None
+    node: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    roots: List[BatchRoot]
+    graphs: Dict[str, DependencyGraph] = field(default_factory=dict)
+    visited: Dict[str, Set[str]] = field(default_factory=dict)
+    expanded: int = 0
+    packages: int = 0
+
+
+def _read_manifest(path: str) -> BatchRoot:
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Failed to read manifest {path}: {e}") from e
+    name = manifest.get("name") or os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return BatchRoot(path, name, manifest.get("version") or "0.0.0", manifest)
+
+
+def read_roots(paths: List[str]) -> List[BatchRoot]:
+    """
+    Корни из файлов: *.json - манифест package.json, иначе список по строке на корень
+    ("name", "name@range", "@scope/name@range"; пустые строки и # пропускаются).
+    """
+    roots = []
+    for path in paths:
+        if path.endswith(".json"):
+            roots.append(_read_manifest(path))
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError as e:
+            raise RuntimeError(f"Failed to read root list {path}: {e}") from e
+        for line in lines:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                package, spec = split_node_key(line)
+                roots.append(BatchRoot(line, package, spec or "latest"))
+    return roots
+
+
+def subgraph(source: DependencyGraph, root: str, max_depth: int) -> Tuple[DependencyGraph, Set[str]]:
+    """
+    Граф одного корня из общего: рёбра узлов на глубине меньше max_depth от этого корня.
+    Совпадает с тем, что построил бы отдельный bfs_concurrent от этого корня.
+    """
+    graph = source.get_all_dependencies()
+    result = DependencyGraph(client=source.client, memo=source.memo, dependency_filter=source.filter)
+    empty: Set[str] = set()
+    visited = {root}
+    queue = deque([(root, 0)])
+    while queue:
+        node, depth = queue.popleft()
+        children = graph.get(node, empty)
+        if node in graph:
+            result.graph[node] = set(children)
+        for child in children:
+            if depth + 1 < max_depth and child not in visited:
+                visited.add(child)
+                queue.append((child, depth + 1))
+    return result, visited
+
+
+def crawl_batch(graph: DependencyGraph, roots: List[BatchRoot], max_depth: int, repository_url: str,
+                concurrency: int = 8) -> BatchResult:
+    """
+    Обходит все корни одной общей очередью: фронтиры корней сливаются по уровням, поэтому каждый
+    name@version загружается и раскрывается один раз, на минимальной глубине среди всех корней.
+    """
+    result = BatchResult(roots)
+    if max_depth <= 0:
+        return result
+
+    visited = expand_roots(graph, roots, max_depth, repository_url, concurrency)
+    result.expanded = len(visited)
+    result.packages = len(_package_names(graph.get_all_dependencies(), _manifest_names(roots)))
+
+    for root in roots:
+        if root.node is not None and root.label not in result.graphs:
+            result.graphs[root.label], result.visited[root.label] = subgraph(graph, root.node, max_depth)
+    return result
+
+
+def expand_roots(graph: DependencyGraph, roots: List[BatchRoot], max_depth: int, repository_url: str,
+                 concurrency: int = 8) -> Set[str]:
+    """
+    Разрешает корни параллельно и раскрывает их одной общей очередью; root.node заполняется
+    узлом корня (None, если корень не разрешился). Возвращает раскрытые узлы.
+    """
+    specs: Dict[str, Set[str]] = {}
+    for root in roots:
+        if root.dependencies is None:
+            specs.setdefault(root.package, set()).add(root.spec)
+    packages = sorted(specs)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        resolved = dict(zip(packages, pool.map(
+            _resolve_root, repeat(graph), packages, (specs[p] for p in packages), repeat(repository_url)
+        )))
+
+    visited: Set[str] = set()
+    frontier = []
+    for root in roots:
+        if root.dependencies is None:
+            root.node, dependencies = resolved[root.package][root.spec]
+        else:
+            root.node = node_key(root.package, root.spec)
+            dependencies = graph.filter.select(root.dependencies, root=True)
+        if dependencies is None:
+            logger.warning("Skipping root %s: cannot resolve %s@%s", root.label, root.package, root.spec)
+            root.node = None
+            continue
+        graph.add_dependency(root.node, "")
+        if root.node not in visited:
+            visited.add(root.node)
+            frontier.append((root.node, graph.filter.prune(dependencies)))
+
+    graph.expand_levels(frontier, visited, max_depth, repository_url, concurrency)
+    return visited
+
+
+def _resolve_root(graph: DependencyGraph, package: str, specs: Set[str],
+                  repository_url: str) -> Dict[str, Tuple[str, Optional[Dict[str, str]]]]:
+    try:
+        return graph._resolve_many(package, sorted(specs), repository_url, root=True)
+    except Exception as e:
+        logger.warning("Error processing %s: %s", package, e)
+        return {spec: (f"{package}@{spec}", None) for spec in specs}
+
+
+def _manifest_names(roots: List[BatchRoot]) -> Set[str]:
+    return {root.package for root in roots if root.dependencies is not None}
+
+
+def _package_names(graph: Dict[str, Set[str]], local: Set[str]) -> Set[str]:
+    # Листья на границе глубины тоже загружались: без packument их версия неизвестна.
+    # Манифесты читаются с диска и в счёт загрузок не идут
+    names = set()
+    for node, deps in graph.items():
+        names.add(split_node_key(node)[0])
+        names.update(split_node_key(dep)[0] for dep in deps)
+    return names - local
+
+
+def batch_stats(result: BatchResult) -> Dict[str, int]:
+    """
+    Общая работа против наивной суммы отдельных обходов. Наивная сумма загрузок - число разных
+    пакетов в графе каждого корня: отдельный обход загрузил бы каждый из них хотя бы раз.
+    """
+    naive_expanded = sum(len(visited) for visited in result.visited.values())
+    local = _manifest_names(result.roots)
+    naive_fetches = sum(len(_package_names(graph.graph, local)) for graph in result.graphs.values())
+    return {
+        "roots": len(result.roots),
+        "analyzed_roots": len(result.graphs),
+        "expanded": result.expanded,
+        "naive_expanded": naive_expanded,
+        "packages": result.packages,
+        "naive_fetches": naive_fetches,
+    }
@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import BatchRoot, batch_stats, crawl_batch
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, synthetic_packuments
+from registry_client import RegistryClient
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="One shared batch crawl vs a separate crawl per root")
+    parser.add_argument("--packages", type=int, default=1000)
+    parser.add_argument("--roots", type=int, default=50)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.005, help="Per-request latency in seconds")
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    packuments = synthetic_packuments(args.packages, args.fanout, versions=3)
+    names = [f"pkg{i}" for i in range(args.roots)]
+    with MockRegistry(packuments, latency=args.latency) as registry:
+        started = time.perf_counter()
+        graphs = {}
+        for name in names:
+            graph = DependencyGraph(client=RegistryClient(pool_size=args.concurrency))
+            graph.bfs_concurrent(name, args.max_depth, registry.url, args.concurrency)
+            graphs[name] = graph.graph
+            graph.client.close()
+        separate_time = time.perf_counter() - started
+        separate_requests = registry.request_count
+        print(f"{'separate crawls':<16} {separate_time:8.3f}s  requests={separate_requests}")
+
+        started = time.perf_counter()
+        graph = DependencyGraph(client=RegistryClient(pool_size=args.concurrency))
+        result = crawl_batch(graph, [BatchRoot(name, name) for name in names], args.max_depth, registry.url,
+                             args.concurrency)
+        batch_time = time.perf_counter() - started
+        graph.client.close()
+        print(f"{'shared batch':<16} {batch_time:8.3f}s  requests={registry.request_count - separate_requests}")
+        print(f"stats: {batch_stats(result)}")
+
+        mismatched = [name for name in names if result.graphs[name].graph != graphs[name]]
+        if mismatched:
+            print(f"  note: per-root graphs differ from separate crawls for {len(mismatched)} root(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
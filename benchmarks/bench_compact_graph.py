@@ -0,0 +1,78 @@
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compact_graph import CompactDependencyGraph
+from dependency_graph import DependencyGraph
+
+
+def synthetic_edges(edge_count: int, seed: int = 0):
+    """
+    Рёбра между ~edge_count/5 пакетами с реалистичными именами; рёбра идут к большим номерам (DAG).
+    """
+    rng = random.Random(seed)
+    nodes = max(2, edge_count // 5)
+    names = [f"@scope{i % 97}/package-name-{i}" for i in range(nodes)]
+    edges = []
+    for _ in range(edge_count):
+        a = rng.randrange(nodes - 1)
+        b = rng.randrange(a + 1, min(nodes, a + 200))
+        edges.append((names[a], names[b]))
+    return edges
+
+
+def measure(label: str, build):
+    # Время и память меряются в разных прогонах: tracemalloc сильно замедляет построение
+    gc.collect()
+    tracemalloc.start()
+    graph = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del graph
+
+    gc.collect()
+    started = time.perf_counter()
+    graph = build()
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    graph.has_cycles()
+    cycles_time = time.perf_counter() - started
+    started = time.perf_counter()
+    order = graph.get_load_order()
+    order_time = time.perf_counter() - started
+
+    print(f"  {label:<8} retained={current / 2**20:8.1f} MiB  peak={peak / 2**20:8.1f} MiB  "
+          f"build={build_time:6.2f}s  has_cycles={cycles_time:6.2f}s  load_order={order_time:6.2f}s  nodes={len(order)}")
+    return graph
+
+
+def build_dict(edges):
+    graph = DependencyGraph(client=object())
+    for package, dependency in edges:
+        graph.add_dependency(package, dependency)
+    return graph
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Memory/throughput of dict-of-sets vs CSR graph")
+    parser.add_argument("--edges", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    for edge_count in args.edges:
+        edges = synthetic_edges(edge_count)
+        print(f"{edge_count} edges:")
+        measure("dict", lambda: build_dict(edges))
+        measure("compact", lambda: CompactDependencyGraph.from_edges(edges))
+        del edges
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
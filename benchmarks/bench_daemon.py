@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daemon import DaemonClient, DepvisDaemon, GraphRequest
+from mock_registry import MockRegistry, synthetic_packuments
+
+
+def ask(client: DaemonClient, request: GraphRequest) -> float:
+    started = time.perf_counter()
+    client.graph(request)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold vs warm daemon requests against a local mock registry")
+    parser.add_argument("--packages", type=int, default=1000)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.01, help="Per-request latency in seconds")
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--roots", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients for the warm round")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    packuments = synthetic_packuments(args.packages, args.fanout, versions=3)
+    with MockRegistry(packuments, latency=args.latency) as registry, \
+            DepvisDaemon("127.0.0.1:0", concurrency=16) as daemon:
+        client = DaemonClient(daemon.address, token=daemon.token)
+        requests = [
+            GraphRequest(f"pkg{i}", registry.url, max_depth=args.max_depth, algorithm="bfs-iterative",
+                         views=["graph", "load_order", "cycles"])
+            for i in range(args.roots)
+        ]
+        cold = [ask(client, request) for request in requests]
+        print(f"{'cold (crawl)':<20} mean={sum(cold) / len(cold) * 1000:9.2f} ms  requests={registry.request_count}")
+
+        served = registry.request_count
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            warm = sorted(pool.map(lambda request: ask(client, request), requests * args.repeat))
+        p50 = warm[len(warm) // 2] * 1000
+        p95 = warm[min(len(warm) - 1, int(len(warm) * 0.95))] * 1000
+        print(f"{'warm (in memory)':<20} p50={p50:9.2f} ms  p95={p95:9.2f} ms  "
+              f"{len(warm)} requests from {args.clients} clients, registry requests={registry.request_count - served}")
+        print(f"stats: {daemon.graphs.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dependency_filter import DependencyFilter
+from lockfile import LockfileIndex, read_lockfile
+
+
+def synthetic_lockfile(count: int, fanout: int = 4, nested: float = 0.1, seed: int = 0) -> dict:
+    """
+    package-lock v2: count хойстнутых пакетов, часть зависимостей - вложенные копии другой версии,
+    плюс устаревшее дерево "dependencies", как пишет npm 7-8.
+    """
+    rng = random.Random(seed)
+    names = [f"@scope{i % 53}/pkg-{i}" if i % 5 == 0 else f"package-{i}" for i in range(count)]
+    packages = {"": {"name": "bench-app", "version": "1.0.0", "dependencies": {n: "^1.0.0" for n in names[:20]}}}
+    legacy = {}
+    for i, name in enumerate(names):
+        deps = {names[rng.randrange(count)]: "^1.0.0" for _ in range(fanout)}
+        deps.pop(name, None)
+        entry = {
+            "version": f"1.{i % 13}.{i % 7}",
+            "resolved": f"https://registry.npmjs.org/{name}/-/{name.rsplit('/', 1)[-1]}-1.0.0.tgz",
+            "integrity": "sha512-" + "A" * 86 + "==",
+            "dependencies": deps,
+        }
+        packages[f"node_modules/{name}"] = entry
+        legacy[name] = {"version": entry["version"], "resolved": entry["resolved"],
+                        "integrity": entry["integrity"], "requires": deps}
+        if rng.random() < nested:
+            dep = next(iter(deps), None)
+            if dep:
+                packages[f"node_modules/{name}/node_modules/{dep}"] = {"version": "0.9.0", "dependencies": {}}
+    return {"name": "bench-app", "version": "1.0.0", "lockfileVersion": 2, "requires": True,
+            "packages": packages, "dependencies": legacy}
+
+
+def naive(path: str) -> LockfileIndex:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    index = LockfileIndex(data.get("name", ""), data.get("version", ""))
+    include_dev = DependencyFilter(dev=True)
+    for package_path, entry in data["packages"].items():
+        index.add(package_path, entry, include_dev)
+    return index
+
+
+def measure(label: str, load):
+    gc.collect()
+    tracemalloc.start()
+    index = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+
+    gc.collect()
+    started = time.perf_counter()
+    index = load()
+    load_time = time.perf_counter() - started
+    started = time.perf_counter()
+    graph, visited = index.build_graph()
+    graph_time = time.perf_counter() - started
+    started = time.perf_counter()
+    cycles = graph.find_cycles()
+    graph.get_load_order()
+    analysis_time = time.perf_counter() - started
+    print(f"{label:<18} load={load_time:7.3f}s graph={graph_time:6.3f}s cycles+order={analysis_time:6.3f}s "
+          f"peak={peak / 2**20:7.1f} MiB nodes={len(visited)} cycle_groups={len(cycles)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Streaming package-lock import vs json.load")
+    parser.add_argument("--entries", type=int, nargs="+", default=[5000, 50000])
+    parser.add_argument("--fanout", type=int, default=4)
+    args = parser.parse_args()
+
+    for count in args.entries:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "package-lock.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(synthetic_lockfile(count, args.fanout), f, indent=2)
+            print(f"\n{count} entries, {os.path.getsize(path) / 2**20:.1f} MiB")
+            measure("json.load", lambda: naive(path))
+            measure("streamed", lambda: read_lockfile(path))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,58 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import BatchRoot
+from dependency_graph import DependencyGraph
+from mirror import MirrorRegistry, MirrorStore, prefetch
+from mock_registry import MockRegistry, synthetic_packuments
+from registry_client import RegistryClient
+
+
+def crawl(label: str, url: str, args) -> dict:
+    graph = DependencyGraph(client=RegistryClient(pool_size=args.concurrency))
+    started = time.perf_counter()
+    graph.bfs_concurrent("pkg0", args.max_depth, url, args.concurrency)
+    elapsed = time.perf_counter() - started
+    graph.client.close()
+    print(f"{label:<20} {elapsed:8.3f}s  nodes={len(graph.graph)}")
+    return graph.graph
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Upstream registry vs a prefetched single-file mirror")
+    parser.add_argument("--packages", type=int, default=2000)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--versions", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.03, help="Upstream per-request latency in seconds")
+    parser.add_argument("--max-depth", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    packuments = synthetic_packuments(args.packages, args.fanout, versions=args.versions)
+    with MockRegistry(packuments, latency=args.latency) as upstream, tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "mirror.dvm")
+        roots = [BatchRoot("pkg0", "pkg0")]
+        for label in ("prefetch", "prefetch (resume)"):
+            started = time.perf_counter()
+            client = RegistryClient(pool_size=args.concurrency)
+            with MirrorStore(path, writable=True) as store:
+                stats = prefetch(store, roots, upstream.url, args.max_depth, client, args.concurrency)
+            client.close()
+            print(f"{label:<20} {time.perf_counter() - started:8.3f}s  {stats.format()}")
+
+        direct = crawl("upstream crawl", upstream.url, args)
+        with MirrorStore(path) as store, MirrorRegistry(store, port=0) as mirror:
+            mirrored = crawl("mirror crawl", mirror.url, args)
+            print(f"store: {len(store)} packuments, {store.size()} bytes; missing={len(mirror.missing)}")
+        if mirrored != direct:
+            print("  note: the mirrored graph differs from the upstream crawl")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
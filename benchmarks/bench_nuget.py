@@ -0,0 +1,114 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from depvis_nuget import NuspecInfo, scan_folder
+from depvis_nuget.nupkg import find_packages
+
+NUSPEC = """<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://schemas.microsoft.com/packaging/2013/05/nuspec.xsd">
+  <metadata>
+    <id>{id}</id>
+    <version>1.0.{n}</version>
+    <authors>bench</authors>
+    <description>Synthetic package {id}</description>
+    <dependencies>
+      <group targetFramework=".NETStandard2.0">
+{deps}
+      </group>
+      <group targetFramework="net6.0" />
+    </dependencies>
+  </metadata>
+</package>
+"""
+
+
+def generate(folder: str, count: int, payload_kb: int, fanout: int = 3, seed: int = 0):
+    """
+    Синтетические .nupkg: nuspec плюс несжимаемая dll и xml-документация, как у реальных пакетов.
+    """
+    rng = random.Random(seed)
+    dll = rng.randbytes(payload_kb * 1024)
+    docs = ("<member name='M:Bench.Type.Method'><summary>Docs</summary></member>\n" * (payload_kb * 8)).encode()
+    for n in range(count):
+        package_id = f"Bench.Package{n}"
+        targets = rng.sample(range(count), min(fanout, count))
+        deps = "\n".join(
+            f'        <dependency id="Bench.Package{t}" version="1.0.{t}" exclude="Build,Analyzers" />'
+            for t in targets if t != n
+        )
+        path = os.path.join(folder, f"{package_id}.1.0.{n}.nupkg")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            archive.writestr(f"{package_id}.nuspec", NUSPEC.format(id=package_id, n=n, deps=deps))
+            archive.writestr(f"lib/netstandard2.0/{package_id}.dll", dll)
+            archive.writestr(f"lib/netstandard2.0/{package_id}.xml", docs)
+            archive.writestr(f"lib/net6.0/{package_id}.dll", dll)
+            archive.writestr(f"lib/net6.0/{package_id}.xml", docs)
+
+
+def naive_scan(folder: str):
+    """
+    Базовая линия: распаковать архив целиком и разобрать nuspec в дерево.
+    """
+    packages = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for i, path in enumerate(find_packages(folder)):
+            target = os.path.join(scratch, str(i))
+            with zipfile.ZipFile(path) as archive:
+                archive.extractall(target)
+            nuspec = next(name for name in os.listdir(target) if name.endswith(".nuspec"))
+            root = ET.parse(os.path.join(target, nuspec)).getroot()
+            ns = {"n": root.tag[1:].split("}")[0]}
+            metadata = root.find("n:metadata", ns)
+            groups = {}
+            for group in metadata.findall("n:dependencies/n:group", ns):
+                groups[group.get("targetFramework", "")] = {
+                    d.get("id"): d.get("version", "") for d in group.findall("n:dependency", ns)
+                }
+            packages.append(NuspecInfo(metadata.find("n:id", ns).text, metadata.find("n:version", ns).text, groups))
+            shutil.rmtree(target)
+    return packages
+
+
+def timed(label: str, scan):
+    started = time.perf_counter()
+    packages = scan()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.3f}s  packages={len(packages)}  {len(packages) / elapsed:9.0f} pkg/s")
+    return packages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local .nupkg indexing: nuspec-only reads vs full extraction")
+    parser.add_argument("--packages", type=int, default=300)
+    parser.add_argument("--payload-kb", type=int, default=1024, help="Size of each synthetic dll")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        generate(folder, args.packages, args.payload_kb)
+        total = sum(os.path.getsize(p) for p in find_packages(folder))
+        print(f"{args.packages} packages, {total / 2**20:.1f} MiB of archives")
+
+        baseline = None if args.skip_naive else timed("extractall + ET.parse", lambda: naive_scan(folder))
+        for workers in args.workers:
+            packages = timed(f"nuspec only, {workers} proc", lambda: scan_folder(folder, workers))
+            if baseline is not None:
+                expected = sorted((p.id, p.version, sorted(p.groups.items())) for p in baseline)
+                actual = sorted((p.id, p.version, sorted(p.groups.items())) for p in packages)
+                if expected != actual:
+                    print("  note: result differs from the full-extraction baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,111 @@
+import argparse
+import contextlib
+import glob
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_registry import MockRegistry, abbreviate_packument
+from npm_parser import extract_dependencies, fetch_npm_dependencies, fetch_npm_metadata
+from packument_stream import iter_chunks, stream_dependencies
+
+
+def synthetic_large_packument(name: str, versions: int) -> dict:
+    """
+    Packument, похожий по форме на typescript/webpack: тысячи версий с тяжёлыми полями.
+    """
+    doc = {
+        "_id": name,
+        "name": name,
+        "description": "synthetic large packument",
+        "readme": "# " + name + "\n" + ("lorem ipsum dolor sit amet " * 4000),
+        "dist-tags": {"latest": f"{versions - 1}.0.0"},
+        "versions": {},
+        "time": {"modified": "2024-01-01T00:00:00.000Z"},
+    }
+    for i in range(versions):
+        number = f"{i}.0.0"
+        doc["time"][number] = "2024-01-01T00:00:00.000Z"
+        doc["versions"][number] = {
+            "name": name,
+            "version": number,
+            "description": "synthetic large packument",
+            "main": "index.js",
+            "scripts": {f"script{k}": f"node build.js --step {k}" for k in range(10)},
+            "dependencies": {f"dep{k}": f"^{k}.0.0" for k in range(i % 12)},
+            "devDependencies": {f"dev-dep{k}": f"^{k}.1.0" for k in range(40)},
+            "keywords": ["synthetic", "benchmark", "packument"],
+            "maintainers": [{"name": f"user{k}", "email": f"user{k}@example.com"} for k in range(5)],
+            "dist": {
+                "shasum": "0" * 40,
+                "tarball": f"https://registry.example.com/{name}/-/{name}-{number}.tgz",
+                "integrity": "sha512-" + "A" * 86,
+                "fileCount": 120,
+                "unpackedSize": 1234567,
+            },
+            "_npmUser": {"name": "publisher", "email": "publisher@example.com"},
+        }
+    return doc
+
+
+def measure(func):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Full packument vs streamed abbreviated metadata")
+    parser.add_argument("--packuments", default=None, help="Directory with recorded packument *.json files")
+    parser.add_argument("--versions", type=int, nargs="+", default=[500, 3000], help="Synthetic packument sizes")
+    args = parser.parse_args()
+
+    packuments = {}
+    if args.packuments:
+        for path in sorted(glob.glob(os.path.join(args.packuments, "*.json"))):
+            with open(path, "rb") as f:
+                doc = json.load(f)
+            packuments[doc.get("name") or os.path.basename(path)[:-5]] = doc
+    else:
+        for count in args.versions:
+            packuments[f"synthetic-{count}"] = synthetic_large_packument(f"synthetic-{count}", count)
+
+    print(f"{'package':<20} {'path':<6} {'bytes':>12} {'fetch s':>9} {'parse s':>9} {'parse peak MiB':>15}")
+    with MockRegistry(packuments) as registry:
+        for name, doc in packuments.items():
+            full_body = json.dumps(doc).encode("utf-8")
+            abbreviated_body = gzip.compress(json.dumps(abbreviate_packument(doc)).encode("utf-8"))
+
+            # Реестр работает в этом же процессе, поэтому пик памяти меряем только на разборе
+            before = registry.bytes_sent
+            old, old_time, _ = measure(lambda: extract_dependencies(fetch_npm_metadata(name, "latest", registry.url)))
+            old_bytes = (registry.bytes_sent - before) // 2
+            _, old_parse, old_peak = measure(lambda: extract_dependencies(json.loads(full_body)))
+
+            before = registry.bytes_sent
+            new, new_time, _ = measure(lambda: fetch_npm_dependencies(name, "latest", registry.url))
+            new_bytes = (registry.bytes_sent - before) // 2
+            _, new_parse, new_peak = measure(lambda: stream_dependencies(iter_chunks(io.BytesIO(abbreviated_body)))[1])
+
+            assert old == new, f"{name}: dependency maps differ"
+            print(f"{name:<20} {'full':<6} {old_bytes:>12} {old_time:>9.3f} {old_parse:>9.3f} {old_peak / 2**20:>15.2f}")
+            print(f"{name:<20} {'stream':<6} {new_bytes:>12} {new_time:>9.3f} {new_parse:>9.3f} {new_peak / 2**20:>15.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
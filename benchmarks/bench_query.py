@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graph_query import DependencyIndex
+from repository_format import generate_repository, load_repository
+
+
+def timed(label: str, queries, ask):
+    times = []
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        found += ask(*query) is not None
+        times.append(time.perf_counter() - started)
+    times.sort()
+    p50 = times[len(times) // 2] * 1000
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))] * 1000
+    print(f"{label:<22} p50={p50:8.3f} ms  p95={p95:8.3f} ms  ({found}/{len(queries)} answered)")
+
+
+def scan_dependents(dependencies, name):
+    # Без обратного индекса: повторные проходы по всему графу до неподвижной точки
+    found = {name}
+    changed = True
+    while changed:
+        changed = False
+        for node, deps in dependencies.items():
+            if node not in found and not found.isdisjoint(deps):
+                found.add(node)
+                changed = True
+    return sorted(found - {name})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query index vs full scans on a saved graph")
+    parser.add_argument("--packages", type=int, default=100000)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--window", type=int, default=None,
+                        help="How far ahead edges reach (default: --packages, a shallow registry-like graph)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "repo.txt")
+        edges = generate_repository(path, args.packages, args.fanout, window=args.window or args.packages)
+        graph = load_repository(path)
+        print(f"{args.packages} packages, {edges} edges")
+
+        started = time.perf_counter()
+        index = DependencyIndex(graph, roots=["PKG0000000"])
+        print(f"{'build index':<22} {time.perf_counter() - started:8.3f} s")
+
+        rng = random.Random(0)
+        names = graph.names
+        pairs = [(rng.choice(names), rng.choice(names)) for _ in range(args.queries)]
+        singles = [(rng.choice(names),) for _ in range(args.queries)]
+        timed("path (random pairs)", pairs, index.path)
+        timed("depth_of", singles, index.depth_of)
+        timed("why", singles, index.why)
+        timed("dependents direct", singles, lambda name: index.dependents(name, direct=True))
+        late = [(names[-1 - i],) for i in range(min(20, args.queries))]
+        timed("dependents (deep leaf)", late, index.dependents)
+
+        dependencies = graph.get_all_dependencies()
+        timed("full-scan dependents", late[:3], lambda name: scan_dependents(dependencies, name))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
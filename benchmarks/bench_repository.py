@@ -0,0 +1,62 @@
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from npm_parser import parse_test_repository
+from repository_format import generate_repository, load_repository
+
+
+def measure(label: str, load, probe: str):
+    gc.collect()
+    tracemalloc.start()
+    repo = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del repo
+
+    gc.collect()
+    started = time.perf_counter()
+    repo = load()
+    load_time = time.perf_counter() - started
+    started = time.perf_counter()
+    dependencies = repo.get(probe)
+    query_time = time.perf_counter() - started
+    print(f"{label:<26} load={load_time:8.3f}s  first query={query_time * 1000:7.3f}ms  "
+          f"peak={peak / 2**20:8.1f} MiB  packages={len(repo)}  probe deps={len(dependencies or ())}")
+    return repo
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Text test repository vs streaming parse vs binary snapshot")
+    parser.add_argument("--packages", type=int, nargs="+", default=[20000, 200000])
+    parser.add_argument("--fanout", type=int, default=5)
+    args = parser.parse_args()
+
+    for count in args.packages:
+        with tempfile.TemporaryDirectory() as folder:
+            text_path = os.path.join(folder, "repo.txt")
+            snapshot_path = os.path.join(folder, "repo.snap")
+            edges = generate_repository(text_path, count, args.fanout)
+            print(f"\n{count} packages, {edges} edges, text {os.path.getsize(text_path) / 2**20:.1f} MiB")
+
+            probe = "PKG0000000"
+            measure("parse_test_repository", lambda: parse_test_repository(text_path), probe)
+            compact = measure("streamed -> compact", lambda: load_repository(text_path), probe)
+
+            started = time.perf_counter()
+            compact.save(snapshot_path)
+            print(f"{'save snapshot':<26} {time.perf_counter() - started:8.3f}s  "
+                  f"size={os.path.getsize(snapshot_path) / 2**20:.1f} MiB")
+            del compact
+            measure("snapshot (mmap)", lambda: load_repository(snapshot_path), probe)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,86 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import semver
+from semver import VersionIndex, compile_range, parse_version
+
+
+def random_versions(rng: random.Random, count: int):
+    versions = set()
+    while len(versions) < count:
+        major = rng.randrange(0, 6)
+        version = f"{major}.{rng.randrange(0, 20)}.{rng.randrange(0, 30)}"
+        if rng.random() < 0.1:
+            version += f"-beta.{rng.randrange(0, 5)}"
+        versions.add(version)
+    return sorted(versions)
+
+
+def random_range(rng: random.Random) -> str:
+    M, m, p = rng.randrange(0, 6), rng.randrange(0, 20), rng.randrange(0, 30)
+    return rng.choice([
+        f"^{M}.{m}.{p}", f"~{M}.{m}.{p}", f"{M}.x", f"{M}.{m}.x", "*",
+        f">={M}.{m}.{p} <{M + 1}.0.0", f"{M}.{m}.{p} - {M + 1}.{m}", f"^{M}.{m}.{p} || ^{M + 1}.0.0",
+        f"{M}.{m}.{p}", "latest",
+    ])
+
+
+def timed(label: str, count: int, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<36} {count:>9} ops  {elapsed:8.3f}s  {count / elapsed:>12,.0f} ops/s")
+
+
+def clear_caches():
+    parse_version.cache_clear()
+    compile_range.cache_clear()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Semver range resolution microbenchmarks")
+    parser.add_argument("--packages", type=int, default=500)
+    parser.add_argument("--versions", type=int, default=200, help="Published versions per package")
+    parser.add_argument("--edges", type=int, default=100000)
+    parser.add_argument("--distinct-ranges", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    packages = {}
+    for i in range(args.packages):
+        versions = random_versions(rng, args.versions)
+        packages[f"pkg{i}"] = (versions, {"latest": max(versions, key=parse_version)})
+    ranges = [random_range(rng) for _ in range(args.distinct_ranges)]
+    edges = [(f"pkg{rng.randrange(args.packages)}", rng.choice(ranges)) for _ in range(args.edges)]
+    all_versions = [v for versions, _ in packages.values() for v in versions]
+
+    clear_caches()
+    timed("parse_version (cold)", len(all_versions), lambda: [parse_version(v) for v in all_versions])
+    timed("compile_range (cold)", len(ranges), lambda: [compile_range(r) for r in ranges if r != "latest"])
+    timed("compile_range (cached)", len(edges), lambda: [compile_range(r) for _, r in edges if r != "latest"])
+
+    indexes = {}
+    timed("VersionIndex build", len(packages), lambda: indexes.update(
+        (name, VersionIndex(versions, tags)) for name, (versions, tags) in packages.items()
+    ))
+
+    timed("max_satisfying (no index, cold)", min(len(edges), 5000), lambda: [
+        semver.max_satisfying(packages[name][0], spec) for name, spec in edges[:5000] if spec != "latest"
+    ])
+
+    clear_caches()
+    for index in indexes.values():
+        index._resolved.clear()
+    timed("VersionIndex.resolve (cold caches)", len(edges), lambda: [indexes[name].resolve(spec) for name, spec in edges])
+    timed("VersionIndex.resolve (warm)", len(edges), lambda: [indexes[name].resolve(spec) for name, spec in edges])
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,71 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import BatchRoot, crawl_batch
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, synthetic_packuments
+from registry_client import RegistryClient
+from sharded import ShardedDependencyGraph
+
+
+def serve(packages: int, fanout: int, versions: int, latency: float, ready, stop):
+    # Реестр в отдельном процессе: его JSON и gzip не должны делить GIL с координатором
+    with MockRegistry(synthetic_packuments(packages, fanout, versions=versions), latency=latency) as registry:
+        ready.put(registry.url)
+        stop.wait()
+        ready.put(registry.request_count)
+
+
+def crawl(graph: DependencyGraph, args, url: str) -> float:
+    roots = [BatchRoot(f"pkg{i}", f"pkg{i}") for i in range(args.roots)]
+    started = time.perf_counter()
+    crawl_batch(graph, roots, args.max_depth, url, args.concurrency)
+    elapsed = time.perf_counter() - started
+    graph.client.close()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Threaded crawl vs process shards across worker counts")
+    parser.add_argument("--packages", type=int, default=3000)
+    parser.add_argument("--roots", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--versions", type=int, default=40, help="Versions per packument; more versions - more parsing")
+    parser.add_argument("--latency", type=float, default=0.002, help="Per-request latency in seconds")
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="Worker counts (default: 1, 2, 4 ... CPU count)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = args.workers or sorted({min(cores, 2 ** k) for k in range(cores.bit_length() + 1)})
+    print(f"{cores} CPU core(s)")
+
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Queue(), context.Event()
+    server = context.Process(target=serve, args=(args.packages, args.fanout, args.versions, args.latency, ready, stop))
+    server.start()
+    url = ready.get()
+    try:
+        graph = DependencyGraph(client=RegistryClient(pool_size=args.concurrency))
+        baseline = crawl(graph, args, url)
+        print(f"{'threads only':<16} {baseline:8.3f}s  edges={sum(len(deps) for deps in graph.graph.values())}")
+        for workers in counts:
+            with ShardedDependencyGraph(workers, args.concurrency, client=RegistryClient()) as graph:
+                elapsed = crawl(graph, args, url)
+            edges = sum(len(deps) for deps in graph.graph.values())
+            print(f"{f'{workers} worker(s)':<16} {elapsed:8.3f}s  speedup x{baseline / elapsed:.2f}  edges={edges}")
+    finally:
+        stop.set()
+        print(f"requests served: {ready.get()}")
+        server.join()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,52 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from typing import Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, synthetic_packuments
+
+
+def run(label: str, crawl) -> Tuple[DependencyGraph, Set[str]]:
+    graph = DependencyGraph()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        visited = crawl(graph)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<24} {elapsed:8.3f}s  nodes={len(visited)}  edges={sum(len(d) for d in graph.graph.values())}")
+    return graph, visited
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serial vs concurrent traversal against a local mock registry")
+    parser.add_argument("--packages", type=int, default=300)
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="Per-request latency in seconds")
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    packuments = synthetic_packuments(args.packages, args.fanout)
+    with MockRegistry(packuments, latency=args.latency) as registry:
+        baseline, baseline_visited = run(
+            "bfs_with_recursion",
+            lambda g: g.bfs_with_recursion("pkg0", args.max_depth, registry.url),
+        )
+        for concurrency in args.concurrency:
+            graph, visited = run(
+                f"bfs_concurrent x{concurrency}",
+                lambda g: g.bfs_concurrent("pkg0", args.max_depth, registry.url, concurrency),
+            )
+            if visited != baseline_visited or graph.graph != baseline.graph:
+                print("  note: result differs from the depth-first crawl (nodes first reached deeper than their shortest depth)")
+        print(f"requests served: {registry.request_count}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_compact_graph import synthetic_edges
+from bench_packument import synthetic_large_packument
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, synthetic_packuments
+from npm_parser import extract_dependencies, parse_test_repository
+from registry_client import RegistryClient
+from repository_format import generate_repository
+
+# Размеры по умолчанию и для --quick; все входы строятся с фиксированным seed
+SIZES = {
+    "bfs_with_recursion": ([300, 1000], [100]),
+    "bfs_test_mode": ([10000, 100000], [2000]),
+    "has_cycles": ([100000, 500000, 1000000], [20000]),
+    "get_load_order": ([100000, 500000, 1000000], [20000]),
+    "extract_dependencies": ([1000, 5000], [200]),
+    "parse_test_repository": ([100000, 500000], [5000]),
+}
+
+
+class Case:
+    """
+    Один замер: setup готовит входные данные (не входит во время), run - измеряемый вызов,
+    requests - число HTTP-запросов к мок-реестру за последний run (None - сеть не используется).
+    """
+
+    def __init__(self, run, requests=None, close=None):
+        self.run = run
+        self.requests = requests
+        self.close = close or (lambda: None)
+
+
+def registry_case(size: int, args) -> Case:
+    registry = MockRegistry(synthetic_packuments(size, args.fanout, seed=0, versions=3), latency=args.latency)
+    registry.start()
+    counted = [0, 0]
+
+    def run():
+        counted[0] = registry.request_count
+        graph = DependencyGraph(client=RegistryClient())
+        graph.bfs_with_recursion("pkg0", args.max_depth, registry.url)
+        graph.client.close()
+        counted[1] = registry.request_count - counted[0]
+
+    return Case(run, lambda: counted[1], registry.stop)
+
+
+def repository_case(size: int, args, window: int) -> str:
+    path = os.path.join(args.workdir, f"repo-{size}-{window}.txt")
+    if not os.path.exists(path):
+        generate_repository(path, size, args.fanout, seed=0, window=window)
+    return path
+
+
+def test_mode_case(size: int, args) -> Case:
+    test_repo = parse_test_repository(repository_case(size, args, size))
+    return Case(lambda: DependencyGraph(client=object()).bfs_test_mode("PKG0000000", args.max_depth, test_repo))
+
+
+def edges_graph(size: int) -> DependencyGraph:
+    graph = DependencyGraph(client=object())
+    for package, dependency in synthetic_edges(size, seed=0):
+        graph.add_dependency(package, dependency)
+    return graph
+
+
+def cycles_case(size: int, args) -> Case:
+    graph = edges_graph(size)
+    return Case(graph.has_cycles)
+
+
+def load_order_case(size: int, args) -> Case:
+    graph = edges_graph(size)
+    return Case(graph.get_load_order)
+
+
+def extract_case(size: int, args) -> Case:
+    packument = synthetic_large_packument("large-package", size)
+    ranges = ["latest", f"^{size // 2}.0.0", f">={size // 3}.0.0 <{size // 2}.0.0", "0.0.0"]
+    return Case(lambda: [extract_dependencies(packument, spec) for spec in ranges])
+
+
+def parse_case(size: int, args) -> Case:
+    path = repository_case(size, args, 1000)
+    return Case(lambda: parse_test_repository(path))
+
+
+CASES = {
+    "bfs_with_recursion": registry_case,
+    "bfs_test_mode": test_mode_case,
+    "has_cycles": cycles_case,
+    "get_load_order": load_order_case,
+    "extract_dependencies": extract_case,
+    "parse_test_repository": parse_case,
+}
+
+
+def measure(case: Case, repeat: int):
+    """
+    Лучшее время из repeat прогонов; пик памяти - в отдельном прогоне, tracemalloc замедляет код.
+    """
+    best = None
+    requests = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            case.run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+            requests = case.requests() if case.requests else None
+
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, requests
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10)
+    except OSError:
+        return ""
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def previous_run(path: str, run_id: str) -> dict:
+    """
+    Записи последнего прогона в файле результатов, кроме текущего: (case, size) -> запись.
+    """
+    runs = {}
+    order = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("run") == run_id:
+                    continue
+                if record.get("run") not in runs:
+                    runs[record.get("run")] = {}
+                    order.append(record.get("run"))
+                runs[record["run"]][(record["case"], record["params"]["size"])] = record
+    except OSError:
+        return {}
+    return runs[order[-1]] if order else {}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite; appends JSON lines to bench_output.txt")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=sorted(CASES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=None, help="Override the size list of every case")
+    parser.add_argument("--quick", action="store_true", help="Small sizes for a smoke run")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the best one is recorded")
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--max-depth", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.002, help="Mock registry latency in seconds")
+    parser.add_argument("--output", default=os.path.join(ROOT, "bench_output.txt"))
+    parser.add_argument("--compare", action="store_true", help="Show the ratio against the previous recorded run")
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:12]
+    meta = {
+        "run": run_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+    }
+    baseline = previous_run(args.output, run_id) if args.compare else {}
+
+    with tempfile.TemporaryDirectory() as workdir, open(args.output, "a", encoding="utf-8") as out:
+        args.workdir = workdir
+        for name in args.cases:
+            full, quick = SIZES[name]
+            for size in args.sizes or (quick if args.quick else full):
+                case = CASES[name](size, args)
+                try:
+                    seconds, peak, requests = measure(case, max(1, args.repeat))
+                finally:
+                    case.close()
+                params = {"size": size, "fanout": args.fanout, "max_depth": args.max_depth}
+                if name == "bfs_with_recursion":
+                    params["latency"] = args.latency
+                record = dict(meta, case=name, params=params, seconds=round(seconds, 6),
+                              peak_mib=round(peak / 2**20, 3), requests=requests)
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+
+                line = f"{name:<22} size={size:<8} {seconds:9.4f}s  peak={peak / 2**20:8.2f} MiB"
+                if requests is not None:
+                    line += f"  requests={requests}"
+                previous = baseline.get((name, size))
+                if previous and previous["seconds"]:
+                    line += f"  x{seconds / previous['seconds']:.2f} vs {previous['commit'] or previous['run']}"
+                print(line)
+    print(f"run {run_id} appended to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
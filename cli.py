@@ -1,109 +1,707 @@
 import argparse
-from npm_parser import fetch_npm_metadata, extract_dependencies, parse_test_repository
+import cProfile
+import json
+import logging
+import os
+import shlex
+import sys
+import time
+import yaml
+from contextlib import nullcontext
+from typing import Optional, Set
+from npm_parser import fetch_npm_metadata, extract_dependencies, split_node_key
 from dependency_graph import DependencyGraph
+from compact_graph import CompactDependencyGraph
 from npm_comparison import NPMComparator
+from metadata_cache import DependencyMemo, MetadataCache
+from registry_client import RegistryClient
+from config_loader import AppConfig, load_config
+from dependency_filter import DependencyFilter
+from batch import BatchRoot, batch_stats, crawl_batch, read_roots
+from graph_query import DependencyIndex, load_graph
+from incremental import CrawlState, IncrementalDependencyGraph, diff_graphs
+from sharded import ShardedDependencyGraph
+from daemon import DaemonClient, DepvisDaemon, GraphRequest, daemon_address, split_address
+from mirror import DEFAULT_MIRROR_ADDRESS, MirrorRegistry, MirrorStore, prefetch
+from depvis_nuget import NuGetFolderSource
+from lockfile import read_lockfile
+from repository_format import load_repository
+from renderer import print_ascii_tree, render
+from profiling import Profiler, enable as enable_profiling, phase
+
+logger = logging.getLogger("depvis")
+
+
+def _configure_logging(quiet: bool, verbose: bool):
+    """
+    Прогресс и диагностика идут через logging в stderr, stdout остаётся для результатов.
+    """
+    level = logging.WARNING if quiet else logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(message)s", stream=sys.stderr)
+
+
+def _config_defaults(config: AppConfig) -> dict:
+    """
+    Поля AppConfig -> имена опций CLI; пустые значения конфигурации не перекрывают умолчания.
+    """
+    defaults = {
+        "package": config.package,
+        "version": config.version,
+        "output": config.output_file,
+        "ascii_tree": config.ascii_tree,
+        "max_depth": config.max_depth,
+        "filter": config.filter,
+        "test_mode": config.test_mode,
+        "include_dev": config.include_dev,
+        "include_peer": config.include_peer,
+        "include_optional": config.include_optional,
+    }
+    if config.repository:
+        defaults["repository"] = config.repository
+    return defaults
+
+
+def _mode(args) -> str:
+    if args.nuget:
+        return "nuget"
+    if args.lockfile:
+        return "lockfile"
+    if args.batch:
+        return "batch"
+    return "test" if args.test_mode else "registry"
+
+
+def _json_report(args, graph, visited: Set[str], elapsed: float, client: RegistryClient, memo: DependencyMemo,
+                 cache: Optional[MetadataCache] = None, comparison: Optional[dict] = None) -> dict:
+    """
+    Один итоговый документ: граф, порядок загрузки, циклы и статистика.
+    """
+    dependencies = graph.get_all_dependencies()
+    cycles = graph.find_cycles()
+    report = {
+        "package": args.package,
+        "version": args.version,
+        "repository": args.repository,
+        "mode": _mode(args),
+        "graph": {node: sorted(deps) for node, deps in sorted(dependencies.items())},
+        "load_order": graph.get_load_order(),
+        "cycles": cycles,
+        "stats": {
+            "packages": len(visited),
+            "nodes": len(dependencies),
+            "dependencies": sum(len(deps) for deps in dependencies.values()),
+            "cycle_groups": len(cycles),
+            "elapsed_seconds": round(elapsed, 6),
+        },
+    }
+    if args.install_waves:
+        report["install_waves"] = graph.get_install_waves()
+    if _mode(args) in ("registry", "batch"):
+        report["stats"]["http"] = client.summary()
+        report["stats"]["memo"] = memo.summary()
+        if cache is not None:
+            report["stats"]["cache"] = dict(cache.stats)
+    if comparison is not None:
+        report["comparison"] = {
+            key: sorted(value) if isinstance(value, set) else value
+            for key, value in comparison.items()
+        }
+    return report
+
+
+QUERY_ARITY = {"dependents": 1, "dependencies": 1, "path": 2, "reaches": 2, "depth": 1, "why": 1}
+
+
+def _answer(index: DependencyIndex, question: str, direct: bool):
+    words = question.split()
+    if not words or words[0] not in QUERY_ARITY or len(words) != QUERY_ARITY[words[0]] + 1:
+        raise ValueError(f"expected one of: {', '.join(f'{op} ' + ' '.join(['NAME'] * n) for op, n in QUERY_ARITY.items())}")
+    op, names = words[0], words[1:]
+    if op == "dependents":
+        return index.dependents(names[0], direct)
+    if op == "dependencies":
+        return index.dependencies(names[0], direct)
+    if op == "path":
+        return index.path(*names)
+    if op == "reaches":
+        return index.reaches(*names)
+    if op == "depth":
+        return index.depth_of(names[0])
+    return index.why(names[0])
+
+
+def _format_answer(question: str, answer) -> str:
+    op = question.split()[0]
+    if isinstance(answer, list) and op in ("dependents", "dependencies"):
+        return "\n".join([f"{question}: {len(answer)} package(s)"] + [f"  {name}" for name in answer])
+    if isinstance(answer, list):
+        return f"{question}: {' -> '.join(answer)}"
+    if answer is None:
+        return f"{question}: {'no path' if op == 'path' else 'unreachable from the roots'}"
+    return f"{question}: {answer}"
+
+
+def query_main(argv) -> int:
+    """
+    Подкоманда query: вопросы к сохранённому графу через DependencyIndex.
+    Без вопросов в аргументах читает их из stdin по одному на строку - индекс строится один раз.
+    """
+    parser = argparse.ArgumentParser(
+        prog="cli.py query",
+        description="Answer dependency questions from a saved graph",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("graph", help="Graph snapshot (--save-graph/--save-snapshot), test repository file or --incremental state")
+    parser.add_argument("question", nargs="*", help="dependents NAME | dependencies NAME | path A B | reaches A B | depth NAME | why NAME")
+    parser.add_argument("--root", action="append", default=None, help="Root package for depth/why (repeatable; default: packages nobody depends on)")
+    parser.add_argument("--direct", action="store_true", default=False, help="dependents/dependencies: only direct edges")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="json prints one JSON object per question")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet", action="store_true", default=False, help="Only print answers and errors")
+    verbosity.add_argument("--verbose", action="store_true", default=False, help="Debug output")
+    args = parser.parse_args(argv)
+    _configure_logging(args.quiet, args.verbose)
+    
+    try:
+        started = time.perf_counter()
+        graph = load_graph(args.graph)
+        index = DependencyIndex(graph, roots=args.root)
+    except (OSError, RuntimeError) as e:
+        logger.error("Error loading %s: %s", args.graph, e)
+        return 1
+    logger.info("Indexed %d nodes, %d edges in %.3fs", graph.node_count(), graph.edge_count(),
+                time.perf_counter() - started)
+    
+    questions = [" ".join(args.question)] if args.question else (line.strip() for line in sys.stdin)
+    failed = False
+    for question in questions:
+        if not question or question.startswith("#"):
+            continue
+        started = time.perf_counter()
+        try:
+            answer = _answer(index, question, args.direct)
+        except (ValueError, RuntimeError) as e:
+            logger.error("%s: %s", question, e)
+            failed = True
+            continue
+        elapsed = time.perf_counter() - started
+        if args.format == "json":
+            print(json.dumps({"question": question, "answer": answer, "elapsed_ms": round(elapsed * 1000, 3)}))
+        else:
+            print(_format_answer(question, answer))
+        logger.debug("(%.3f ms)", elapsed * 1000)
+        sys.stdout.flush()
+    return 1 if failed else 0
+
+
+def daemon_main(argv) -> int:
+    """
+    Подкоманда daemon: долгоживущий сервер с тёплым memo и LRU графов; --status и --stop
+    обращаются к уже запущенному демону.
+    """
+    parser = argparse.ArgumentParser(
+        prog="cli.py daemon",
+        description="Keep registry metadata and built graphs warm for repeated depvis runs",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--address", default=None, help="HOST:PORT to listen on (default: $DEPVIS_DAEMON or 127.0.0.1:8732)")
+    parser.add_argument("--max-graphs", type=int, default=64, help="Built graphs kept in memory (LRU)")
+    parser.add_argument("--ttl", type=float, default=300.0, help="Seconds before a built graph and version indexes are rebuilt")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum parallel registry requests for bfs-iterative")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the on-disk registry metadata cache")
+    parser.add_argument("--cache-ttl", type=float, default=3600.0, help="Seconds before a cached entry is revalidated")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Registry socket read timeout in seconds")
+    parser.add_argument("--retries", type=int, default=3, help="Retries with backoff on 429/5xx and network errors")
+    parser.add_argument("--npm-command", default=None, help="npm executable (and leading args) used for --compare-with-npm lock-only resolution")
+    control = parser.add_mutually_exclusive_group()
+    control.add_argument("--status", action="store_true", default=False, help="Print statistics of the running daemon")
+    control.add_argument("--stop", action="store_true", default=False, help="Stop the running daemon")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet", action="store_true", default=False, help="Only log errors")
+    verbosity.add_argument("--verbose", action="store_true", default=False, help="Log every request")
+    args = parser.parse_args(argv)
+    _configure_logging(args.quiet, args.verbose)
+    address = daemon_address(args.address)
+    
+    if args.status or args.stop:
+        try:
+            answer = DaemonClient(address).stats() if args.status else DaemonClient(address).shutdown()
+        except (RuntimeError, ValueError) as e:
+            logger.error("%s", e)
+            return 1
+        if answer is None:
+            logger.error("No depvis daemon at %s", address)
+            return 1
+        print(json.dumps(answer, indent=2) if args.status else f"Stopping depvis daemon at {address}")
+        return 0
+    
+    cache = MetadataCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    client = RegistryClient(timeout=args.timeout, max_retries=args.retries,
+                            pool_size=max(8, args.concurrency), cache=cache)
+    try:
+        server = DepvisDaemon(address, client=client, max_graphs=args.max_graphs, ttl=args.ttl,
+                              concurrency=args.concurrency, npm_cache_dir=args.cache_dir,
+                              npm_command=shlex.split(args.npm_command) if args.npm_command else None)
+    except (OSError, ValueError) as e:
+        logger.error("Cannot listen on %s: %s", address, e)
+        return 1
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def mirror_main(argv) -> int:
+    """
+    Подкоманда mirror: fetch наполняет однофайловое хранилище замыканием корней (повторный запуск
+    докачивает недостающее), serve отдаёт его как локальный реестр, info - сводка по хранилищу.
+    """
+    parser = argparse.ArgumentParser(
+        prog="cli.py mirror",
+        description="Prefetch packuments into a local single-file mirror and serve it as a registry",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    fetch = commands.add_parser("fetch", help="Prefetch the transitive closure of roots into the store",
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    fetch.add_argument("roots", nargs="*", metavar="PATH", help="Root list files (one 'name[@range]' per line) and/or package.json manifests")
+    fetch.add_argument("--package", action="append", default=[], help="Root 'name[@range]' (repeatable)")
+    fetch.add_argument("--repository", required=True, help="Upstream registry URL")
+    fetch.add_argument("--max-depth", type=int, default=None, help="Limit the closure depth (default: unlimited)")
+    fetch.add_argument("--concurrency", type=int, default=16, help="Maximum parallel registry requests")
+    fetch.add_argument("--full-packuments", action="store_true", default=False, help="Store full packuments instead of abbreviated install metadata (new stores only)")
+    fetch.add_argument("--include-dev", action="store_true", default=False, help="Follow devDependencies of the roots")
+    fetch.add_argument("--include-peer", action="store_true", default=False, help="Follow peerDependencies")
+    fetch.add_argument("--no-optional", dest="include_optional", action="store_false", default=True, help="Skip optionalDependencies")
+    fetch.add_argument("--timeout", type=float, default=30.0, help="Registry socket read timeout in seconds")
+    fetch.add_argument("--retries", type=int, default=3, help="Retries with backoff on 429/5xx and network errors")
+    
+    serve = commands.add_parser("serve", help="Serve the store as a local npm registry",
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    serve.add_argument("--address", default=DEFAULT_MIRROR_ADDRESS, help="HOST:PORT to listen on")
+    
+    commands.add_parser("info", help="Describe the store")
+    
+    for command in commands.choices.values():
+        command.add_argument("--store", required=True, help="Mirror store file")
+        verbosity = command.add_mutually_exclusive_group()
+        verbosity.add_argument("--quiet", action="store_true", default=False, help="Only print results and errors")
+        verbosity.add_argument("--verbose", action="store_true", default=False, help="Trace every download or request")
+    args = parser.parse_args(argv)
+    _configure_logging(args.quiet, args.verbose)
+    
+    if args.command == "fetch":
+        try:
+            roots = read_roots(args.roots)
+        except RuntimeError as e:
+            logger.error("%s", e)
+            return 1
+        for line in args.package:
+            package, spec = split_node_key(line)
+            roots.append(BatchRoot(line, package, spec or "latest"))
+        if not roots:
+            parser.error("mirror fetch needs --package or root list files")
+        client = RegistryClient(timeout=args.timeout, max_retries=args.retries, pool_size=max(8, args.concurrency))
+        dependency_filter = DependencyFilter(dev=args.include_dev, peer=args.include_peer, optional=args.include_optional)
+        try:
+            with MirrorStore(args.store, writable=True, full=args.full_packuments) as store:
+                if store.full != args.full_packuments:
+                    logger.warning("%s keeps %s packuments; --full-packuments is ignored",
+                                   args.store, "full" if store.full else "abbreviated")
+                stats = prefetch(store, roots, args.repository, args.max_depth or sys.maxsize,
+                                 client, args.concurrency, dependency_filter)
+        except RuntimeError as e:
+            logger.error("%s", e)
+            return 1
+        finally:
+            client.close()
+        print(f"{stats.format()}; store size {os.path.getsize(args.store)} bytes")
+        return 1 if stats.failed else 0
+    
+    try:
+        store = MirrorStore(args.store)
+    except RuntimeError as e:
+        logger.error("%s", e)
+        return 1
+    with store:
+        if args.command == "info":
+            print(f"{args.store}: {len(store)} {'full' if store.full else 'abbreviated'} packuments, "
+                  f"{store.size()} bytes{' (index recovered by scan)' if store.recovered else ''}")
+            return 0
+        try:
+            server = MirrorRegistry(store, *split_address(args.address))
+        except (OSError, ValueError) as e:
+            logger.error("Cannot listen on %s: %s", args.address, e)
+            return 1
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def _daemon_request(args, parser: argparse.ArgumentParser) -> Optional[GraphRequest]:
+    """
+    Запрос к демону, если передача включена (--daemon или $DEPVIS_DAEMON) и этот запуск можно
+    ему передать: обычный обход реестра без локального состояния (кэш, инкрементальный файл, шарды),
+    без профилирования и с настройками клиента и команды npm демона.
+    """
+    if args.no_daemon or (args.daemon is None and not os.environ.get("DEPVIS_DAEMON")):
+        return None
+    if _mode(args) != "registry":
+        return None
+    if (args.incremental or args.cache_dir or args.offline or args.cache_stats or args.http_metrics
+            or args.profile or args.profile_output or (args.workers and args.workers > 1)):
+        return None
+    # Демон ходит в реестр своим клиентом и запускает свою команду npm
+    own = [f"--{name.replace('_', '-')}" for name in ("timeout", "retries", "concurrency", "npm_command")
+           if getattr(args, name) != parser.get_default(name)]
+    if own:
+        logger.info("Crawling locally: the daemon uses its own %s", ", ".join(own))
+        return None
+    return GraphRequest(
+        package=args.package, repository=args.repository, version=args.version, max_depth=args.max_depth,
+        algorithm=args.algorithm, filter=args.filter, include_dev=args.include_dev,
+        include_peer=args.include_peer, include_optional=args.include_optional,
+        full_packuments=args.full_packuments, compare_with_npm=args.compare_with_npm,
+        npm_lockfile=os.path.abspath(args.npm_lockfile) if args.npm_lockfile else None,
+    )
+
+
+def _apply_daemon_answer(graph: DependencyGraph, answer: dict, dependency_filter: DependencyFilter) -> Set[str]:
+    """
+    Переносит граф из ответа демона в локальный DependencyGraph; дальше вывод идёт как после обхода.
+    """
+    for node, dependencies in answer["graph"].items():
+        graph.graph[node] = set(dependencies)
+    dependency_filter.pruned_edges = answer["filter"]["pruned_edges"]
+    dependency_filter.pruned_packages = set(answer["filter"]["pruned_packages"])
+    return set(answer["visited"])
 
 
 def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        return query_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "daemon":
+        return daemon_main(sys.argv[2:])
+    if len(sys.argv) > 1 and sys.argv[1] == "mirror":
+        return mirror_main(sys.argv[2:])
+    
     parser = argparse.ArgumentParser(
         description="NPM dependency visualizer (Variant 20)",
+        epilog="Saved graphs can be queried with: cli.py query GRAPH QUESTION (see cli.py query -h). "
+               "With --daemon or $DEPVIS_DAEMON, registry crawls are forwarded to a running 'cli.py daemon' when possible. "
+               "For hermetic crawls, prefetch with 'cli.py mirror fetch' and point --repository at 'cli.py mirror serve'.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
     )
     
-    parser.add_argument("--package", required=True, help="Name of the package to analyze")
-    parser.add_argument("--repository", required=True, help="Repository URL or path to test repository file")
+    parser.add_argument("--config", default=None, help="YAML config file; command-line options take precedence over it")
+    parser.add_argument("--package", default=None, help="Name of the package to analyze (required here or in --config)")
+    parser.add_argument("--repository", default=None, help="Repository URL or path to test repository file (required here or in --config)")
     parser.add_argument("--test-mode", action="store_true", default=False, help="Enable test repository mode")
-    parser.add_argument("--version", default="latest", help="Package version to analyze")
-    parser.add_argument("--output", default="graph.png", help="Name of the generated graph image file")
+    parser.add_argument("--save-snapshot", default=None, help="Write the loaded test repository as a binary snapshot for fast reloads")
+    parser.add_argument("--save-graph", default=None, help="Write the resulting dependency graph as a binary snapshot for 'cli.py query'")
+    parser.add_argument("--nuget", action="store_true", default=False, help="Treat --repository as a folder of local .nupkg files")
+    parser.add_argument("--lockfile", action="store_true", default=False, help="Treat --repository as a package-lock.json (v2/v3); --package '.' or the root name imports the whole tree")
+    parser.add_argument("--framework", default=None, help="NuGet target framework for dependency groups (default: union of all groups)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for indexing local packages (default: CPU count); for registry and --batch crawls, N > 1 fetches and parses packages in N processes sharded by package name")
+    parser.add_argument("--version", default="latest", help="Package version, dist-tag or semver range to analyze")
+    parser.add_argument("--output", default=None, help="Render the graph to this file: .png/.svg (Graphviz or built-in SVG), .dot, .txt (ASCII tree); nothing is rendered by default")
+    parser.add_argument("--ascii-tree", action="store_true", default=False, help="Print the dependency tree with shared subtrees collapsed")
     parser.add_argument("--max-depth", type=int, default=3, help="Maximum dependency analysis depth")
     parser.add_argument("--algorithm", choices=["bfs-recursive", "bfs-iterative"], default="bfs-recursive", help="Algorithm for graph traversal")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum parallel registry requests for bfs-iterative")
+    parser.add_argument("--full-packuments", action="store_true", default=False, help="Download full packuments instead of streaming abbreviated install metadata")
+    parser.add_argument("--cache-dir", default=None, help="Directory for the on-disk registry metadata cache")
+    parser.add_argument("--cache-ttl", type=float, default=3600.0, help="Seconds before a cached entry is revalidated")
+    parser.add_argument("--offline", action="store_true", default=False, help="Use only the metadata cache, no network I/O")
+    parser.add_argument("--cache-stats", action="store_true", default=False, help="Print metadata cache statistics")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Registry socket read timeout in seconds")
+    parser.add_argument("--retries", type=int, default=3, help="Retries with backoff on 429/5xx and network errors")
+    parser.add_argument("--http-metrics", action="store_true", default=False, help="Print per-request DNS/connect/TTFB/body timings")
+    parser.add_argument("--compact-graph", action="store_true", default=False, help="Pack the crawled graph into integer-interned CSR arrays before analysis")
+    parser.add_argument("--cycles", action="store_true", default=False, help="Report every cycle group (strongly connected component)")
     parser.add_argument("--show-load-order", action="store_true", default=False, help="Show dependency load order (Stage 4)")
+    parser.add_argument("--install-waves", action="store_true", default=False, help="Show parallelizable install waves instead of a flat load order")
     parser.add_argument("--compare-with-npm", action="store_true", default=False, help="Compare with real NPM (Stage 4)")
+    parser.add_argument("--npm-lockfile", default=None, help="Compare against an existing package-lock.json instead of running npm")
+    parser.add_argument("--npm-command", default=None, help="npm executable (and leading args) used for lock-only resolution")
+    parser.add_argument("--batch", nargs="+", default=None, metavar="PATH", help="Analyze many roots in one shared crawl: root list files (one 'name[@range]' per line) and/or package.json manifests")
+    parser.add_argument("--incremental", default=None, help="Crawl state file: revalidate packages from the previous run, re-fetch only changed ones, print a diff and update the file")
+    parser.add_argument("--filter", default="", help="Dependency patterns: glob, re:REGEX, @scope or name; prefix with ! to exclude")
+    parser.add_argument("--include-dev", action="store_true", default=False, help="Follow devDependencies of the root package")
+    parser.add_argument("--include-peer", action="store_true", default=False, help="Follow peerDependencies")
+    parser.add_argument("--no-optional", dest="include_optional", action="store_false", default=True, help="Skip optionalDependencies")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Result format; json prints one machine-readable document to stdout")
+    parser.add_argument("--daemon", nargs="?", const="", default=None, metavar="HOST:PORT", help="Forward registry crawls to a running depvis daemon (address: HOST:PORT, $DEPVIS_DAEMON or 127.0.0.1:8732)")
+    parser.add_argument("--no-daemon", action="store_true", default=False, help="Always crawl in this process, even if $DEPVIS_DAEMON is set")
+    parser.add_argument("--profile", action="store_true", default=False, help="Time each phase and print a breakdown with request latency histogram and throughput")
+    parser.add_argument("--profile-output", default=None, help="Also write a Chrome trace (*.json) or a cProfile pstats dump (any other name); implies --profile")
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument("--quiet", action="store_true", default=False, help="Only print results and errors, no progress output")
+    verbosity.add_argument("--verbose", action="store_true", default=False, help="Trace every processed package and download")
+    
+    # Сначала читаем только --config: его значения становятся умолчаниями, явные опции их перекрывают
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument("--config", default=None)
+    config_args, _ = config_parser.parse_known_args()
+    if config_args.config:
+        try:
+            parser.set_defaults(**_config_defaults(load_config(config_args.config)))
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            parser.error(f"cannot load config {config_args.config}: {e}")
     
     args = parser.parse_args()
+    if not args.package and not args.batch:
+        parser.error("--package is required (on the command line or in --config)")
+    if not args.repository:
+        parser.error("--repository is required (on the command line or in --config)")
+    if args.offline and not args.cache_dir:
+        parser.error("--offline requires --cache-dir")
+    if args.batch and (args.test_mode or args.nuget or args.lockfile or args.incremental):
+        parser.error("--batch crawls the registry and cannot be combined with --test-mode, --nuget, --lockfile or --incremental")
+    if args.incremental and _mode(args) != "registry":
+        parser.error("--incremental only applies to registry crawls")
+    if args.incremental and args.workers and args.workers > 1:
+        parser.error("--incremental crawls in one process; drop --workers")
+    if args.incremental and args.full_packuments:
+        parser.error("--incremental works with abbreviated packuments; drop --full-packuments")
+    try:
+        dependency_filter = DependencyFilter.parse(
+            args.filter, dev=args.include_dev, peer=args.include_peer, optional=args.include_optional
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    _configure_logging(args.quiet, args.verbose)
+    text = args.format == "text"
+    
+    # Без --profile активного профайлера нет: фазы превращаются в общий пустой контекст
+    profiler = None
+    cpu_profile = None
+    if args.profile or args.profile_output:
+        chrome_trace = bool(args.profile_output) and args.profile_output.endswith(".json")
+        profiler = Profiler(trace=chrome_trace)
+        enable_profiling(profiler)
+        if args.profile_output and not chrome_trace:
+            cpu_profile = cProfile.Profile()
+            cpu_profile.enable()
 
-    print("=== Configuration Parameters ===")
-    print(f"package = {args.package}")
-    print(f"repository = {args.repository}")
-    print(f"test_mode = {args.test_mode}")
-    print(f"version = {args.version}")
-    print(f"output = {args.output}")
-    print(f"max_depth = {args.max_depth}")
-    print(f"algorithm = {args.algorithm}")
-    print(f"show_load_order = {args.show_load_order}")
-    print(f"compare_with_npm = {args.compare_with_npm}")
-    print("================================\n")
+    logger.info("=== Configuration Parameters ===")
+    for name in ("package", "batch", "repository", "test_mode", "nuget", "lockfile", "version", "output", "max_depth", "algorithm",
+                 "concurrency", "workers", "full_packuments", "cache_dir", "offline", "compact_graph", "cycles",
+                 "show_load_order", "install_waves", "compare_with_npm", "ascii_tree", "incremental", "filter", "include_dev", "include_peer", "include_optional", "format"):
+        logger.info("%s = %s", name, getattr(args, name))
+    logger.info("================================\n")
 
-    print("--- Stage 2 & 3: Dependency Graph Construction ---")
+    logger.info("--- Stage 2 & 3: Dependency Graph Construction ---")
     
-    graph = DependencyGraph()
+    cache = MetadataCache(args.cache_dir, ttl=args.cache_ttl) if args.cache_dir else None
+    client = RegistryClient(
+        timeout=args.timeout,
+        max_retries=args.retries,
+        pool_size=max(8, args.concurrency),
+        cache=cache,
+        offline=args.offline
+    )
+    previous = None
+    if args.incremental:
+        previous = _load_previous_state(args.incremental)
+        graph = IncrementalDependencyGraph(previous, client=client, dependency_filter=dependency_filter)
+        graph.begin(args.package, args.version, args.repository)
+    elif args.workers and args.workers > 1 and _mode(args) in ("registry", "batch"):
+        graph = ShardedDependencyGraph(args.workers, args.concurrency, client=client,
+                                       abbreviated=not args.full_packuments, dependency_filter=dependency_filter)
+    else:
+        graph = DependencyGraph(client=client, abbreviated=not args.full_packuments, dependency_filter=dependency_filter)
+    memo = graph.memo
+    started = time.perf_counter()
+    comparison = None
+    diff = None
+    incremental_stats = None
+    batch = None
+    shard_stats = None
+    # Процессы-шарды живут только на время обхода
+    shards = graph if isinstance(graph, ShardedDependencyGraph) else nullcontext()
     
-    if args.test_mode:
-        print(f"Test mode: using file {args.repository}")
+    if args.lockfile:
+        logger.info("Lockfile mode: %s", args.repository)
         try:
-            test_repo = parse_test_repository(args.repository)
-            print(f"Loaded test repository with {len(test_repo)} packages")
+            with phase("parse_lockfile"):
+                index = read_lockfile(args.repository, dependency_filter=dependency_filter)
+            with phase("traverse"):
+                graph, visited = index.build_graph(
+                    package=None if args.package == "." else args.package,
+                    graph=graph
+                )
+            
+            if args.compact_graph:
+                graph = CompactDependencyGraph.from_graph(graph)
+            elapsed = time.perf_counter() - started
+            
+            if text:
+                _print_summary(graph, visited, args.cycles)
+                if args.show_load_order:
+                    graph.print_load_order()
+                if args.install_waves:
+                    graph.print_install_waves()
+        
+        except Exception as e:
+            logger.error("Error in lockfile mode: %s", e)
+            return 1
+    elif args.nuget:
+        logger.info("NuGet folder mode: %s", args.repository)
+        try:
+            with phase("index_packages"):
+                source = NuGetFolderSource.from_folder(args.repository, args.workers)
+            logger.info("Indexed %d local packages", len(source))
+            
+            with phase("traverse"):
+                graph, visited = source.build_graph(
+                    package=args.package,
+                    max_depth=args.max_depth,
+                    framework=args.framework,
+                    version=args.version,
+                    graph=graph
+                )
+            
+            if args.compact_graph:
+                graph = CompactDependencyGraph.from_graph(graph)
+            elapsed = time.perf_counter() - started
+            
+            if text:
+                _print_summary(graph, visited, args.cycles)
+                if args.show_load_order:
+                    graph.print_load_order()
+                if args.install_waves:
+                    graph.print_install_waves()
+        
+        except Exception as e:
+            logger.error("Error in NuGet mode: %s", e)
+            return 1
+    elif args.test_mode:
+        logger.info("Test mode: using file %s", args.repository)
+        try:
+            loading = time.perf_counter()
+            test_repo = load_repository(args.repository)
+            logger.info("Loaded test repository with %d packages in %.3fs",
+                        len(test_repo), time.perf_counter() - loading)
+            if args.save_snapshot:
+                test_repo.save(args.save_snapshot)
+                logger.info("Saved binary snapshot to %s", args.save_snapshot)
             
             if args.package not in test_repo:
-                print(f"Error: Package '{args.package}' not found in test repository")
-                print(f"Available packages: {', '.join(sorted(test_repo.keys()))}")
+                logger.error("Error: Package '%s' not found in test repository", args.package)
+                available = sorted(test_repo.keys())
+                if len(available) > 50:
+                    logger.error("Available packages: %s, ... (%d total)", ", ".join(available[:50]), len(available))
+                else:
+                    logger.error("Available packages: %s", ", ".join(available))
                 return 1
             
-            visited = graph.bfs_test_mode(
-                start_package=args.package,
-                max_depth=args.max_depth,
-                test_repo=test_repo
-            )
+            with phase("traverse"):
+                visited = graph.bfs_test_mode(
+                    start_package=args.package,
+                    max_depth=args.max_depth,
+                    test_repo=test_repo
+                )
             
-            print(f"\nGraph construction completed!")
-            print(f"Total packages processed: {len(visited)}")
-            print(f"Total dependencies found: {sum(len(deps) for deps in graph.get_all_dependencies().values())}")
+            if args.compact_graph:
+                graph = CompactDependencyGraph.from_graph(graph)
+            elapsed = time.perf_counter() - started
             
-            if graph.has_cycles():
-                print("Cycle detection: Cycles found in dependency graph!")
-            else:
-                print("Cycle detection: No cycles found.")
+            if text:
+                _print_summary(graph, visited, args.cycles)
                 
-            graph.print_graph()
-            
-            # Этап 4: Порядок загрузки для тестового режима
-            if args.show_load_order:
-                graph.print_load_order()
+                # Этап 4: Порядок загрузки для тестового режима
+                if args.show_load_order:
+                    graph.print_load_order()
+                if args.install_waves:
+                    graph.print_install_waves()
                 
         except Exception as e:
-            print(f"Error in test mode: {e}")
+            logger.error("Error in test mode: %s", e)
             return 1
+    elif args.batch:
+        logger.info("Batch mode: %s", args.repository)
+        try:
+            roots = read_roots(args.batch)
+            logger.info("Analyzing %d roots with one shared crawl", len(roots))
+            with phase("traverse"), shards:
+                batch = crawl_batch(graph, roots, args.max_depth, args.repository, args.concurrency)
+            visited = set(graph.get_all_dependencies())
+            elapsed = time.perf_counter() - started
+            if isinstance(graph, ShardedDependencyGraph):
+                shard_stats = graph.shard_stats
+                logger.info("%s", graph.format_shard_stats())
+            
+            if text:
+                _print_batch(batch, args)
+        
+        except Exception as e:
+            logger.error("Error in batch mode: %s", e)
+            return 1
+        client.close()
     else:
-        print(f"Real repository mode: {args.repository}")
-        print(f"Algorithm: {args.algorithm}")
+        logger.info("Real repository mode: %s", args.repository)
+        if isinstance(graph, ShardedDependencyGraph):
+            logger.info("Algorithm: bfs-iterative sharded across %d worker processes", graph.workers)
+        else:
+            logger.info("Algorithm: %s", args.algorithm)
         
+        request = _daemon_request(args, parser)
+        remote = None
         try:
-            if args.algorithm == "bfs-recursive":
-                visited = graph.bfs_with_recursion(
-                    start_package=args.package,
-                    max_depth=args.max_depth,
-                    repository_url=args.repository
-                )
-            else:
-                visited = graph.bfs_with_recursion(
-                    start_package=args.package,
-                    max_depth=args.max_depth,
-                    repository_url=args.repository
-                )
+            with phase("traverse"), shards:
+                if request is not None:
+                    remote = DaemonClient(args.daemon).graph(request)
+                    if remote is None:
+                        logger.info("No depvis daemon at %s; crawling locally", daemon_address(args.daemon))
+                if remote is not None:
+                    logger.info("Graph %s by the depvis daemon at %s",
+                                "served from memory" if remote["cached"] else "built", daemon_address(args.daemon))
+                    visited = _apply_daemon_answer(graph, remote, dependency_filter)
+                elif args.algorithm == "bfs-recursive" and not isinstance(graph, ShardedDependencyGraph):
+                    visited = graph.bfs_with_recursion(
+                        start_package=args.package,
+                        max_depth=args.max_depth,
+                        repository_url=args.repository,
+                        version=args.version
+                    )
+                else:
+                    visited = graph.bfs_concurrent(
+                        start_package=args.package,
+                        max_depth=args.max_depth,
+                        repository_url=args.repository,
+                        concurrency=args.concurrency,
+                        version=args.version
+                    )
             
-            print(f"\nGraph construction completed!")
-            print(f"Total packages processed: {len(visited)}")
-            print(f"Total dependencies found: {sum(len(deps) for deps in graph.get_all_dependencies().values())}")
+            if isinstance(graph, ShardedDependencyGraph):
+                shard_stats = graph.shard_stats
+                logger.info("%s", graph.format_shard_stats())
             
-            if graph.has_cycles():
-                print("Cycle detection: Cycles found in dependency graph!")
-            else:
-                print("Cycle detection: No cycles found.")
-                
-            graph.print_graph()
+            if args.incremental:
+                state = graph.finish()
+                if previous is not None:
+                    diff = diff_graphs(previous.graph, state.graph)
+                state.save(args.incremental)
+                incremental_stats = dict(graph.stats)
+                logger.info("%s", graph.format_stats())
+                logger.info("Crawl state saved to %s", args.incremental)
+            
+            if args.compact_graph:
+                graph = CompactDependencyGraph.from_graph(graph)
+            elapsed = time.perf_counter() - started
+            
+            if text:
+                _print_summary(graph, visited, args.cycles)
+                if diff is not None:
+                    print(f"\n{diff.format()}")
             
             # Этап 4: Дополнительные операции
-            if args.show_load_order or args.compare_with_npm:
+            if text and (args.show_load_order or args.install_waves or args.compare_with_npm):
                 print("\n" + "="*50)
                 print("STAGE 4: ADDITIONAL OPERATIONS")
                 print("="*50)
@@ -111,25 +709,194 @@ def main() -> None:
                 if args.show_load_order:
                     graph.print_load_order()
                 
-                if args.compare_with_npm:
-                    comparator = NPMComparator()
-                    
-                    print("\nGetting actual NPM install order...")
-                    npm_order = comparator.get_actual_npm_install_order(args.package, args.version)
-                    
-                    if npm_order:
-                        our_order = graph.get_load_order()
-                        comparison = comparator.compare_orders(our_order, npm_order)
+                if args.install_waves:
+                    graph.print_install_waves()
+            
+            if args.compare_with_npm and remote is not None:
+                if remote["comparison"] is not None:
+                    comparison = remote["comparison"]
+                    if text:
+                        NPMComparator().explain_differences(comparison, remote["our_order"], remote["npm_order"])
+                else:
+                    logger.warning("Failed to get NPM install order")
+            elif args.compare_with_npm:
+                comparator = NPMComparator(
+                    npm_command=shlex.split(args.npm_command) if args.npm_command else None,
+                    lockfile=args.npm_lockfile,
+                    cache_dir=args.cache_dir
+                )
+                
+                logger.info("\nGetting actual NPM install order...")
+                npm_order = comparator.get_actual_npm_install_order(args.package, args.version)
+                
+                if npm_order:
+                    our_order = [split_node_key(node)[0] for node in graph.get_load_order()]
+                    comparison = comparator.compare_orders(our_order, npm_order)
+                    if text:
                         comparator.explain_differences(comparison, our_order, npm_order)
-                    else:
-                        print("Failed to get NPM install order")
+                else:
+                    logger.warning("Failed to get NPM install order")
                 
         except Exception as e:
-            print(f"Error during graph construction: {e}")
+            logger.error("Error during graph construction: %s", e)
+            return 1
+        
+        if text and args.cache_stats:
+            if cache is not None:
+                print(f"\n{cache.format_stats()}")
+            else:
+                print("\nCache stats: cache disabled (use --cache-dir)")
+            print(memo.format_stats())
+        
+        if text and args.http_metrics:
+            print(f"\n{client.format_metrics()}")
+        client.close()
+    
+    if text and (dependency_filter.include or dependency_filter.exclude):
+        print(f"\n{dependency_filter.format_stats()}")
+    
+    if args.save_graph:
+        snapshot = graph if isinstance(graph, CompactDependencyGraph) else CompactDependencyGraph.from_graph(graph)
+        try:
+            snapshot.save(args.save_graph)
+        except OSError as e:
+            logger.error("Error saving graph to %s: %s", args.save_graph, e)
+            return 1
+        logger.info("Graph snapshot saved to %s", args.save_graph)
+    
+    if text and args.ascii_tree:
+        print("\nDependency tree:")
+        print_ascii_tree(graph)
+    
+    if args.output:
+        try:
+            with phase("render"):
+                written = render(graph, args.output)
+        except (OSError, RuntimeError) as e:
+            logger.error("Error rendering %s: %s", args.output, e)
             return 1
+        logger.info("Graph written to %s", written)
+    
+    if cpu_profile is not None:
+        cpu_profile.disable()
+        cpu_profile.dump_stats(args.profile_output)
+        logger.info("cProfile stats written to %s (main thread only)", args.profile_output)
+    elif profiler is not None and args.profile_output:
+        profiler.write_trace(args.profile_output)
+        logger.info("Chrome trace written to %s", args.profile_output)
+    profile = None
+    if profiler is not None:
+        enable_profiling(None)
+        dependencies = graph.get_all_dependencies()
+        profile_args = (client if _mode(args) in ("registry", "batch") else None,
+                        len(visited), sum(len(deps) for deps in dependencies.values()))
+        if text:
+            print(f"\n{profiler.format_report(*profile_args)}")
+        else:
+            profile = profiler.summary(*profile_args)
+    
+    if not text:
+        report = _json_report(args, graph, visited, elapsed, client, memo, cache, comparison)
+        report["stats"]["filter"] = {
+            "pruned_edges": dependency_filter.pruned_edges,
+            "pruned_packages": len(dependency_filter.pruned_packages),
+            "fetches_avoided": len(dependency_filter.pruned_packages),
+        }
+        if incremental_stats is not None:
+            report["stats"]["incremental"] = incremental_stats
+        if diff is not None:
+            report["diff"] = diff.to_dict()
+        if profile is not None:
+            report["profile"] = profile
+        if batch is not None:
+            report["stats"]["batch"] = {**batch_stats(batch), "requests": client.summary()["requests"]}
+            report["roots"] = [_batch_root_report(batch, root) for root in batch.roots]
+        if shard_stats is not None:
+            report["stats"]["shards"] = shard_stats
+        json.dump(report, sys.stdout)
+        sys.stdout.write("\n")
         
     return 0
 
 
+def _print_batch(batch, args):
+    """
+    Текстовый итог пакетного режима: по строке на корень и сравнение с отдельными обходами.
+    """
+    for root in batch.roots:
+        graph = batch.graphs.get(root.label)
+        if graph is None:
+            print(f"\n{root.label}: failed to resolve")
+            continue
+        dependencies = graph.get_all_dependencies()
+        cycles = graph.find_cycles()
+        print(f"\n{root.label} -> {root.node}: {len(batch.visited[root.label])} packages, "
+              f"{sum(len(deps) for deps in dependencies.values())} dependencies, {len(cycles)} cycle group(s)")
+        if args.cycles:
+            graph.print_cycles()
+        if args.show_load_order:
+            graph.print_load_order()
+        if args.install_waves:
+            graph.print_install_waves()
+    
+    stats = batch_stats(batch)
+    print(f"\nBatch stats: {stats['analyzed_roots']}/{stats['roots']} roots; "
+          f"expanded {stats['expanded']} package versions once (naive sum {stats['naive_expanded']}); "
+          f"fetched {stats['packages']} packages (naive sum {stats['naive_fetches']})")
+
+
+def _batch_root_report(batch, root) -> dict:
+    graph = batch.graphs.get(root.label)
+    if graph is None:
+        return {"root": root.label, "node": None, "error": f"cannot resolve {root.package}@{root.spec}"}
+    dependencies = graph.get_all_dependencies()
+    cycles = graph.find_cycles()
+    return {
+        "root": root.label,
+        "node": root.node,
+        "graph": {node: sorted(deps) for node, deps in sorted(dependencies.items())},
+        "load_order": graph.get_load_order(),
+        "cycles": cycles,
+        "stats": {
+            "packages": len(batch.visited[root.label]),
+            "dependencies": sum(len(deps) for deps in dependencies.values()),
+            "cycle_groups": len(cycles),
+        },
+    }
+
+
+def _load_previous_state(path: str) -> Optional[CrawlState]:
+    """
+    Состояние прошлого запуска; отсутствующий или испорченный файл означает полный обход.
+    """
+    if not os.path.exists(path):
+        logger.info("No previous crawl state at %s: full crawl", path)
+        return None
+    try:
+        return CrawlState.load(path)
+    except RuntimeError as e:
+        logger.warning("%s; doing a full crawl", e)
+        return None
+
+
+def _print_summary(graph, visited: Set[str], show_cycles: bool):
+    """
+    Текстовый итог обхода: счётчики, наличие циклов и сам граф.
+    """
+    print("\nGraph construction completed!")
+    print(f"Total packages processed: {len(visited)}")
+    print(f"Total dependencies found: {sum(len(deps) for deps in graph.get_all_dependencies().values())}")
+    
+    if graph.has_cycles():
+        print("Cycle detection: Cycles found in dependency graph!")
+    else:
+        print("Cycle detection: No cycles found.")
+        
+    graph.print_graph()
+    
+    if show_cycles:
+        graph.print_cycles()
+
+
 if __name__ == "__main__":
-    exit(main())
\ No newline at end of file
+    exit(main())
@@ -0,0 +1,309 @@
+import bisect
+import mmap
+import os
+import struct
+import sys
+from array import array
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from dependency_graph import DependencyGraph
+from graph_algorithms import find_cycles, install_waves, topological_batches
+from profiling import phase
+
+SNAPSHOT_MAGIC = b"DVSNAP1\0"
+# magic, порядок байт (0 - little, 1 - big), число узлов, число рёбер, размер таблицы имён
+_SNAPSHOT_HEADER = struct.Struct("<8sB3xIII")
+
+
+class CompactDependencyGraph:
+    """
+    Компактный граф зависимостей: имена пакетов интернированы в целые id,
+    смежность хранится в CSR-виде (offsets/targets в array('i')), 4 байта на ребро.
+    Рёбра копятся в плоском списке и упаковываются при первом чтении.
+    """
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._ids: Optional[Dict[str, int]] = {}
+        self._declared = bytearray()
+        self._src = array("i")
+        self._dst = array("i")
+        self._offsets: Optional[array] = None
+        self._targets: Optional[array] = None
+        self._mapped: Optional[mmap.mmap] = None
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[str, str]]) -> "CompactDependencyGraph":
+        graph = cls()
+        for package, dependency in edges:
+            graph.add_dependency(package, dependency)
+        graph._build()
+        return graph
+
+    @classmethod
+    def from_graph(cls, graph: DependencyGraph) -> "CompactDependencyGraph":
+        """
+        Упаковывает граф после обхода; исходный dict можно сразу освободить.
+        """
+        compact = cls()
+        for package, dependencies in graph.get_all_dependencies().items():
+            compact.add_dependency(package, "")
+            for dependency in dependencies:
+                compact.add_dependency(package, dependency)
+        compact._build()
+        return compact
+
+    def _intern(self, name: str) -> int:
+        node = self._ids.get(name)
+        if node is None:
+            node = len(self.names)
+            self._ids[name] = node
+            self.names.append(name)
+            self._declared.append(0)
+        return node
+
+    def add_dependency(self, package: str, dependency: str):
+        if self._offsets is not None:
+            self._unpack()
+        source = self._intern(package)
+        self._declared[source] = 1
+        if dependency:
+            self._src.append(source)
+            self._dst.append(self._intern(dependency))
+
+    def add_dependencies(self, package: str, dependencies: Iterable[str]):
+        """
+        Все зависимости пакета разом (строка тестового репозитория): источник интернируется один раз.
+        """
+        if self._offsets is not None:
+            self._unpack()
+        source = self._intern(package)
+        self._declared[source] = 1
+        targets = [self._intern(dependency) for dependency in dependencies if dependency]
+        self._src.extend(repeat(source, len(targets)))
+        self._dst.extend(targets)
+
+    def replace_dependencies(self, replacements: Dict[str, List[str]]):
+        """
+        Заменяет зависимости уже объявленных пакетов: повторная строка репозитория перекрывает прежнюю.
+        Один проход по рёбрам на все замены сразу.
+        """
+        if self._offsets is not None:
+            self._unpack()
+        sources = {self._ids[name] for name in replacements if name in self._ids}
+        src, dst = array("i"), array("i")
+        for source, target in zip(self._src, self._dst):
+            if source not in sources:
+                src.append(source)
+                dst.append(target)
+        self._src, self._dst = src, dst
+        for package, dependencies in replacements.items():
+            self.add_dependencies(package, dependencies)
+
+    def _build(self):
+        """
+        Перенумеровывает узлы в порядке имён (порядок id совпадает с порядком строк,
+        поэтому результаты алгоритмов те же, что у DependencyGraph) и строит CSR без дублей.
+        """
+        if self._offsets is not None:
+            return
+
+        count = len(self.names)
+        order = sorted(range(count), key=self.names.__getitem__)
+        rank = array("i", bytes(4 * count))
+        for new_id, old_id in enumerate(order):
+            rank[old_id] = new_id
+
+        self.names = [self.names[old_id] for old_id in order]
+        # После упаковки имена отсортированы - id ищется бинарным поиском, dict не нужен
+        self._ids = None
+        self._declared = bytearray(self._declared[old_id] for old_id in order)
+
+        # Сортировка подсчётом по источнику, затем сортировка и удаление дублей внутри строки
+        offsets = array("i", bytes(4 * (count + 1)))
+        for source in self._src:
+            offsets[rank[source] + 1] += 1
+        for node in range(count):
+            offsets[node + 1] += offsets[node]
+
+        fill = array("i", offsets)
+        targets = array("i", bytes(4 * len(self._src)))
+        for source, target in zip(self._src, self._dst):
+            row = rank[source]
+            targets[fill[row]] = rank[target]
+            fill[row] += 1
+        del fill
+        self._src = array("i")
+        self._dst = array("i")
+
+        packed = array("i", [0])
+        write = 0
+        for node in range(count):
+            row = sorted(set(targets[offsets[node]:offsets[node + 1]]))
+            targets[write:write + len(row)] = array("i", row)
+            write += len(row)
+            packed.append(write)
+        del targets[write:]
+
+        self._offsets = packed
+        self._targets = targets
+
+    def _unpack(self):
+        # Новое ребро после упаковки: возвращаемся к плоскому списку рёбер
+        self._ids = {name: node for node, name in enumerate(self.names)}
+        self._declared = bytearray(self._declared)
+        for node in range(len(self.names)):
+            for i in range(self._offsets[node], self._offsets[node + 1]):
+                self._src.append(node)
+                self._dst.append(self._targets[i])
+        self._offsets = None
+        self._targets = None
+
+    def _find(self, name: str) -> Optional[int]:
+        if self._ids is not None:
+            return self._ids.get(name)
+        node = bisect.bisect_left(self.names, name)
+        if node < len(self.names) and self.names[node] == name:
+            return node
+        return None
+
+    def _successors(self, node: int) -> array:
+        return self._targets[self._offsets[node]:self._offsets[node + 1]]
+
+    def _declared_ids(self) -> Iterator[int]:
+        return (node for node, flag in enumerate(self._declared) if flag)
+
+    def __contains__(self, name: str) -> bool:
+        node = self._find(name)
+        return node is not None and bool(self._declared[node])
+
+    def __len__(self) -> int:
+        return bytes(self._declared).count(1)
+
+    def get(self, name: str, default=None):
+        """
+        Прямые зависимости пакета по имени - интерфейс словаря тестового репозитория.
+        """
+        self._build()
+        node = self._find(name)
+        if node is None or not self._declared[node]:
+            return default
+        return [self.names[t] for t in self._successors(node)]
+
+    def keys(self) -> List[str]:
+        return [self.names[node] for node in self._declared_ids()]
+
+    def save(self, path: str):
+        """
+        Пишет бинарный снимок: заголовок, таблица имён (utf-8 через \\n),
+        флаги объявленных узлов и массивы CSR; массивы выровнены на 4 байта для mmap.
+        """
+        self._build()
+        blob = "\n".join(self.names).encode("utf-8")
+        header = _SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, 0 if sys.byteorder == "little" else 1,
+                                       len(self.names), len(self._targets), len(blob))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(blob)
+            f.write(bytes(-len(blob) % 4))
+            f.write(bytes(self._declared))
+            f.write(bytes(-len(self._declared) % 4))
+            f.write(memoryview(self._offsets).cast("B"))
+            f.write(memoryview(self._targets).cast("B"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompactDependencyGraph":
+        """
+        Открывает снимок через mmap: массивы CSR не копируются, декодируется только таблица имён.
+        """
+        with open(path, "rb") as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:
+                raise RuntimeError(f"Invalid graph snapshot {path}: {e}") from e
+        if len(mapped) < _SNAPSHOT_HEADER.size:
+            raise RuntimeError(f"Invalid graph snapshot {path}: file is truncated")
+        magic, byteorder, node_count, edge_count, names_size = _SNAPSHOT_HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC:
+            raise RuntimeError(f"Invalid graph snapshot {path}: bad magic")
+
+        position = _SNAPSHOT_HEADER.size
+        names_end = position + names_size
+        declared_start = names_end + (-names_size % 4)
+        offsets_start = declared_start + node_count + (-node_count % 4)
+        targets_start = offsets_start + 4 * (node_count + 1)
+        if len(mapped) < targets_start + 4 * edge_count:
+            raise RuntimeError(f"Invalid graph snapshot {path}: file is truncated")
+
+        graph = cls()
+        graph.names = mapped[position:names_end].decode("utf-8").split("\n") if node_count else []
+        graph._ids = None
+        view = memoryview(mapped)
+        graph._declared = view[declared_start:declared_start + node_count]
+        if byteorder == (0 if sys.byteorder == "little" else 1):
+            graph._offsets = view[offsets_start:targets_start].cast("i")
+            graph._targets = view[targets_start:targets_start + 4 * edge_count].cast("i")
+        else:
+            graph._offsets = array("i", view[offsets_start:targets_start])
+            graph._targets = array("i", view[targets_start:targets_start + 4 * edge_count])
+            graph._offsets.byteswap()
+            graph._targets.byteswap()
+        graph._mapped = mapped
+        return graph
+
+    def node_count(self) -> int:
+        return len(self.names)
+
+    def edge_count(self) -> int:
+        self._build()
+        return len(self._targets)
+
+    def get_all_dependencies(self) -> Dict[str, Set[str]]:
+        """
+        Материализует dict-of-sets для совместимости с DependencyGraph.
+        """
+        self._build()
+        names = self.names
+        return {names[node]: {names[t] for t in self._successors(node)} for node in self._declared_ids()}
+
+    def has_cycles(self) -> bool:
+        return bool(self.find_cycles())
+
+    def find_cycles(self) -> List[List[str]]:
+        self._build()
+        with phase("cycles"):
+            return [[self.names[node] for node in group] for group in find_cycles(self._declared_ids(), self._successors)]
+
+    def get_load_order(self) -> List[str]:
+        return [node for batch in self.get_load_batches() for node in batch]
+
+    def get_load_batches(self) -> List[List[str]]:
+        self._build()
+        with phase("load_order"):
+            return [[self.names[node] for node in batch] for batch in topological_batches(self._declared_ids(), self._successors)]
+
+    def get_install_waves(self) -> List[List[str]]:
+        self._build()
+        with phase("install_waves"):
+            return [[self.names[node] for node in wave] for wave in install_waves(self._declared_ids(), self._successors)]
+
+    def print_graph(self):
+        self._build()
+        if not any(self._declared):
+            print("  (graph is empty)")
+            return
+
+        print("\nFinal dependency graph:")
+        for node in self._declared_ids():
+            dependencies = [self.names[t] for t in self._successors(node)]
+            if dependencies:
+                print(f"  {self.names[node]} -> {', '.join(dependencies)}")
+            else:
+                print(f"  {self.names[node]} -> (no dependencies)")
+
+    print_load_order = DependencyGraph.print_load_order
+    print_cycles = DependencyGraph.print_cycles
+    print_install_waves = DependencyGraph.print_install_waves
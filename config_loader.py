@@ -6,11 +6,15 @@ import os
 class AppConfig:
     package: str
     version: str
-    output_file: str = "graph.png"
+    output_file: str = ""
     ascii_tree: bool = False
     max_depth: int = 5
     filter: str = ""
     test_mode: bool = False
+    repository: str = ""
+    include_dev: bool = False
+    include_peer: bool = False
+    include_optional: bool = True
 
 def load_config(path: str) -> AppConfig:
     if not os.path.exists(path):
@@ -27,9 +31,13 @@ def load_config(path: str) -> AppConfig:
     return AppConfig(
         package=str(data["package"]),
         version=str(data["version"]),
-        output_file=str(data.get("output_file", "graph.png")),
+        output_file=str(data.get("output_file", "")),
         ascii_tree=bool(data.get("ascii_tree", False)),
         max_depth=int(data.get("max_depth", 5)),
         filter=str(data.get("filter", "")),
         test_mode=bool(data.get("test_mode", False)),
+        repository=str(data.get("repository", "")),
+        include_dev=bool(data.get("include_dev", False)),
+        include_peer=bool(data.get("include_peer", False)),
+        include_optional=bool(data.get("include_optional", True)),
     )
@@ -0,0 +1,480 @@
+import hmac
+import http.client
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from metadata_cache import DependencyMemo
+from npm_comparison import NPMComparator
+from npm_parser import split_node_key
+from registry_client import RegistryClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "127.0.0.1:8732"
+SERVICE = "depvis"
+TOKEN_HEADER = "X-Depvis-Token"
+
+# Представления графа, которые можно запросить у демона; вычисляются один раз на граф
+VIEWS = ("graph", "visited", "load_order", "cycles", "install_waves")
+
+
+def daemon_address(address: Optional[str] = None) -> str:
+    return address or os.environ.get("DEPVIS_DAEMON") or DEFAULT_ADDRESS
+
+
+def split_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid daemon address '{address}', expected HOST:PORT")
+    return host, int(port)
+
+
+def token_path(address: str) -> str:
+    """
+    Файл с токеном демона: доступен только владельцу (0600), так что обратиться к демону
+    может лишь тот же пользователь, а не любой локальный процесс или веб-страница в браузере.
+    """
+    host, port = split_address(address)
+    folder = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(folder, "depvis", f"daemon-{host.replace(':', '_')}-{port}.token")
+
+
+def _write_token(path: str, token: str):
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        os.fchmod(fd, 0o600)
+        os.write(fd, token.encode("ascii"))
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
+
+
+def read_token(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+@dataclass
+class GraphRequest:
+    """
+    Запрос графа к демону; поля называются как опции CLI.
+    """
+    package: str
+    repository: str
+    version: str = "latest"
+    max_depth: int = 3
+    algorithm: str = "bfs-recursive"
+    filter: str = ""
+    include_dev: bool = False
+    include_peer: bool = False
+    include_optional: bool = True
+    full_packuments: bool = False
+    compare_with_npm: bool = False
+    # Абсолютный путь: демон работает в своём каталоге. Команду npm задаёт только запуск демона
+    npm_lockfile: Optional[str] = None
+    views: List[str] = field(default_factory=lambda: ["graph", "visited"])
+
+    @classmethod
+    def from_dict(cls, payload: dict) -> "GraphRequest":
+        known = {f.name for f in fields(cls)}
+        unknown = sorted(set(payload) - known)
+        if unknown:
+            raise ValueError(f"Unknown request field(s): {', '.join(unknown)}")
+        try:
+            request = cls(**payload)
+        except TypeError as e:
+            raise ValueError(f"Invalid request: {e}") from e
+        if request.npm_lockfile is not None and not os.path.isabs(request.npm_lockfile):
+            raise ValueError(f"npm_lockfile must be an absolute path, got '{request.npm_lockfile}'")
+        if request.algorithm not in ("bfs-recursive", "bfs-iterative"):
+            raise ValueError(f"Unknown algorithm '{request.algorithm}'")
+        bad_views = sorted(set(request.views) - set(VIEWS))
+        if bad_views:
+            raise ValueError(f"Unknown view(s): {', '.join(bad_views)}; expected {', '.join(VIEWS)}")
+        return request
+
+    def key(self) -> tuple:
+        # Только поля, от которых зависит сам граф
+        return (self.repository.rstrip("/"), self.package, self.version, self.max_depth, self.algorithm,
+                self.filter, self.include_dev, self.include_peer, self.include_optional, self.full_packuments)
+
+
+class GraphEntry:
+    """
+    Построенный граф и лениво вычисленные по нему ответы (порядок загрузки, циклы, сравнение с npm).
+    """
+
+    def __init__(self, graph: DependencyGraph, visited, elapsed: float, dependency_filter: DependencyFilter):
+        self.graph = graph
+        self.visited = visited
+        self.elapsed = elapsed
+        self.filter = dependency_filter
+        self.built_at = time.monotonic()
+        self._views: Dict[tuple, object] = {}
+        # Сравнение с npm само берёт порядок загрузки через view
+        self._lock = threading.RLock()
+
+    def view(self, name, compute: Optional[Callable[[], object]] = None):
+        with self._lock:
+            if name not in self._views:
+                self._views[name] = compute() if compute is not None else self._compute(name)
+            return self._views[name]
+
+    def _compute(self, name: str):
+        graph = self.graph
+        if name == "graph":
+            # Порядок узлов - порядок обхода, как у графа, построенного на месте
+            return {node: sorted(deps) for node, deps in graph.get_all_dependencies().items()}
+        if name == "visited":
+            return sorted(self.visited)
+        if name == "load_order":
+            return graph.get_load_order()
+        if name == "cycles":
+            return graph.find_cycles()
+        return graph.get_install_waves()
+
+
+class GraphStore:
+    """
+    LRU построенных графов с ограничением по числу и возрасту (ttl, секунды).
+    Одинаковые запросы, пришедшие во время построения, ждут его, а не обходят реестр повторно.
+    """
+
+    def __init__(self, max_graphs: int = 64, ttl: float = 300.0):
+        self.max_graphs = max_graphs
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._entries: "OrderedDict[tuple, GraphEntry]" = OrderedDict()
+        self._pending: Dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: tuple, build: Callable[[], GraphEntry]) -> Tuple[GraphEntry, bool]:
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry.built_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry, True
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+
+        entry = None
+        try:
+            entry = build()
+            return entry, False
+        finally:
+            with self._lock:
+                del self._pending[key]
+                if entry is not None:
+                    self.misses += 1
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_graphs:
+                        self._entries.popitem(last=False)
+                        self.evicted += 1
+            pending.set()
+
+    def summary(self) -> Dict[str, int]:
+        with self._lock:
+            return {"graphs": len(self._entries), "hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+
+class _DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class DepvisDaemon:
+    """
+    Долгоживущий процесс с тёплым состоянием: общий клиент реестра (соединения, дисковый кэш),
+    memo зависимостей и LRU построенных графов. Отвечает на запросы многих клиентов
+    параллельно по HTTP на localhost: POST /graph, GET /health, GET /stats, POST /shutdown.
+    Каждый запрос должен нести токен из файла token_file (заголовок X-Depvis-Token),
+    тела POST - только application/json.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, client: Optional[RegistryClient] = None,
+                 max_graphs: int = 64, ttl: float = 300.0, concurrency: int = 8,
+                 npm_cache_dir: Optional[str] = None, npm_command: Optional[List[str]] = None,
+                 token_file: Optional[str] = None):
+        self.client = client or RegistryClient(pool_size=max(8, concurrency))
+        # Зависимости в memo уже отобраны фильтром (peer/optional) - своё memo на каждое сочетание флагов
+        self._memos: Dict[Tuple[bool, bool], DependencyMemo] = {}
+        self.graphs = GraphStore(max_graphs, ttl)
+        self.concurrency = concurrency
+        self.npm_cache_dir = npm_cache_dir
+        self.npm_command = npm_command
+        self.token = secrets.token_hex(32)
+        self.started = time.monotonic()
+        self._comparators: Dict[Optional[str], NPMComparator] = {}
+        self._indexes_cleared = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = _DaemonServer(split_address(address), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+        # Порт мог быть выбран системой (":0") - файл токена называется по фактическому адресу
+        self.token_file = token_file or token_path(self.address)
+        try:
+            _write_token(self.token_file, self.token)
+        except OSError:
+            self._server.server_close()
+            raise
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def serve_forever(self):
+        logger.info("depvis daemon listening on %s", self.address)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.client.close()
+            if read_token(self.token_file) == self.token:
+                os.remove(self.token_file)
+
+    def start(self) -> "DepvisDaemon":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "DepvisDaemon":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def graph(self, payload: dict) -> dict:
+        request = GraphRequest.from_dict(payload)
+        started = time.perf_counter()
+        entry, cached = self.graphs.get_or_build(request.key(), lambda: self._build(request))
+        response = {
+            "service": SERVICE,
+            "cached": cached,
+            "elapsed_seconds": round(entry.elapsed, 6),
+            "filter": {
+                "pruned_edges": entry.filter.pruned_edges,
+                "pruned_packages": sorted(entry.filter.pruned_packages),
+            },
+        }
+        for name in request.views:
+            response[name] = entry.view(name)
+        if request.compare_with_npm:
+            response.update(self._compare(entry, request))
+        logger.info("%s %s@%s depth=%d: %d packages in %.3fs", "hit" if cached else "built", request.package,
+                    request.version, request.max_depth, len(entry.visited), time.perf_counter() - started)
+        return response
+
+    def _build(self, request: GraphRequest) -> GraphEntry:
+        self._refresh_indexes()
+        dependency_filter = DependencyFilter.parse(
+            request.filter, dev=request.include_dev, peer=request.include_peer, optional=request.include_optional
+        )
+        graph = DependencyGraph(client=self.client, memo=self._memo(request), abbreviated=not request.full_packuments,
+                                dependency_filter=dependency_filter)
+        started = time.perf_counter()
+        if request.algorithm == "bfs-recursive":
+            visited = graph.bfs_with_recursion(request.package, request.max_depth, request.repository,
+                                               version=request.version)
+        else:
+            visited = graph.bfs_concurrent(request.package, request.max_depth, request.repository,
+                                           self.concurrency, version=request.version)
+        return GraphEntry(graph, visited, time.perf_counter() - started, dependency_filter)
+
+    def _memo(self, request: GraphRequest) -> DependencyMemo:
+        # devDependencies корня в memo не попадают, так что include_dev своего memo не требует
+        flags = (request.include_peer, request.include_optional)
+        with self._lock:
+            memo = self._memos.get(flags)
+            if memo is None:
+                memo = self._memos[flags] = DependencyMemo()
+            return memo
+
+    def _refresh_indexes(self):
+        # Индексы версий живут не дольше ttl графов: новые публикации видны в следующих построениях
+        with self._lock:
+            if time.monotonic() - self._indexes_cleared > self.graphs.ttl:
+                for memo in self._memos.values():
+                    memo.clear_indexes()
+                self._indexes_cleared = time.monotonic()
+
+    def _compare(self, entry: GraphEntry, request: GraphRequest) -> dict:
+        with self._lock:
+            comparator = self._comparators.get(request.npm_lockfile)
+            if comparator is None:
+                comparator = self._comparators[request.npm_lockfile] = NPMComparator(
+                    npm_command=self.npm_command, lockfile=request.npm_lockfile, cache_dir=self.npm_cache_dir
+                )
+
+        def compute():
+            npm_order = comparator.get_actual_npm_install_order(request.package, request.version)
+            if not npm_order:
+                return {"comparison": None, "our_order": [], "npm_order": []}
+            our_order = [split_node_key(node)[0] for node in entry.view("load_order")]
+            comparison = comparator.compare_orders(our_order, npm_order)
+            return {
+                "comparison": {k: sorted(v) if isinstance(v, set) else v for k, v in comparison.items()},
+                "our_order": our_order,
+                "npm_order": npm_order,
+            }
+
+        return entry.view(("compare", request.npm_lockfile), compute)
+
+    def stats(self) -> dict:
+        memo = {"entries": 0, "indexes": 0, "hits": 0, "misses": 0}
+        with self._lock:
+            memos = list(self._memos.values())
+        for summary in (m.summary() for m in memos):
+            for name, value in summary.items():
+                memo[name] += value
+        return {
+            "service": SERVICE,
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.monotonic() - self.started, 3),
+            "graphs": self.graphs.summary(),
+            "memo": memo,
+            "http": self.client.summary(),
+        }
+
+    def _make_handler(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _authorized(self) -> bool:
+                token = self.headers.get(TOKEN_HEADER) or ""
+                if hmac.compare_digest(token.encode("utf-8"), daemon.token.encode("utf-8")):
+                    return True
+                self._send(403, {"error": "Missing or invalid daemon token"})
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path == "/health":
+                    self._send(200, {"service": SERVICE, "pid": os.getpid()})
+                elif self.path == "/stats":
+                    self._send(200, daemon.stats())
+                else:
+                    self._send(404, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+                if content_type != "application/json":
+                    self._send(415, {"error": "Request body must be application/json"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                    if self.path == "/graph":
+                        self._send(200, daemon.graph(payload))
+                    elif self.path == "/shutdown":
+                        self._send(200, {"service": SERVICE, "stopping": True})
+                        threading.Thread(target=daemon._server.shutdown, daemon=True).start()
+                    else:
+                        self._send(404, {"error": f"Unknown path {self.path}"})
+                except (ValueError, TypeError) as e:
+                    self._send(400, {"error": str(e)})
+                except Exception as e:
+                    logger.exception("Request %s failed", self.path)
+                    self._send(500, {"error": str(e)})
+
+            def _send(self, status: int, document: dict):
+                body = json.dumps(document).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+        return Handler
+
+
+class DaemonClient:
+    """
+    Тонкий клиент демона. Если демон не запущен (нет файла токена или соединение отклонено),
+    методы возвращают None - вызывающий строит граф сам.
+    """
+
+    def __init__(self, address: Optional[str] = None, connect_timeout: float = 0.2, token: Optional[str] = None):
+        self.address = daemon_address(address)
+        self.connect_timeout = connect_timeout
+        self.token = token
+
+    def _call(self, method: str, path: str, payload: Optional[dict] = None) -> Optional[dict]:
+        token = self.token or read_token(token_path(self.address))
+        if token is None:
+            return None
+        host, port = split_address(self.address)
+        connection = http.client.HTTPConnection(host, port, timeout=self.connect_timeout)
+        try:
+            try:
+                connection.connect()
+            except OSError:
+                return None
+            # Построение графа может идти минутами: после соединения ждём без таймаута
+            connection.sock.settimeout(None)
+            body = json.dumps(payload).encode("utf-8") if payload is not None else None
+            headers = {TOKEN_HEADER: token}
+            if body is not None:
+                headers["Content-Type"] = "application/json"
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise RuntimeError(f"depvis daemon at {self.address} failed: {e}") from e
+        finally:
+            connection.close()
+
+        try:
+            document = json.loads(raw)
+        except ValueError:
+            document = None
+        if not isinstance(document, dict) or (response.status == 200 and document.get("service") != SERVICE):
+            raise RuntimeError(f"{self.address} is not a depvis daemon (HTTP {response.status})")
+        if response.status != 200:
+            raise RuntimeError(f"depvis daemon: {document.get('error', f'HTTP {response.status}')}")
+        return document
+
+    def graph(self, request: GraphRequest) -> Optional[dict]:
+        return self._call("POST", "/graph", asdict(request))
+
+    def stats(self) -> Optional[dict]:
+        return self._call("GET", "/stats")
+
+    def shutdown(self) -> Optional[dict]:
+        return self._call("POST", "/shutdown", {})
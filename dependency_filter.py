@@ -0,0 +1,114 @@
+import fnmatch
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+_SPLIT_RE = re.compile(r"[,\s]+")
+
+
+def _compile(pattern: str) -> Callable[[str], bool]:
+    if pattern.startswith("re:"):
+        return re.compile(pattern[3:]).search
+    if pattern.startswith("@") and "/" not in pattern:
+        # "@scope" - все пакеты scope
+        prefix = pattern + "/"
+        return lambda name: name.startswith(prefix)
+    if any(char in pattern for char in "*?["):
+        return lambda name: fnmatch.fnmatchcase(name, pattern)
+    return pattern.__eq__
+
+
+class DependencyFilter:
+    """
+    Фильтр зависимостей, применяемый при постановке в очередь обхода: исключённые пакеты
+    не загружаются, и их поддеревья не обходятся.
+    Шаблоны: glob ("eslint-*"), регулярное выражение ("re:^@types/"), scope ("@babel"), точное имя;
+    "!" перед шаблоном - исключение. Если есть включающие шаблоны, проходят только подходящие под них.
+    """
+
+    def __init__(self, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                 dev: bool = False, peer: bool = False, optional: bool = True):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.dev = dev
+        self.peer = peer
+        self.optional = optional
+        self._include = [_compile(p) for p in self.include]
+        self._exclude = [_compile(p) for p in self.exclude]
+        self._allowed: Dict[str, bool] = {}
+        self.pruned_edges = 0
+        self.pruned_packages: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, text: str, dev: bool = False, peer: bool = False, optional: bool = True) -> "DependencyFilter":
+        """
+        Строка фильтра из конфигурации или --filter: шаблоны через запятую или пробел.
+        """
+        include, exclude = [], []
+        for token in _SPLIT_RE.split(text or ""):
+            if not token:
+                continue
+            if token.startswith("!"):
+                exclude.append(token[1:])
+            else:
+                include.append(token)
+        try:
+            return cls(include, exclude, dev, peer, optional)
+        except re.error as e:
+            raise ValueError(f"Invalid filter pattern: {e}") from e
+
+    def allows(self, name: str) -> bool:
+        allowed = self._allowed.get(name)
+        if allowed is None:
+            allowed = not any(match(name) for match in self._exclude)
+            if allowed and self._include:
+                allowed = any(match(name) for match in self._include)
+            self._allowed[name] = allowed
+        return allowed
+
+    def prune(self, dependencies: Dict[str, str]) -> Dict[str, str]:
+        """
+        Оставляет разрешённые зависимости и считает отброшенные рёбра и пакеты.
+        """
+        if not self._include and not self._exclude:
+            return dependencies
+        kept = {}
+        dropped = []
+        for name, spec in dependencies.items():
+            if self.allows(name):
+                kept[name] = spec
+            else:
+                dropped.append(name)
+        if dropped:
+            with self._lock:
+                self.pruned_edges += len(dropped)
+                self.pruned_packages.update(dropped)
+        return kept
+
+    def select(self, version_data: dict, root: bool = False) -> Dict[str, str]:
+        """
+        Набор зависимостей версии с учётом переключателей dev/peer/optional.
+        В packument optionalDependencies продублированы в dependencies, в lockfile - нет,
+        поэтому они добавляются или вычитаются явно.
+        """
+        dependencies = dict(version_data.get("dependencies") or {})
+        for name, spec in (version_data.get("optionalDependencies") or {}).items():
+            if self.optional:
+                dependencies.setdefault(name, spec)
+            else:
+                dependencies.pop(name, None)
+        if self.peer:
+            for name, spec in (version_data.get("peerDependencies") or {}).items():
+                dependencies.setdefault(name, spec)
+        if self.dev and root:
+            for name, spec in (version_data.get("devDependencies") or {}).items():
+                dependencies.setdefault(name, spec)
+        return dependencies
+
+    def format_stats(self) -> str:
+        return (
+            f"Filter stats: pruned {self.pruned_edges} edge(s) to {len(self.pruned_packages)} package(s); "
+            f"at least {len(self.pruned_packages)} registry fetch(es) avoided"
+        )
+
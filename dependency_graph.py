@@ -1,9 +1,27 @@
-from typing import Dict, Set, Optional, List
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import repeat
+from typing import Dict, Set, Optional, List, Tuple
+
+from dependency_filter import DependencyFilter
+from graph_algorithms import find_cycles, install_waves, topological_batches
+from metadata_cache import DependencyMemo
+from profiling import phase
+from registry_client import RegistryClient, default_client
+
+logger = logging.getLogger(__name__)
 
 
 class DependencyGraph:
-    def __init__(self):
+    def __init__(self, client: Optional[RegistryClient] = None,
+                 memo: Optional[DependencyMemo] = None, abbreviated: bool = True,
+                 dependency_filter: Optional[DependencyFilter] = None):
         self.graph: Dict[str, Set[str]] = {}
+        self.client = client or default_client()
+        self.abbreviated = abbreviated
+        self.memo = memo if memo is not None else DependencyMemo()
+        self.filter = dependency_filter if dependency_filter is not None else DependencyFilter()
     
     def add_dependency(self, package: str, dependency: str):
         if package not in self.graph:
@@ -11,143 +29,306 @@ class DependencyGraph:
         if dependency:
             self.graph[package].add(dependency)
     
-    def bfs_with_recursion(self, start_package: str, max_depth: int, repository_url: str, current_depth: int = 0, visited: Optional[Set[str]] = None) -> Set[str]:
+    def bfs_with_recursion(self, start_package: str, max_depth: int, repository_url: str, current_depth: int = 0,
+                           visited: Optional[Set[str]] = None, version: str = "latest") -> Set[str]:
+        """
+        Рекурсивный обход; узлы графа - "name@version", версии разрешаются по диапазонам semver.
+        """
         if visited is None:
             visited = set()
         
+        # Отступы и строки трассировки строятся только при включённом DEBUG
+        verbose = logger.isEnabledFor(logging.DEBUG)
+        indent = "  " * current_depth if verbose else ""
+        
         if current_depth >= max_depth:
-            print(f"{'  ' * current_depth}Max depth reached for {start_package}")
+            if verbose:
+                logger.debug("%sMax depth reached for %s", indent, start_package)
             return visited
         
-        if start_package in visited:
-            print(f"{'  ' * current_depth}Cyclic dependency detected: {start_package}")
+        try:
+            node, dependencies = self._resolve(start_package, version, repository_url, root=current_depth == 0)
+        except Exception as e:
+            logger.warning("%sError processing %s@%s: %s", indent, start_package, version, e)
             return visited
         
-        visited.add(start_package)
-        print(f"{'  ' * current_depth}Processing {start_package} (depth: {current_depth})")
+        if node in visited:
+            if verbose:
+                logger.debug("%sCyclic dependency detected: %s", indent, node)
+            return visited
         
-        try:
-            from npm_parser import fetch_npm_metadata, extract_dependencies
-            
-            metadata = fetch_npm_metadata(start_package, "latest", repository_url)
-            dependencies = extract_dependencies(metadata)
+        visited.add(node)
+        # Отфильтрованные зависимости не загружаются и не обходятся
+        dependencies = self.filter.prune(dependencies)
+        if verbose:
+            logger.debug("%sProcessing %s (depth: %d)", indent, node, current_depth)
+            logger.debug("%sDependencies found: %d", indent, len(dependencies))
+        
+        for dep_name, dep_spec in dependencies.items():
+            try:
+                child, _ = self._resolve(dep_name, dep_spec, repository_url)
+            except Exception as e:
+                logger.warning("%sError processing %s@%s: %s", indent, dep_name, dep_spec, e)
+                self.add_dependency(node, f"{dep_name}@{dep_spec}")
+                continue
             
-            print(f"{'  ' * current_depth}Dependencies found: {len(dependencies)}")
+            self.add_dependency(node, child)
+            if verbose:
+                logger.debug("%s+ %s", indent, child)
             
-            for dep_name, dep_version in dependencies.items():
-                self.add_dependency(start_package, dep_name)
-                print(f"{'  ' * current_depth}+ {dep_name}")
-                
-                if dep_name not in visited:
-                    self.bfs_with_recursion(
-                        dep_name, max_depth, repository_url, 
-                        current_depth + 1, visited
-                    )
-                else:
-                    print(f"{'  ' * current_depth}Already visited: {dep_name}")
-                    
+            if child not in visited:
+                self.bfs_with_recursion(
+                    dep_name, max_depth, repository_url,
+                    current_depth + 1, visited, dep_spec
+                )
+            elif verbose:
+                logger.debug("%sAlready visited: %s", indent, child)
+        
+        return visited
+    
+    def bfs_concurrent(self, start_package: str, max_depth: int, repository_url: str, concurrency: int = 8,
+                       version: str = "latest") -> Set[str]:
+        """
+        Поуровневый BFS: все пакеты текущего фронтира разрешаются параллельно
+        (не более concurrency одновременных запросов к реестру).
+        """
+        visited: Set[str] = set()
+        if max_depth <= 0:
+            return visited
+        
+        try:
+            root, root_dependencies = self._resolve(start_package, version, repository_url, root=True)
         except Exception as e:
-            print(f"{'  ' * current_depth}Error processing {start_package}: {e}")
+            logger.warning("Error processing %s@%s: %s", start_package, version, e)
+            return visited
         
+        visited.add(root)
+        self.expand_levels([(root, self.filter.prune(root_dependencies))], visited, max_depth, repository_url, concurrency)
         return visited
     
+    def expand_levels(self, frontier: List[Tuple[str, Dict[str, str]]], visited: Set[str], max_depth: int,
+                      repository_url: str, concurrency: int = 8, depth: int = 0):
+        """
+        Общая очередь поуровневого обхода: frontier - уже посещённые узлы глубины depth с их зависимостями.
+        Узлы нескольких корней в одном фронтире разрешаются одними запросами и раскрываются один раз.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            while frontier:
+                # Все спецификаторы одного пакета разрешаются одним запросом
+                requests: Dict[str, Set[str]] = {}
+                for _, dependencies in frontier:
+                    for dep_name, dep_spec in dependencies.items():
+                        requests.setdefault(dep_name, set()).add(dep_spec)
+                
+                logger.info("Level %d: %d packages, resolving %d dependencies", depth, len(frontier), len(requests))
+                results = self._resolve_level(pool, requests, repository_url)
+                
+                next_frontier = []
+                for node, dependencies in frontier:
+                    for dep_name, dep_spec in dependencies.items():
+                        child, child_dependencies = results[dep_name][dep_spec]
+                        self.add_dependency(node, child)
+                        if depth + 1 < max_depth and child not in visited and child_dependencies is not None:
+                            visited.add(child)
+                            next_frontier.append((child, self.filter.prune(child_dependencies)))
+                
+                frontier = next_frontier
+                depth += 1
+    
+    def _resolve_level(self, pool: ThreadPoolExecutor, requests: Dict[str, Set[str]],
+                       repository_url: str) -> Dict[str, Dict[str, Tuple[str, Optional[Dict[str, str]]]]]:
+        """
+        Разрешает все пакеты одного уровня: name -> spec -> (узел, зависимости или None).
+        Точка расширения для обхода рабочими процессами.
+        """
+        names = sorted(requests)
+        return dict(zip(names, pool.map(
+            self._resolve_many_safe, names, (requests[n] for n in names), repeat(repository_url)
+        )))
+    
+    def _resolve(self, package: str, spec: str, repository_url: str, root: bool = False) -> Tuple[str, Dict[str, str]]:
+        node, dependencies = self._resolve_many(package, [spec], repository_url, root)[spec]
+        if dependencies is None:
+            raise RuntimeError(f"No version of '{package}' satisfies '{spec}'")
+        return node, dependencies
+    
+    def _resolve_many_safe(self, package: str, specs: Set[str], repository_url: str) -> Dict[str, Tuple[str, Optional[Dict[str, str]]]]:
+        try:
+            result = self._resolve_many(package, list(specs), repository_url)
+        except Exception as e:
+            logger.warning("Error processing %s: %s", package, e)
+            return {spec: (f"{package}@{spec}", None) for spec in specs}
+        
+        for spec, (_, dependencies) in result.items():
+            if dependencies is None:
+                logger.warning("Error processing %s: no version satisfies '%s'", package, spec)
+        return result
+    
+    def _resolve_many(self, package: str, specs: List[str], repository_url: str,
+                      root: bool = False) -> Dict[str, Tuple[str, Optional[Dict[str, str]]]]:
+        """
+        spec -> ("name@version", прямые зависимости) через memo; в памяти остаются
+        только индекс версий и зависимости версий, а не packument.
+        Для неразрешимого spec зависимости равны None.
+        """
+        from npm_parser import node_key
+        
+        registry = repository_url.rstrip('/')
+        result = {}
+        missing = []
+        # devDependencies берутся только у корня - такие зависимости в общий memo не кладём
+        private = root and self.filter.dev
+        
+        index = self.memo.get_index(registry, package)
+        for spec in specs:
+            version = index.resolve(spec) if index is not None else None
+            if private:
+                dependencies = None
+            elif version is None:
+                self.memo.record_miss()
+                dependencies = None
+            else:
+                dependencies = self.memo.get((registry, package, version))
+            if dependencies is None:
+                missing.append(version if version is not None and index is not None else spec)
+            else:
+                result[spec] = (node_key(package, version), dependencies)
+        
+        if missing:
+            resolution = self._fetch_resolution(package, missing, repository_url, root)
+            self.memo.put_index(registry, package, resolution.index)
+            if not private:
+                self.memo.put_versions(registry, package, resolution.dependencies)
+            
+            for spec in specs:
+                if spec in result:
+                    continue
+                version = resolution.index.resolve(spec)
+                if version is None or version not in resolution.dependencies:
+                    result[spec] = (f"{package}@{spec}", None)
+                else:
+                    result[spec] = (node_key(package, version), resolution.dependencies[version])
+        
+        return result
+    
+    def _fetch_resolution(self, package: str, specs: List[str], repository_url: str, root: bool = False):
+        """
+        Один запрос packument на пакет; точка расширения для инкрементального обхода.
+        """
+        from npm_parser import resolve_npm_package
+        
+        return resolve_npm_package(package, specs, repository_url, self.client, self.abbreviated,
+                                   partial(self.filter.select, root=root))
+    
     def bfs_test_mode(self, start_package: str, max_depth: int, test_repo: Dict[str, Set[str]], current_depth: int = 0, visited: Optional[Set[str]] = None) -> Set[str]:
         if visited is None:
             visited = set()
         
+        verbose = logger.isEnabledFor(logging.DEBUG)
+        indent = "  " * current_depth if verbose else ""
+        
         if current_depth >= max_depth:
-            print(f"{'  ' * current_depth}Max depth reached for {start_package}")
+            if verbose:
+                logger.debug("%sMax depth reached for %s", indent, start_package)
             return visited
         
         if start_package in visited:
-            print(f"{'  ' * current_depth}Cyclic dependency detected: {start_package}")
+            if verbose:
+                logger.debug("%sCyclic dependency detected: %s", indent, start_package)
             return visited
         
         visited.add(start_package)
-        print(f"{'  ' * current_depth}Processing {start_package} (depth: {current_depth})")
-        
-        dependencies = test_repo.get(start_package, set())
-        
-        print(f"{'  ' * current_depth}Dependencies found: {len(dependencies)}")
+        dependencies = list(self.filter.prune(dict.fromkeys(test_repo.get(start_package, ()), "")))
+        if verbose:
+            logger.debug("%sProcessing %s (depth: %d)", indent, start_package, current_depth)
+            logger.debug("%sDependencies found: %d", indent, len(dependencies))
         
         for dep_name in dependencies:
             self.add_dependency(start_package, dep_name)
-            print(f"{'  ' * current_depth}+ {dep_name}")
+            if verbose:
+                logger.debug("%s+ %s", indent, dep_name)
             
             if dep_name not in visited:
                 self.bfs_test_mode(
                     dep_name, max_depth, test_repo,
                     current_depth + 1, visited
                 )
-            else:
-                print(f"{'  ' * current_depth}Already visited: {dep_name}")
+            elif verbose:
+                logger.debug("%sAlready visited: %s", indent, dep_name)
         
         return visited
     
     def get_load_order(self) -> List[str]:
         """
         Возвращает порядок загрузки зависимостей (топологическая сортировка).
+        Циклы не прерывают расчёт: пакеты одного цикла идут подряд одной партией.
         """
-        visited = set()
-        temp_visited = set()
-        result = []
-        
-        def visit(node: str):
-            if node in temp_visited:
-                raise RuntimeError(f"Cyclic dependency detected at node: {node}")
-            if node in visited:
-                return
-                
-            temp_visited.add(node)
-            
-            # Рекурсивно посещаем все зависимости
-            if node in self.graph:
-                for neighbor in sorted(self.graph[node]):
-                    visit(neighbor)
-            
-            temp_visited.remove(node)
-            visited.add(node)
-            result.append(node)
-        
-        # Посещаем все узлы графа
-        for node in sorted(self.graph.keys()):
-            if node not in visited:
-                visit(node)
-        
-        return result
+        return [node for batch in self.get_load_batches() for node in batch]
+    
+    def get_load_batches(self) -> List[List[str]]:
+        """
+        Порядок загрузки по партиям: каждая партия - пакет или целый цикл (Кан по конденсации).
+        """
+        empty: Set[str] = set()
+        with phase("load_order"):
+            return topological_batches(self.graph, lambda node: self.graph.get(node, empty))
+    
+    def get_install_waves(self) -> List[List[str]]:
+        """
+        Волны установки: пакеты одной волны не зависят друг от друга и ставятся параллельно.
+        """
+        empty: Set[str] = set()
+        with phase("install_waves"):
+            return install_waves(self.graph, lambda node: self.graph.get(node, empty))
     
     def print_load_order(self):
         """
         Выводит порядок загрузки зависимостей.
         """
-        try:
-            load_order = self.get_load_order()
-            print("\nDependency load order:")
-            for i, package in enumerate(load_order, 1):
-                print(f"  {i:2d}. {package}")
-        except RuntimeError as e:
-            print(f"\nError in load order calculation: {e}")
+        print("\nDependency load order:")
+        i = 0
+        for batch in self.get_load_batches():
+            for package in batch:
+                i += 1
+                if len(batch) > 1:
+                    print(f"  {i:2d}. {package}  (cycle: {', '.join(batch)})")
+                else:
+                    print(f"  {i:2d}. {package}")
+    
+    def print_install_waves(self):
+        """
+        Выводит волны параллельной установки.
+        """
+        waves = self.get_install_waves()
+        print(f"\nInstall waves: {len(waves)}")
+        for i, wave in enumerate(waves, 1):
+            print(f"  wave {i:2d} [{len(wave)}]: {', '.join(wave)}")
     
     def get_all_dependencies(self) -> Dict[str, Set[str]]:
         return self.graph
     
     def has_cycles(self) -> bool:
-        def dfs(node: str, path: Set[str]) -> bool:
-            if node in path:
-                return True
-            if node not in self.graph:
-                return False
-            
-            path.add(node)
-            for neighbor in self.graph[node]:
-                if dfs(neighbor, path.copy()):
-                    return True
-            return False
-        
-        for node in self.graph:
-            if dfs(node, set()):
-                return True
-        return False
+        return bool(self.find_cycles())
+    
+    def find_cycles(self) -> List[List[str]]:
+        """
+        Все циклы графа как компоненты сильной связности (итеративный Тарьян, O(V+E)).
+        """
+        empty: Set[str] = set()
+        with phase("cycles"):
+            return find_cycles(self.graph, lambda node: self.graph.get(node, empty))
+    
+    def print_cycles(self):
+        """
+        Выводит отчёт по группам циклов.
+        """
+        cycles = self.find_cycles()
+        if not cycles:
+            print("\nCycle report: no cycles found.")
+            return
+        print(f"\nCycle report: {len(cycles)} cycle group(s)")
+        for i, group in enumerate(cycles, 1):
+            print(f"  {i:2d}. [{len(group)}] {' <-> '.join(group)}")
     
     def print_graph(self):
         if not self.graph:
@@ -0,0 +1,19 @@
+from depvis_nuget.nupkg import (
+    NuGetFolderSource,
+    NuspecInfo,
+    normalize_framework,
+    parse_nuspec,
+    read_nuspec,
+    resolve_nuget_version,
+    scan_folder,
+)
+
+__all__ = [
+    "NuGetFolderSource",
+    "NuspecInfo",
+    "normalize_framework",
+    "parse_nuspec",
+    "read_nuspec",
+    "resolve_nuget_version",
+    "scan_folder",
+]
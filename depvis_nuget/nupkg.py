@@ -0,0 +1,313 @@
+import logging
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+# Меньше этого числа архивов запуск процессов дороже самого разбора
+PARALLEL_THRESHOLD = 64
+
+NuGetKey = Tuple[Tuple[int, int, int, int], int, Tuple[Tuple[int, object], ...]]
+
+_FRAMEWORK_RE = re.compile(r"^\.?(netframework|netstandard|netcoreapp|net)(\d+(?:\.\d+)*)$")
+
+
+@dataclass
+class NuspecInfo:
+    """
+    Содержимое .nuspec, нужное для графа: id, версия и группы зависимостей
+    по целевым фреймворкам ("" - группа без targetFramework).
+    """
+    id: str
+    version: str
+    groups: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    path: str = ""
+
+    def dependencies(self, framework: Optional[str] = None) -> Dict[str, str]:
+        """
+        Зависимости для фреймворка: точная группа, иначе общая группа;
+        без фреймворка - объединение всех групп.
+        """
+        if framework is None:
+            merged: Dict[str, str] = {}
+            for group in self.groups.values():
+                merged.update(group)
+            return merged
+        wanted = normalize_framework(framework)
+        for name, group in self.groups.items():
+            if name and normalize_framework(name) == wanted:
+                return group
+        return self.groups.get("", {})
+
+
+def normalize_framework(name: str) -> str:
+    """
+    ".NETStandard2.0" -> "netstandard2.0", ".NETFramework4.5" -> "net45", "net6.0" -> "net6.0".
+    """
+    text = name.strip().lower()
+    match = _FRAMEWORK_RE.match(text)
+    if not match:
+        return text
+    family, version = match.groups()
+    if family == "netframework" or (family == "net" and "." not in version and len(version) > 1):
+        return "net" + version.replace(".", "")
+    return family + version
+
+
+def _local(tag: str) -> str:
+    # У разных ревизий схемы nuspec разные пространства имён - сравниваем локальные имена
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find_nuspec(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    for info in archive.infolist():
+        if "/" not in info.filename and info.filename.lower().endswith(".nuspec"):
+            return info
+    raise RuntimeError("No .nuspec found in package root")
+
+
+def parse_nuspec(stream) -> NuspecInfo:
+    """
+    Потоково разбирает .nuspec (iterparse) и останавливается на конце <metadata>,
+    сохраняя только id, version и зависимости.
+    """
+    package_id = version = ""
+    groups: Dict[str, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+    path: List[str] = []
+
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        tag = _local(element.tag)
+        if event == "start":
+            path.append(tag)
+            if tag == "group" and len(path) >= 2 and path[-2] == "dependencies":
+                current = groups.setdefault(element.get("targetFramework", ""), {})
+            elif tag == "dependency" and path[-2:-1] == ["dependencies"]:
+                # Старый формат: зависимости без групп
+                current = groups.setdefault("", {})
+            continue
+
+        path.pop()
+        if tag == "dependency" and current is not None:
+            dependency_id = element.get("id")
+            if dependency_id:
+                current[dependency_id] = element.get("version", "")
+        elif tag == "group":
+            current = None
+        elif tag == "id" and path[-1:] == ["metadata"]:
+            package_id = (element.text or "").strip()
+        elif tag == "version" and path[-1:] == ["metadata"]:
+            version = (element.text or "").strip()
+        elif tag == "metadata":
+            break
+        element.clear()
+
+    if not package_id or not version:
+        raise RuntimeError("nuspec has no <id> or <version>")
+    return NuspecInfo(package_id, version, groups)
+
+
+def read_nuspec(path: str) -> NuspecInfo:
+    """
+    Читает из .nupkg только .nuspec: центральный каталог zip даёт смещение записи,
+    остальные файлы (lib/*.dll, *.xml) не распаковываются и даже не читаются.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            with archive.open(_find_nuspec(archive)) as stream:
+                info = parse_nuspec(stream)
+    except (OSError, zipfile.BadZipFile, ET.ParseError) as e:
+        raise RuntimeError(f"Failed to read {path}: {e}") from e
+    info.path = path
+    return info
+
+
+def _read_nuspec_safe(path: str) -> Tuple[str, Optional[NuspecInfo], Optional[str]]:
+    try:
+        return path, read_nuspec(path), None
+    except RuntimeError as e:
+        return path, None, str(e)
+
+
+def find_packages(folder: str) -> List[str]:
+    """
+    Все .nupkg в папке, включая вложенную раскладку кэша NuGet (<id>/<version>/*.nupkg).
+    """
+    paths = []
+    for root, _dirs, files in os.walk(folder):
+        for name in files:
+            if name.lower().endswith(".nupkg"):
+                paths.append(os.path.join(root, name))
+    paths.sort()
+    return paths
+
+
+def scan_folder(folder: str, workers: Optional[int] = None) -> List[NuspecInfo]:
+    """
+    Индексирует папку .nupkg; при большом числе архивов разбор идёт в пуле процессов.
+    Повреждённые архивы пропускаются с предупреждением.
+    """
+    paths = find_packages(folder)
+    if workers == 1 or len(paths) < PARALLEL_THRESHOLD:
+        results: Iterable = map(_read_nuspec_safe, paths)
+        return _collect(results)
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return _collect(pool.map(_read_nuspec_safe, paths, chunksize=chunksize))
+
+
+def _collect(results) -> List[NuspecInfo]:
+    packages = []
+    for path, info, error in results:
+        if info is None:
+            logger.warning("Skipping %s: %s", path, error)
+        else:
+            packages.append(info)
+    return packages
+
+
+def nuget_version_key(version: str) -> Optional[NuGetKey]:
+    """
+    Ключ сравнения версии NuGet (до 4 числовых частей, prerelease ниже релиза).
+    """
+    text = version.strip().split("+", 1)[0]
+    release, _, prerelease = text.partition("-")
+    try:
+        numbers = [int(part) for part in release.split(".")]
+    except ValueError:
+        return None
+    if not 1 <= len(numbers) <= 4:
+        return None
+    numbers += [0] * (4 - len(numbers))
+    labels = tuple((0, int(p)) if p.isdigit() else (1, p.lower()) for p in prerelease.split(".")) if prerelease else ()
+    return tuple(numbers), 0 if prerelease else 1, labels
+
+
+def parse_version_range(spec: str):
+    """
+    Диапазон NuGet: "1.0" (>= 1.0), "[1.0]", "[1.0,2.0)", "(,1.0]" и т.п.
+    Возвращает (нижняя, включительно, верхняя, включительно); None - нет границы.
+    """
+    text = spec.strip()
+    if not text:
+        return None, True, None, True
+    if text[0] not in "[(":
+        return nuget_version_key(text), True, None, True
+    if text[-1] not in "])":
+        raise ValueError(f"Invalid version range: '{spec}'")
+
+    inner = text[1:-1]
+    if "," not in inner:
+        exact = nuget_version_key(inner)
+        return exact, True, exact, True
+    low, high = (part.strip() for part in inner.split(",", 1))
+    return (nuget_version_key(low) if low else None, text[0] == "[",
+            nuget_version_key(high) if high else None, text[-1] == "]")
+
+
+def resolve_nuget_version(versions: Iterable[str], spec: str) -> Optional[str]:
+    """
+    Как NuGet: наименьшая доступная версия, попадающая в диапазон.
+    """
+    low, low_inclusive, high, high_inclusive = parse_version_range(spec)
+    best = None
+    for version in versions:
+        key = nuget_version_key(version)
+        if key is None:
+            continue
+        if low is not None and (key < low or (key == low and not low_inclusive)):
+            continue
+        if high is not None and (key > high or (key == high and not high_inclusive)):
+            continue
+        if best is None or key < best[0]:
+            best = (key, version)
+    return best[1] if best else None
+
+
+class NuGetFolderSource:
+    """
+    Локальный источник пакетов NuGet: индекс id (без учёта регистра) -> версия -> nuspec.
+    """
+
+    def __init__(self, packages: Iterable[NuspecInfo]):
+        self.packages: Dict[str, Dict[str, NuspecInfo]] = {}
+        for info in packages:
+            self.packages.setdefault(info.id.lower(), {})[info.version] = info
+
+    @classmethod
+    def from_folder(cls, folder: str, workers: Optional[int] = None) -> "NuGetFolderSource":
+        return cls(scan_folder(folder, workers))
+
+    def __len__(self) -> int:
+        return sum(len(versions) for versions in self.packages.values())
+
+    def resolve(self, package: str, spec: str = "") -> Optional[NuspecInfo]:
+        """
+        Пакет по id и диапазону; пустой spec или "latest" - наибольшая локальная версия.
+        """
+        versions = self.packages.get(package.lower())
+        if not versions:
+            return None
+        if spec in ("", "latest"):
+            return versions[max(versions, key=lambda v: nuget_version_key(v) or ((0, 0, 0, 0), 0, ()))]
+        try:
+            version = resolve_nuget_version(versions, spec)
+        except ValueError:
+            return None
+        return versions.get(version) if version is not None else None
+
+    def roots(self) -> List[NuspecInfo]:
+        return [info for versions in self.packages.values() for info in versions.values()]
+
+    def build_graph(self, package: Optional[str], max_depth: int, framework: Optional[str] = None,
+                    version: str = "latest", graph: Optional[DependencyGraph] = None,
+                    dependency_filter: Optional[DependencyFilter] = None) -> Tuple[DependencyGraph, Set[str]]:
+        """
+        Обход в ширину от package (или от всех пакетов папки, если он не задан).
+        Узлы - "Id@version"; отсутствующие локально зависимости остаются листьями "Id@диапазон".
+        """
+        graph = graph if graph is not None else DependencyGraph()
+        dependency_filter = dependency_filter or graph.filter
+        visited: Set[str] = set()
+        if max_depth <= 0:
+            return graph, visited
+        if package is None:
+            frontier = self.roots()
+        else:
+            root = self.resolve(package, version)
+            if root is None:
+                raise RuntimeError(f"Package '{package}' ({version}) not found in the NuGet folder")
+            frontier = [root]
+
+        for info in frontier:
+            visited.add(f"{info.id}@{info.version}")
+        depth = 0
+        while frontier and depth < max_depth:
+            next_frontier = []
+            for info in frontier:
+                node = f"{info.id}@{info.version}"
+                graph.add_dependency(node, "")
+                for dependency_id, spec in sorted(dependency_filter.prune(info.dependencies(framework)).items()):
+                    child = self.resolve(dependency_id, spec)
+                    if child is None:
+                        logger.debug("Not in folder: %s %s", dependency_id, spec)
+                        graph.add_dependency(node, f"{dependency_id}@{spec}")
+                        continue
+                    child_node = f"{child.id}@{child.version}"
+                    graph.add_dependency(node, child_node)
+                    if depth + 1 < max_depth and child_node not in visited:
+                        visited.add(child_node)
+                        next_frontier.append(child)
+            frontier = next_frontier
+            depth += 1
+        return graph, visited
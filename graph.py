@@ -2,6 +2,8 @@ from typing import Dict, Set, List, Optional
 from collections import deque
 import json
 
+from graph_algorithms import find_cycles
+
 
 class DependencyGraph:
     def __init__(self):
@@ -59,19 +61,9 @@ class DependencyGraph:
     
     def has_cycles(self) -> bool:
         """Проверка на наличие циклов в графе."""
-        def dfs(node, path):
-            if node in path:
-                return True
-            if node not in self.graph:
-                return False
-            
-            path.add(node)
-            for neighbor in self.graph[node]:
-                if dfs(neighbor, path.copy()):
-                    return True
-            return False
-        
-        for node in self.graph:
-            if dfs(node, set()):
-                return True
-        return False
\ No newline at end of file
+        return bool(self.find_cycles())
+    
+    def find_cycles(self) -> List[List[str]]:
+        """Группы циклов (компоненты сильной связности) за O(V+E)."""
+        empty: Set[str] = set()
+        return find_cycles(self.graph, lambda node: self.graph.get(node, empty))
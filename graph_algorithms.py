@@ -0,0 +1,146 @@
+import heapq
+from typing import Callable, Dict, Hashable, Iterable, List, TypeVar
+
+Node = TypeVar("Node", bound=Hashable)
+
+
+def strongly_connected_components(nodes: Iterable[Node], successors: Callable[[Node], Iterable[Node]]) -> List[List[Node]]:
+    """
+    Итеративный алгоритм Тарьяна за O(V+E) без рекурсии.
+    Компоненты возвращаются в обратном топологическом порядке (сначала те, от кого никто не зависит дальше).
+    """
+    index: Dict[Node, int] = {}
+    lowlink: Dict[Node, int] = {}
+    on_stack = set()
+    stack: List[Node] = []
+    components: List[List[Node]] = []
+    counter = 0
+
+    for root in nodes:
+        if root in index:
+            continue
+
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+
+        while work:
+            node, neighbors = work[-1]
+            descended = False
+            for neighbor in neighbors:
+                if neighbor not in index:
+                    index[neighbor] = lowlink[neighbor] = counter
+                    counter += 1
+                    stack.append(neighbor)
+                    on_stack.add(neighbor)
+                    work.append((neighbor, iter(successors(neighbor))))
+                    descended = True
+                    break
+                if neighbor in on_stack and index[neighbor] < lowlink[node]:
+                    lowlink[node] = index[neighbor]
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if lowlink[node] < lowlink[parent]:
+                    lowlink[parent] = lowlink[node]
+
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def find_cycles(nodes: Iterable[Node], successors: Callable[[Node], Iterable[Node]]) -> List[List[Node]]:
+    """
+    Группы циклов: компоненты сильной связности из нескольких узлов и узлы с петлёй.
+    Узлы в группе и сами группы отсортированы.
+    """
+    cycles = []
+    for component in strongly_connected_components(nodes, successors):
+        if len(component) > 1:
+            cycles.append(sorted(component))
+        else:
+            node = component[0]
+            if node in successors(node):
+                cycles.append(component)
+    cycles.sort()
+    return cycles
+
+
+def condensation(nodes: Iterable[Node], successors: Callable[[Node], Iterable[Node]]):
+    """
+    Сжимает каждую компоненту сильной связности в одну вершину.
+    Возвращает (компоненты с отсортированными узлами, номер компоненты узла, рёбра DAG между компонентами).
+    """
+    components = [sorted(component) for component in strongly_connected_components(nodes, successors)]
+    component_of: Dict[Node, int] = {}
+    for i, component in enumerate(components):
+        for node in component:
+            component_of[node] = i
+
+    edges: List[set] = [set() for _ in components]
+    for i, component in enumerate(components):
+        for node in component:
+            for neighbor in successors(node):
+                j = component_of[neighbor]
+                if j != i:
+                    edges[i].add(j)
+    return components, component_of, edges
+
+
+def topological_batches(nodes: Iterable[Node], successors: Callable[[Node], Iterable[Node]]) -> List[List[Node]]:
+    """
+    Алгоритм Кана по конденсации: зависимости идут раньше зависимых, цикл - одна партия.
+    Среди готовых партий выбирается лексикографически меньшая, так что порядок детерминирован;
+    сложность O(V + E log V).
+    """
+    components, _, edges = condensation(nodes, successors)
+    remaining = [len(targets) for targets in edges]
+    dependents: List[List[int]] = [[] for _ in components]
+    for i, targets in enumerate(edges):
+        for j in targets:
+            dependents[j].append(i)
+
+    ready = [(components[i][0], i) for i, count in enumerate(remaining) if count == 0]
+    heapq.heapify(ready)
+    batches = []
+    while ready:
+        _, i = heapq.heappop(ready)
+        batches.append(components[i])
+        for dependent in dependents[i]:
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                heapq.heappush(ready, (components[dependent][0], dependent))
+    return batches
+
+
+def install_waves(nodes: Iterable[Node], successors: Callable[[Node], Iterable[Node]]) -> List[List[Node]]:
+    """
+    Волны установки: волна k содержит пакеты, все зависимости которых лежат в волнах < k,
+    поэтому пакеты одной волны можно ставить параллельно. Цикл целиком попадает в одну волну.
+    """
+    components, _, edges = condensation(nodes, successors)
+    # Тарьян выдаёт компоненты так, что зависимости (стоки) идут раньше зависимых
+    level = [0] * len(components)
+    for i, targets in enumerate(edges):
+        if targets:
+            level[i] = 1 + max(level[j] for j in targets)
+
+    waves: List[List[Node]] = [[] for _ in range(max(level) + 1)] if components else []
+    for i, component in enumerate(components):
+        waves[level[i]].extend(component)
+    for wave in waves:
+        wave.sort()
+    return waves
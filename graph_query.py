@@ -0,0 +1,284 @@
+import bisect
+import logging
+import random
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from compact_graph import CompactDependencyGraph
+from graph_algorithms import condensation
+
+logger = logging.getLogger(__name__)
+
+# Число случайных обходов для интервальных меток: больше меток - реже ложные "может быть достижим"
+DEFAULT_LABELS = 3
+
+
+def load_graph(path: str) -> CompactDependencyGraph:
+    """
+    Сохранённый граф: бинарный снимок (--save-graph, --save-snapshot), текстовый репозиторий
+    или файл состояния инкрементального обхода (*.json).
+    """
+    if path.endswith(".json"):
+        from incremental import CrawlState
+
+        state = CrawlState.load(path)
+        graph = CompactDependencyGraph()
+        for package, dependencies in state.graph.items():
+            graph.add_dependencies(package, dependencies)
+        graph.edge_count()
+        return graph
+
+    from repository_format import load_repository
+
+    return load_repository(path)
+
+
+class DependencyIndex:
+    """
+    Индекс для запросов к сохранённому графу: обратная смежность в CSR, интервальные метки
+    на DAG компонент сильной связности (GRAIL) и кратчайшие расстояния от корней.
+    Метки за O(k) отвечают "недостижим" и отсекают ветви поиска, поэтому path и reaches
+    (двунаправленный поиск) обходят только ту часть графа, через которую путь ещё возможен.
+    dependents/dependencies выдают ответ обходом, время пропорционально размеру ответа.
+    Имя в запросе - "name@version" или просто имя пакета (тогда берутся все его версии).
+    """
+
+    def __init__(self, graph: CompactDependencyGraph, roots: Optional[Iterable[str]] = None,
+                 labels: int = DEFAULT_LABELS, seed: int = 0):
+        graph.edge_count()
+        self.graph = graph
+        self.names = graph.names
+        self._offsets = graph._offsets
+        self._targets = graph._targets
+        count = len(self.names)
+
+        # Обратная смежность: сортировка рёбер подсчётом по цели
+        reverse_offsets = array("i", bytes(4 * (count + 1)))
+        for target in self._targets:
+            reverse_offsets[target + 1] += 1
+        for node in range(count):
+            reverse_offsets[node + 1] += reverse_offsets[node]
+        fill = array("i", reverse_offsets)
+        reverse_targets = array("i", bytes(4 * len(self._targets)))
+        for source in range(count):
+            for i in range(self._offsets[source], self._offsets[source + 1]):
+                target = self._targets[i]
+                reverse_targets[fill[target]] = source
+                fill[target] += 1
+        self._reverse_offsets = reverse_offsets
+        self._reverse_targets = reverse_targets
+
+        components, component_of, edges = condensation(range(count), self._successors)
+        self._component = array("i", (component_of[node] for node in range(count)))
+        self._dag: List[List[int]] = [sorted(targets) for targets in edges]
+        self._lows: List[array] = []
+        self._posts: List[array] = []
+        rng = random.Random(seed)
+        for _ in range(max(1, labels)):
+            self._label(rng)
+
+        if roots is None:
+            self.roots = [node for node in range(count) if reverse_offsets[node] == reverse_offsets[node + 1]]
+            if not self.roots and count:
+                self.roots = [0]
+        else:
+            self.roots = sorted({node for name in roots for node in self.resolve(name)})
+        self._depth, self._parent = self._shortest_from(self.roots)
+
+    def _successors(self, node: int) -> array:
+        return self._targets[self._offsets[node]:self._offsets[node + 1]]
+
+    def _predecessors(self, node: int) -> array:
+        return self._reverse_targets[self._reverse_offsets[node]:self._reverse_offsets[node + 1]]
+
+    def _label(self, rng: random.Random):
+        """
+        Один обход DAG компонент в случайном порядке детей: post - номер в обратном порядке обхода,
+        low - минимум post по всем потомкам. Если v достижим из u, интервал v вложен в интервал u.
+        """
+        dag = self._dag
+        count = len(dag)
+        post = array("i", bytes(4 * count))
+        low = array("i", bytes(4 * count))
+        done = bytearray(count)
+        has_parent = bytearray(count)
+        for targets in dag:
+            for target in targets:
+                has_parent[target] = 1
+        starts = [c for c in range(count) if not has_parent[c]]
+        rng.shuffle(starts)
+
+        rank = 0
+        for start in starts:
+            children = list(dag[start])
+            rng.shuffle(children)
+            stack = [(start, children)]
+            done[start] = 1
+            while stack:
+                component, pending = stack[-1]
+                if pending:
+                    child = pending.pop()
+                    if not done[child]:
+                        done[child] = 1
+                        grandchildren = list(dag[child])
+                        rng.shuffle(grandchildren)
+                        stack.append((child, grandchildren))
+                    continue
+                stack.pop()
+                post[component] = rank
+                low[component] = min([rank] + [low[child] for child in dag[component]])
+                rank += 1
+        self._lows.append(low)
+        self._posts.append(post)
+
+    def _may_reach(self, source: int, target: int) -> bool:
+        # Компоненты: ложных "нет" не бывает, ложные "да" проверяются поиском
+        for low, post in zip(self._lows, self._posts):
+            if low[target] < low[source] or post[target] > post[source]:
+                return False
+        return True
+
+    def _shortest_from(self, sources: List[int]):
+        depth = array("i", [-1]) * len(self.names)
+        parent = array("i", [-1]) * len(self.names)
+        queue = deque(sources)
+        for node in sources:
+            depth[node] = 0
+        while queue:
+            node = queue.popleft()
+            for child in self._successors(node):
+                if depth[child] < 0:
+                    depth[child] = depth[node] + 1
+                    parent[child] = node
+                    queue.append(child)
+        return depth, parent
+
+    def resolve(self, name: str) -> List[int]:
+        """
+        id узлов по имени: точное "name@version" или все версии пакета "name".
+        """
+        names = self.names
+        node = bisect.bisect_left(names, name)
+        if node < len(names) and names[node] == name:
+            return [node]
+        prefix = name + "@"
+        first = bisect.bisect_left(names, prefix)
+        last = bisect.bisect_left(names, name + "A")  # "A" > "@": конец диапазона "name@..."
+        nodes = [n for n in range(first, last) if names[n].startswith(prefix) and "/" not in names[n][len(prefix):]]
+        if not nodes:
+            raise RuntimeError(f"Package '{name}' is not in the graph")
+        return nodes
+
+    def _walk(self, starts: List[int], step) -> List[str]:
+        seen = set(starts)
+        queue = deque(starts)
+        while queue:
+            node = queue.popleft()
+            for neighbor in step(node):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+        seen.difference_update(starts)
+        return sorted(self.names[node] for node in seen)
+
+    def dependents(self, name: str, direct: bool = False) -> List[str]:
+        """
+        Кто зависит от пакета: напрямую или транзитивно (обратный обход).
+        """
+        nodes = self.resolve(name)
+        if direct:
+            return sorted({self.names[p] for node in nodes for p in self._predecessors(node)})
+        return self._walk(nodes, self._predecessors)
+
+    def dependencies(self, name: str, direct: bool = False) -> List[str]:
+        nodes = self.resolve(name)
+        if direct:
+            return sorted({self.names[c] for node in nodes for c in self._successors(node)})
+        return self._walk(nodes, self._successors)
+
+    def reaches(self, source: str, target: str) -> bool:
+        return self.path(source, target) is not None
+
+    def path(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        Кратчайшая цепочка зависимостей от source к target; None, если её нет.
+        Двунаправленный поиск в ширину по уровням: вперёд заходит только в узлы, из которых
+        по меткам ещё достижим target, назад - только в узлы, достижимые из source.
+        """
+        sources = self.resolve(source)
+        targets = self.resolve(target)
+        component = self._component
+        source_components = {component[node] for node in sources}
+        target_components = {component[node] for node in targets}
+        may_reach = self._may_reach
+
+        def forward_viable(node: int) -> bool:
+            return any(may_reach(component[node], c) for c in target_components)
+
+        def backward_viable(node: int) -> bool:
+            return any(may_reach(c, component[node]) for c in source_components)
+
+        forward = {node: -1 for node in sources if forward_viable(node)}
+        backward = {node: -1 for node in targets if backward_viable(node)}
+        forward_frontier, backward_frontier = list(forward), list(backward)
+        meet = next((node for node in forward if node in backward), None)
+        while meet is None and forward_frontier and backward_frontier:
+            # Расширяем меньший фронтир на целый уровень; первая встреча внутри уровня даёт кратчайший путь
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meet = self._expand(forward_frontier, forward, backward,
+                                                      self._successors, forward_viable)
+            else:
+                backward_frontier, meet = self._expand(backward_frontier, backward, forward,
+                                                       self._predecessors, backward_viable)
+        if meet is None:
+            return None
+
+        chain = []
+        node = meet
+        while node != -1:
+            chain.append(self.names[node])
+            node = forward[node]
+        chain.reverse()
+        node = backward[meet]
+        while node != -1:
+            chain.append(self.names[node])
+            node = backward[node]
+        return chain
+
+    @staticmethod
+    def _expand(frontier: List[int], parents: Dict[int, int], other: Dict[int, int], step, viable):
+        next_frontier = []
+        for node in frontier:
+            for neighbor in step(node):
+                if neighbor in parents or not viable(neighbor):
+                    continue
+                parents[neighbor] = node
+                if neighbor in other:
+                    return next_frontier, neighbor
+                next_frontier.append(neighbor)
+        return next_frontier, None
+
+    def depth_of(self, name: str) -> Optional[int]:
+        """
+        Минимальная глубина пакета от корней графа; None для недостижимого.
+        """
+        depths = [self._depth[node] for node in self.resolve(name) if self._depth[node] >= 0]
+        return min(depths) if depths else None
+
+    def why(self, name: str) -> Optional[List[str]]:
+        """
+        Почему пакет попал в граф: кратчайшая цепочка от корня до ближайшей его версии.
+        """
+        reachable = [node for node in self.resolve(name) if self._depth[node] >= 0]
+        if not reachable:
+            return None
+        node = min(reachable, key=self._depth.__getitem__)
+        chain = []
+        while node != -1:
+            chain.append(self.names[node])
+            node = self._parent[node]
+        return chain[::-1]
+
+    def root_names(self) -> List[str]:
+        return [self.names[node] for node in self.roots]
@@ -0,0 +1,303 @@
+import json
+import logging
+import os
+import threading
+from functools import partial
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from dependency_graph import DependencyGraph
+from graph_algorithms import find_cycles
+from npm_parser import fetch_packument, node_key, parse_packument, split_node_key
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT = "depvis-crawl-state"
+STATE_VERSION = 1
+
+
+@dataclass
+class PackageState:
+    """
+    Состояние пакета после обхода: валидаторы ответа реестра и spec -> выбранная версия.
+    """
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    versions: Dict[str, str] = field(default_factory=dict)
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CrawlState:
+    """
+    Результат обхода реестра для следующего инкрементального запуска: граф,
+    прямые зависимости каждого узла и состояние каждого пакета.
+    settings - параметры, от которых зависят сохранённые зависимости (реестр, dev/peer/optional).
+    """
+
+    def __init__(self, settings: Dict[str, object], root: str = ""):
+        self.settings = settings
+        self.root = root
+        self.graph: Dict[str, Set[str]] = {}
+        self.packages: Dict[str, PackageState] = {}
+        self.dependencies: Dict[str, Dict[str, str]] = {}
+
+    def save(self, path: str):
+        """
+        Пишет состояние JSON-файлом через временный файл, чтобы прерванный запуск не портил прежний.
+        """
+        document = {
+            "format": STATE_FORMAT,
+            "version": STATE_VERSION,
+            "settings": self.settings,
+            "root": self.root,
+            "graph": {node: sorted(deps) for node, deps in sorted(self.graph.items())},
+            "packages": {
+                name: {"etag": state.etag, "last_modified": state.last_modified, "versions": state.versions}
+                for name, state in sorted(self.packages.items())
+            },
+            "dependencies": self.dependencies,
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(document, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CrawlState":
+        try:
+            with open(path, encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"Failed to read crawl state {path}: {e}") from e
+        if document.get("format") != STATE_FORMAT or document.get("version") != STATE_VERSION:
+            raise RuntimeError(f"{path} is not a crawl state file (version {STATE_VERSION})")
+
+        state = cls(document.get("settings", {}), document.get("root", ""))
+        state.graph = {node: set(deps) for node, deps in document.get("graph", {}).items()}
+        state.packages = {
+            name: PackageState(entry.get("etag"), entry.get("last_modified"), entry.get("versions", {}))
+            for name, entry in document.get("packages", {}).items()
+        }
+        state.dependencies = document.get("dependencies", {})
+        return state
+
+
+class IncrementalDependencyGraph(DependencyGraph):
+    """
+    Обход реестра поверх состояния прошлого запуска. Пакет из прошлого состояния ревалидируется
+    условным запросом; на 304 его версии и зависимости берутся из состояния без загрузки и разбора,
+    так что заново скачиваются и раскрываются только изменившиеся пакеты и новые поддеревья.
+    Обход остаётся обычным bfs_with_recursion / bfs_concurrent, новое состояние копится в self.state.
+    """
+
+    def __init__(self, previous: Optional[CrawlState] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.state = CrawlState({})
+        self.previous = previous
+        # Пакет -> изменился ли он с прошлого запуска; каждый пакет ревалидируется один раз
+        self._changed: Dict[str, bool] = {}
+        self._responses = {}
+        self._lock = threading.Lock()
+        self.stats = {"unchanged": 0, "changed": 0, "fetched": 0}
+
+    @staticmethod
+    def settings_for(repository_url: str, dependency_filter) -> Dict[str, object]:
+        return {
+            "registry": repository_url.rstrip("/"),
+            "dev": dependency_filter.dev,
+            "peer": dependency_filter.peer,
+            "optional": dependency_filter.optional,
+        }
+
+    def begin(self, start_package: str, version: str, repository_url: str):
+        """
+        Готовит состояние для обхода; прошлое состояние с другими настройками не переиспользуется.
+        """
+        settings = self.settings_for(repository_url, self.filter)
+        self.state = CrawlState(settings, node_key(start_package, version))
+        if self.previous is not None and self.previous.settings != settings:
+            logger.warning("Previous crawl used different settings (%s); re-fetching everything",
+                           self.previous.settings)
+            self.previous = None
+
+    def _resolve_many(self, package: str, specs: List[str], repository_url: str,
+                      root: bool = False) -> Dict[str, Tuple[str, Optional[Dict[str, str]]]]:
+        # Корень с devDependencies отличается от того же узла внутри графа - его не переиспользуем и не сохраняем
+        private = root and self.filter.dev
+        result = None if private else self._reuse(package, specs, repository_url)
+        if result is None:
+            result = super()._resolve_many(package, specs, repository_url, root)
+        if not private:
+            self._record(package, result)
+        return result
+
+    def _reuse(self, package: str, specs: List[str],
+               repository_url: str) -> Optional[Dict[str, Tuple[str, Optional[Dict[str, str]]]]]:
+        previous = self.previous.packages.get(package) if self.previous is not None else None
+        if previous is None:
+            return None
+        result = {}
+        for spec in specs:
+            version = previous.versions.get(spec)
+            node = node_key(package, version) if version is not None else None
+            dependencies = self.previous.dependencies.get(node) if node is not None else None
+            if dependencies is None:
+                return None
+            result[spec] = (node, dependencies)
+
+        with self._lock:
+            changed = self._changed.get(package)
+        if changed is None:
+            response = fetch_packument(package, repository_url, self.client, previous.validators())
+            changed = response.status != 304
+            with self._lock:
+                self._changed[package] = changed
+                self.stats["changed" if changed else "unchanged"] += 1
+                if changed:
+                    self._responses[package] = response
+                else:
+                    entry = self.state.packages.setdefault(package, PackageState())
+                    entry.etag, entry.last_modified = previous.etag, previous.last_modified
+        return None if changed else result
+
+    def _fetch_resolution(self, package: str, specs: List[str], repository_url: str, root: bool = False):
+        with self._lock:
+            response = self._responses.pop(package, None)
+        if response is None:
+            response = fetch_packument(package, repository_url, self.client)
+            with self._lock:
+                self.stats["fetched"] += 1
+        with self._lock:
+            entry = self.state.packages.setdefault(package, PackageState())
+            entry.etag = response.headers.get("etag")
+            entry.last_modified = response.headers.get("last-modified")
+        return parse_packument(response.body, specs, partial(self.filter.select, root=root))
+
+    def _record(self, package: str, result: Dict[str, Tuple[str, Optional[Dict[str, str]]]]):
+        with self._lock:
+            entry = self.state.packages.setdefault(package, PackageState())
+            for spec, (node, dependencies) in result.items():
+                if dependencies is not None:
+                    entry.versions[spec] = split_node_key(node)[1]
+                    self.state.dependencies[node] = dependencies
+
+    def finish(self) -> CrawlState:
+        """
+        Закрывает обход: в состояние попадают итоговый граф и только пакеты, встреченные в этом запуске.
+        """
+        self.state.graph = self.graph
+        return self.state
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (f"Incremental stats: revalidated {s['unchanged'] + s['changed']} package(s), "
+                f"unchanged={s['unchanged']} changed={s['changed']}; downloaded {s['fetched'] + s['changed']} packument(s)")
+
+
+@dataclass
+class GraphDiff:
+    """
+    Структурированная разница двух графов обхода.
+    """
+    added_nodes: List[str] = field(default_factory=list)
+    removed_nodes: List[str] = field(default_factory=list)
+    added_edges: List[Tuple[str, str]] = field(default_factory=list)
+    removed_edges: List[Tuple[str, str]] = field(default_factory=list)
+    version_changes: Dict[str, Tuple[List[str], List[str]]] = field(default_factory=dict)
+    new_cycles: List[List[str]] = field(default_factory=list)
+    resolved_cycles: List[List[str]] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added_nodes or self.removed_nodes or self.added_edges or self.removed_edges
+                    or self.new_cycles or self.resolved_cycles)
+
+    def to_dict(self) -> dict:
+        return {
+            "added_nodes": self.added_nodes,
+            "removed_nodes": self.removed_nodes,
+            "added_edges": [list(edge) for edge in self.added_edges],
+            "removed_edges": [list(edge) for edge in self.removed_edges],
+            "version_changes": {
+                name: {"from": old, "to": new} for name, (old, new) in self.version_changes.items()
+            },
+            "new_cycles": self.new_cycles,
+            "resolved_cycles": self.resolved_cycles,
+        }
+
+    def format(self) -> str:
+        if self.empty:
+            return "Changes since previous run: none"
+        lines = [
+            f"Changes since previous run: +{len(self.added_nodes)}/-{len(self.removed_nodes)} nodes, "
+            f"+{len(self.added_edges)}/-{len(self.removed_edges)} edges, "
+            f"{len(self.version_changes)} version change(s)"
+        ]
+        for name, (old, new) in self.version_changes.items():
+            lines.append(f"  ~ {name}: {', '.join(old)} -> {', '.join(new)}")
+        for source, target in self.added_edges:
+            lines.append(f"  + {source} -> {target}")
+        for source, target in self.removed_edges:
+            lines.append(f"  - {source} -> {target}")
+        for group in self.new_cycles:
+            lines.append(f"  new cycle: {' <-> '.join(group)}")
+        for group in self.resolved_cycles:
+            lines.append(f"  resolved cycle: {' <-> '.join(group)}")
+        return "\n".join(lines)
+
+
+def _versions_by_package(nodes) -> Dict[str, Set[str]]:
+    versions: Dict[str, Set[str]] = {}
+    for node in nodes:
+        name, version = split_node_key(node)
+        if version is not None:
+            versions.setdefault(name, set()).add(version)
+    return versions
+
+
+def _nodes(graph: Dict[str, Set[str]]) -> Set[str]:
+    # Листья на границе глубины встречаются только среди зависимостей
+    nodes = set(graph)
+    for deps in graph.values():
+        nodes.update(deps)
+    return nodes
+
+
+def diff_graphs(old: Dict[str, Set[str]], new: Dict[str, Set[str]]) -> GraphDiff:
+    """
+    Добавленные и удалённые узлы и рёбра, смена версий пакетов, появившиеся и исчезнувшие циклы.
+    Версии и циклы пересчитываются, только если узлы или рёбра действительно изменились.
+    """
+    empty: Set[str] = set()
+    diff = GraphDiff()
+    old_nodes, new_nodes = _nodes(old), _nodes(new)
+    diff.added_nodes = sorted(new_nodes - old_nodes)
+    diff.removed_nodes = sorted(old_nodes - new_nodes)
+    for node in sorted(old.keys() | new.keys()):
+        before, after = old.get(node, empty), new.get(node, empty)
+        if before != after:
+            diff.added_edges.extend((node, target) for target in sorted(after - before))
+            diff.removed_edges.extend((node, target) for target in sorted(before - after))
+
+    if diff.added_nodes or diff.removed_nodes:
+        old_versions = _versions_by_package(diff.removed_nodes)
+        new_versions = _versions_by_package(diff.added_nodes)
+        all_old = _versions_by_package(old_nodes)
+        all_new = _versions_by_package(new_nodes)
+        for name in sorted(old_versions.keys() | new_versions.keys()):
+            if name in all_old and name in all_new:
+                diff.version_changes[name] = (sorted(all_old[name]), sorted(all_new[name]))
+
+    if diff.added_edges or diff.removed_edges:
+        old_cycles = {frozenset(group): group for group in find_cycles(old, lambda node: old.get(node, empty))}
+        new_cycles = {frozenset(group): group for group in find_cycles(new, lambda node: new.get(node, empty))}
+        diff.new_cycles = [group for key, group in new_cycles.items() if key not in old_cycles]
+        diff.resolved_cycles = [group for key, group in old_cycles.items() if key not in new_cycles]
+    return diff
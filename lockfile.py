@@ -0,0 +1,172 @@
+import logging
+import sys
+from typing import Dict, List, Optional, Set, Tuple
+
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from npm_parser import node_key
+from packument_stream import JsonStreamReader, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+NODE_MODULES = "node_modules/"
+
+_intern = sys.intern
+
+
+class LockfileIndex:
+    """
+    Плоский индекс package-lock.json (v2/v3): путь в node_modules -> (имя, версия, имена зависимостей).
+    Имена и версии интернированы, так что повторяющиеся строки хранятся один раз.
+    """
+
+    def __init__(self, name: str = "", version: str = ""):
+        self.name = name
+        self.version = version
+        self.paths: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.versions: List[str] = []
+        self.dependencies: List[Tuple[str, ...]] = []
+        self.links: Dict[int, str] = {}
+        # Записи с "dev": true - пакеты, нужные только devDependencies корня
+        self.dev: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, path: str, entry: dict, dependency_filter: DependencyFilter):
+        name = entry.get("name") or _package_name(path) or self.name
+        version = entry.get("version") or ""
+        deps = dependency_filter.select(entry, root=path == "")
+
+        index = len(self.names)
+        self.paths[path] = index
+        self.names.append(_intern(name))
+        self.versions.append(_intern(version))
+        self.dependencies.append(tuple(_intern(dep) for dep in deps))
+        if entry.get("link") and entry.get("resolved"):
+            self.links[index] = entry["resolved"]
+        if entry.get("dev"):
+            self.dev.add(index)
+
+    def _target(self, index: int) -> int:
+        # Ссылка workspace ("link": true) указывает на запись по пути resolved
+        target = self.links.get(index)
+        if target is None:
+            return index
+        return self.paths.get(target, index)
+
+    def resolve(self, path: str, dependency: str) -> Optional[int]:
+        """
+        Ищет зависимость так же, как Node: node_modules текущего пакета, затем родительских, до корня.
+        """
+        while True:
+            candidate = f"{path}/{NODE_MODULES}{dependency}" if path else f"{NODE_MODULES}{dependency}"
+            found = self.paths.get(candidate)
+            if found is not None:
+                return self._target(found)
+            if not path:
+                return None
+            # Workspace вне node_modules ("packages/a") после себя ищет сразу в корне
+            cut = path.rfind("/" + NODE_MODULES)
+            path = path[:cut] if cut >= 0 else ""
+
+    def node(self, index: int) -> str:
+        return node_key(self.names[index], self.versions[index]) if self.versions[index] else self.names[index]
+
+    def build_graph(self, package: Optional[str] = None, graph: Optional[DependencyGraph] = None,
+                    dependency_filter: Optional[DependencyFilter] = None) -> Tuple[DependencyGraph, Set[str]]:
+        """
+        Граф всего, что достижимо от корня lockfile (или от пакета package); без обращений к реестру.
+        Зависимости, которых нет в lockfile, становятся листьями с голым именем;
+        отфильтрованные зависимости и их поддеревья пропускаются.
+        """
+        graph = graph if graph is not None else DependencyGraph()
+        dependency_filter = dependency_filter or graph.filter
+        path_of = [""] * len(self.names)
+        for path, index in self.paths.items():
+            path_of[index] = path
+
+        if package is None or package == self.name:
+            start = self.paths.get("")
+        else:
+            start = self.paths.get(f"{NODE_MODULES}{package}")
+        if start is None:
+            raise RuntimeError(f"Package '{package}' not found in lockfile")
+        start = self._target(start)
+
+        visited: Set[str] = set()
+        seen = {start}
+        stack = [start]
+        while stack:
+            index = stack.pop()
+            node = self.node(index)
+            visited.add(node)
+            graph.add_dependency(node, "")
+            path = path_of[index]
+            for dependency in dependency_filter.prune(dict.fromkeys(self.dependencies[index], "")):
+                child = self.resolve(path, dependency)
+                if child is None:
+                    graph.add_dependency(node, dependency)
+                    continue
+                graph.add_dependency(node, self.node(child))
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return graph, visited
+
+
+def _package_name(path: str) -> str:
+    # "node_modules/a/node_modules/@scope/b" -> "@scope/b"
+    cut = path.rfind(NODE_MODULES)
+    if cut < 0:
+        return ""
+    return path[cut + len(NODE_MODULES):]
+
+
+def read_lockfile(path: str, include_dev: bool = True, chunk_size: int = 256 * 1024,
+                  dependency_filter: Optional[DependencyFilter] = None) -> LockfileIndex:
+    """
+    Потоково читает package-lock.json / npm-shrinkwrap.json за один проход: каждая запись
+    "packages" декодируется отдельно, устаревшее дерево "dependencies" пропускается по частям.
+    include_dev - включать devDependencies корневого пакета (если не передан dependency_filter).
+    """
+    dependency_filter = dependency_filter or DependencyFilter(dev=include_dev)
+    index = LockfileIndex()
+    lockfile_version = None
+    try:
+        with open(path, "rb") as f:
+            reader = JsonStreamReader(iter_chunks(f, chunk_size))
+            for key in reader.iter_object():
+                if key == "packages":
+                    for package_path in reader.iter_object():
+                        entry = reader.read_value() or {}
+                        index.add(package_path, entry, dependency_filter)
+                elif key == "dependencies":
+                    # v2 дублирует дерево в формате v1 - не собираем его целиком
+                    for _ in reader.iter_object():
+                        reader.skip_value()
+                elif key in ("name", "version", "lockfileVersion"):
+                    value = reader.read_value()
+                    if key == "name":
+                        index.name = value or ""
+                    elif key == "version":
+                        index.version = value or ""
+                    else:
+                        lockfile_version = value
+                else:
+                    reader.skip_value()
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Failed to read lockfile {path}: {e}") from e
+
+    if not index.paths:
+        raise RuntimeError(
+            f"Lockfile {path} has no 'packages' section (lockfileVersion {lockfile_version}); "
+            f"regenerate it with npm 7+ (npm install --package-lock-only)"
+        )
+    root = index.paths.get("")
+    if root is not None:
+        index.name = index.name or index.names[root]
+        index.version = index.version or index.versions[root]
+    logger.info("Loaded lockfile v%s with %d entries", lockfile_version, len(index))
+    return index
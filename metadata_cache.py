@@ -0,0 +1,284 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+class MetadataCache:
+    """
+    Дисковый кэш ответов реестра с адресацией по содержимому: тело хранится один раз
+    под sha256 своих байтов (blobs/), а запись URL (index/, ключ - sha256 от URL) - короткий
+    заголовок с digest тела и валидаторами. Одинаковые тела разных URL хранятся один раз,
+    а ответ 304 переписывает только заголовок. Свежесть ограничена ttl (секунды),
+    общий размер - max_bytes (LRU по mtime).
+    """
+
+    def __init__(self, cache_dir: str, ttl: float = 3600.0, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stored": 0,
+            "evicted": 0,
+            "bytes_downloaded": 0,
+        }
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "index", digest[:2], digest + ".entry")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest + ".blob")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Возвращает запись из кэша (свежую или устаревшую) либо None.
+        """
+        path = self._path(url)
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.read())
+            blob_path = self._blob_path(header["digest"])
+            with open(blob_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError, TypeError):
+            # Тело могло быть вытеснено раньше заголовка - это обычный промах
+            return None
+
+        # mtime служит отметкой последнего использования для LRU
+        for used in (path, blob_path):
+            try:
+                os.utime(used)
+            except OSError:
+                pass
+
+        return CacheEntry(
+            url=url,
+            body=body,
+            etag=header.get("etag"),
+            last_modified=header.get("last_modified"),
+            fetched_at=header.get("fetched_at", 0.0),
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.fetched_at < self.ttl
+
+    def validators(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """
+        Заголовки условного запроса для ревалидации записи.
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None) -> CacheEntry:
+        entry = CacheEntry(url, body, etag, last_modified, time.time())
+        self._write(entry)
+        self._count("misses")
+        self._count("stored")
+        self._count("bytes_downloaded", len(body))
+        return entry
+
+    def refresh(self, entry: CacheEntry) -> CacheEntry:
+        """
+        Отмечает запись как подтверждённую сервером (ответ 304): переписывается только заголовок.
+        """
+        entry.fetched_at = time.time()
+        self._write(entry)
+        self._count("revalidated")
+        return entry
+
+    def record_hit(self):
+        self._count("hits")
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _write(self, entry: CacheEntry):
+        digest = hashlib.sha256(entry.body).hexdigest()
+        header = {
+            "url": entry.url,
+            "digest": digest,
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+            "fetched_at": entry.fetched_at,
+        }
+        blob_path = self._blob_path(digest)
+        try:
+            # Тело уже сохранено (ответ 304 или то же содержимое под другим URL) - только отмечаем использование
+            os.utime(blob_path)
+        except OSError:
+            self._store(blob_path, entry.body)
+        self._store(self._path(entry.url), json.dumps(header).encode("utf-8"))
+
+    def _store(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            os.replace(tmp_path, path)
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith((".entry", ".blob")):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self._entries():
+            try:
+                total += os.path.getsize(path)
+            except OSError:
+                pass
+        return total
+
+    def _evict(self):
+        # Вызывается под self._lock: удаляем давно не использованные записи до 90% лимита
+        entries = []
+        for path in self._entries():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+
+        target = self.max_bytes * 0.9
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats["evicted"] += 1
+        self._total_bytes = total
+
+    def format_stats(self) -> str:
+        s = self.stats
+        return (
+            f"Cache stats: hits={s['hits']} revalidated={s['revalidated']} misses={s['misses']} "
+            f"evicted={s['evicted']} downloaded={s['bytes_downloaded']} bytes (dir: {self.cache_dir})"
+        )
+
+
+class DependencyMemo:
+    """
+    Память процесса: (registry, package) -> словари прямых зависимостей всех версий пакета.
+    Хранит только извлечённые зависимости, а не весь packument; вытеснение (LRU) идёт
+    по пакетам, не более max_entries пакетов: версии одного пакета уходят вместе.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Dict[str, str]]]" = OrderedDict()
+        self._indexes: "OrderedDict[Tuple[str, str], object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[Dict[str, str]]:
+        registry, package, version = key
+        with self._lock:
+            versions = self._entries.get((registry, package))
+            deps = versions.get(version) if versions is not None else None
+            if deps is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((registry, package))
+            self.hits += 1
+            return deps
+
+    def record_miss(self):
+        """
+        Промах без обращения к get(): версия не разрешилась по индексу (индекса ещё нет).
+        """
+        with self._lock:
+            self.misses += 1
+
+    def put_versions(self, registry: str, package: str, dependencies: Dict[str, Dict[str, str]]):
+        """
+        Добавляет зависимости версий пакета (version -> словарь); прежние версии сохраняются.
+        """
+        with self._lock:
+            versions = self._entries.get((registry, package))
+            if versions is None:
+                self._entries[(registry, package)] = dict(dependencies)
+            else:
+                versions.update(dependencies)
+                self._entries.move_to_end((registry, package))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_index(self, registry: str, package: str):
+        """
+        Индекс версий пакета (semver.VersionIndex) для разрешения диапазонов без повторной загрузки.
+        """
+        with self._lock:
+            index = self._indexes.get((registry, package))
+            if index is not None:
+                self._indexes.move_to_end((registry, package))
+            return index
+
+    def put_index(self, registry: str, package: str, index):
+        with self._lock:
+            self._indexes[(registry, package)] = index
+            self._indexes.move_to_end((registry, package))
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+    def clear_indexes(self):
+        """
+        Сбрасывает индексы версий: dist-tags и список версий меняются при публикации,
+        а зависимости опубликованной версии неизменны и остаются в памяти.
+        """
+        with self._lock:
+            self._indexes.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def summary(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "indexes": len(self._indexes), "hits": self.hits, "misses": self.misses}
+
+    def format_stats(self) -> str:
+        return f"Memo stats: entries={len(self._entries)} hits={self.hits} misses={self.misses}"
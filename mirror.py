@@ -0,0 +1,323 @@
+import gzip
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from batch import BatchRoot, expand_roots
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from npm_parser import fetch_packument, parse_packument
+from packument_stream import GZIP_MAGIC, PackageResolution, decode_body
+from registry_client import RegistryClient
+
+logger = logging.getLogger(__name__)
+
+MIRROR_MAGIC = b"DVMIRROR"
+MIRROR_END = b"DVMEND01"
+# magic, версия формата, флаги (бит 0 - полные packument-ы)
+_HEADER = struct.Struct("<8sBB")
+# тег записи, длина имени, длина тела
+_RECORD = struct.Struct("<BHI")
+# смещение индекса, завершающая метка
+_FOOTER = struct.Struct("<Q8s")
+_FORMAT_VERSION = 1
+_FULL = 1
+_TAG_RECORD = 1
+_TAG_INDEX = 2
+
+DEFAULT_MIRROR_ADDRESS = "127.0.0.1:4873"
+ABBREVIATED_TYPE = "application/vnd.npm.install-v1+json"
+
+
+class MirrorStore:
+    """
+    Хранилище зеркала в одном файле: заголовок, записи (имя пакета + packument в gzip) подряд
+    и индекс имя -> (смещение, длина) в конце. Запись только дописывает файл; без индекса в конце
+    (прерванная загрузка) записи восстанавливаются последовательным просмотром заголовков,
+    недописанный хвост отбрасывается. Чтение - os.pread без общего указателя, из любых потоков.
+    """
+
+    def __init__(self, path: str, writable: bool = False, full: bool = False):
+        self.path = path
+        self.writable = writable
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if not exists and not writable:
+            raise RuntimeError(f"Mirror store {path} does not exist")
+        try:
+            self._file = open(path, "r+b" if exists else "w+b") if writable else open(path, "rb")
+        except OSError as e:
+            raise RuntimeError(f"Cannot open mirror store {path}: {e}") from e
+
+        if exists:
+            header = os.pread(self._file.fileno(), _HEADER.size, 0)
+            if len(header) < _HEADER.size or header[:8] != MIRROR_MAGIC:
+                self._file.close()
+                raise RuntimeError(f"{path} is not a depvis mirror store")
+            _, version, flags = _HEADER.unpack(header)
+            if version != _FORMAT_VERSION:
+                self._file.close()
+                raise RuntimeError(f"Unsupported mirror store version {version} in {path}")
+            self.full = bool(flags & _FULL)
+            self._end, self.recovered = self._load_index()
+        else:
+            self.full = full
+            self._file.write(_HEADER.pack(MIRROR_MAGIC, _FORMAT_VERSION, _FULL if full else 0))
+            self._end, self.recovered = _HEADER.size, False
+        if writable:
+            # Старый индекс перезапишется новым при close()
+            self._file.truncate(self._end)
+            self._file.seek(self._end)
+
+    def _load_index(self) -> Tuple[int, bool]:
+        fd = self._file.fileno()
+        size = os.fstat(fd).st_size
+        if size >= _HEADER.size + _FOOTER.size:
+            offset, end = _FOOTER.unpack(os.pread(fd, _FOOTER.size, size - _FOOTER.size))
+            if end == MIRROR_END and _HEADER.size <= offset < size:
+                tag, _, length = _RECORD.unpack(os.pread(fd, _RECORD.size, offset))
+                if tag == _TAG_INDEX:
+                    blob = os.pread(fd, length, offset + _RECORD.size)
+                    self.index = {name: (start, length) for name, (start, length)
+                                  in json.loads(zlib.decompress(blob)).items()}
+                    return offset, False
+
+        # Индекса нет: восстанавливаем по заголовкам записей до первой неполной
+        position = _HEADER.size
+        while position + _RECORD.size <= size:
+            tag, name_length, body_length = _RECORD.unpack(os.pread(fd, _RECORD.size, position))
+            body_start = position + _RECORD.size + name_length
+            if tag != _TAG_RECORD or body_start + body_length > size:
+                break
+            name = os.pread(fd, name_length, position + _RECORD.size).decode("utf-8")
+            self.index[name] = (body_start, body_length)
+            position = body_start + body_length
+        logger.info("Recovered %d packuments from %s without an index", len(self.index), self.path)
+        return position, True
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, name: str) -> Optional[bytes]:
+        """
+        Сжатое (gzip) тело packument или None.
+        """
+        location = self.index.get(name)
+        if location is None:
+            return None
+        start, length = location
+        return os.pread(self._file.fileno(), length, start)
+
+    def put(self, name: str, body: bytes) -> bytes:
+        if not self.writable:
+            raise RuntimeError(f"Mirror store {self.path} is read-only")
+        if body[:2] != GZIP_MAGIC:
+            body = gzip.compress(body, compresslevel=6)
+        encoded = name.encode("utf-8")
+        with self._lock:
+            self._file.write(_RECORD.pack(_TAG_RECORD, len(encoded), len(body)))
+            self._file.write(encoded)
+            self._file.write(body)
+            # get() читает через pread мимо буфера файла
+            self._file.flush()
+            self.index[name] = (self._end + _RECORD.size + len(encoded), len(body))
+            self._end += _RECORD.size + len(encoded) + len(body)
+        return body
+
+    def size(self) -> int:
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        if self._file.closed:
+            return
+        if self.writable:
+            with self._lock:
+                blob = zlib.compress(json.dumps(self.index, separators=(",", ":")).encode("utf-8"))
+                self._file.write(_RECORD.pack(_TAG_INDEX, 0, len(blob)))
+                self._file.write(blob)
+                self._file.write(_FOOTER.pack(self._end, MIRROR_END))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self) -> "MirrorStore":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MirrorDependencyGraph(DependencyGraph):
+    """
+    Обход для наполнения зеркала: каждый загруженный packument сохраняется в хранилище,
+    а уже сохранённый берётся оттуда без сети - повторный запуск продолжает прерванную загрузку.
+    """
+
+    def __init__(self, store: MirrorStore, client: Optional[RegistryClient] = None,
+                 dependency_filter: Optional[DependencyFilter] = None):
+        super().__init__(client=client, abbreviated=not store.full, dependency_filter=dependency_filter)
+        self.store = store
+        self.fetched: Set[str] = set()
+        self.reused: Set[str] = set()
+        self.failed: Set[str] = set()
+        self._counter_lock = threading.Lock()
+
+    def _fetch_resolution(self, package: str, specs: List[str], repository_url: str,
+                          root: bool = False) -> PackageResolution:
+        body = self.store.get(package)
+        if body is None:
+            try:
+                body = self.store.put(package, self._download(package, repository_url))
+            except Exception:
+                with self._counter_lock:
+                    self.failed.add(package)
+                raise
+            with self._counter_lock:
+                self.fetched.add(package)
+        elif package not in self.fetched:
+            with self._counter_lock:
+                self.reused.add(package)
+        return parse_packument(body, specs, partial(self.filter.select, root=root))
+
+    def _download(self, package: str, repository_url: str) -> bytes:
+        return fetch_packument(package, repository_url, self.client, abbreviated=not self.store.full).body
+
+
+@dataclass
+class MirrorStats:
+    roots: int
+    packages: int
+    fetched: int
+    reused: int
+    failed: int
+
+    def format(self) -> str:
+        return (f"Mirror: {self.packages} packuments in the closure of {self.roots} root(s); fetched {self.fetched}, "
+                f"reused {self.reused}, failed {self.failed}")
+
+
+def prefetch(store: MirrorStore, roots: List[BatchRoot], repository_url: str, max_depth: int,
+             client: Optional[RegistryClient] = None, concurrency: int = 16,
+             dependency_filter: Optional[DependencyFilter] = None) -> MirrorStats:
+    """
+    Загружает в хранилище транзитивное замыкание корней: те же версии, что выберет обход
+    с этими флагами зависимостей, поэтому обход по зеркалу обходится без внешней сети.
+    """
+    graph = MirrorDependencyGraph(store, client=client, dependency_filter=dependency_filter)
+    expand_roots(graph, roots, max_depth, repository_url, concurrency)
+    for package in sorted(graph.failed):
+        logger.warning("Not mirrored: %s", package)
+    return MirrorStats(len(roots), len(graph.fetched | graph.reused), len(graph.fetched), len(graph.reused),
+                       len(graph.failed))
+
+
+class _MirrorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class MirrorRegistry:
+    """
+    Локальный реестр поверх хранилища зеркала: GET /<package> отдаёт сохранённый packument,
+    сжатый - как есть (без распаковки), иначе распакованным. Пакетов вне зеркала нет (404).
+    """
+
+    def __init__(self, store: MirrorStore, host: str = "127.0.0.1", port: int = 4873):
+        self.store = store
+        self.served = 0
+        self.missing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._server = _MirrorServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        logger.info("Serving %d packuments from %s at %s", len(self.store), self.store.path, self.url)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self) -> "MirrorRegistry":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MirrorRegistry":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _record(self, name: str, found: bool):
+        with self._lock:
+            if found:
+                self.served += 1
+            elif name not in self.missing:
+                self.missing.add(name)
+                logger.warning("Not in mirror: %s", name)
+
+    def _make_handler(self):
+        registry = self
+        store = self.store
+        content_type = "application/json" if store.full else ABBREVIATED_TYPE
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                name = unquote(self.path.split("?", 1)[0].lstrip("/"))
+                body = store.get(name)
+                registry._record(name, body is not None)
+                if body is None:
+                    self._send(404, b'{"error":"Not found"}', "application/json")
+                    return
+
+                start, length = store.index[name]
+                etag = '"%x-%x"' % (start, length)
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, b"", content_type, etag)
+                    return
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    self._send(200, body, content_type, etag, "gzip")
+                else:
+                    self._send(200, decode_body(body), content_type, etag)
+
+            def _send(self, status: int, body: bytes, content_type: str, etag: Optional[str] = None,
+                      encoding: Optional[str] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("%s - %s", self.address_string(), format % args)
+
+        return Handler
@@ -0,0 +1,203 @@
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import unquote
+
+
+def make_packument(name: str, dependencies: Dict[str, str], version: str = "1.0.0",
+                   versions: Optional[Dict[str, Dict[str, str]]] = None) -> dict:
+    """
+    Формирует минимальный npm packument; versions - дополнительные версии с их зависимостями.
+    """
+    all_versions = dict(versions or {})
+    all_versions[version] = dependencies
+    return {
+        "name": name,
+        "dist-tags": {"latest": version},
+        "versions": {
+            number: {
+                "name": name,
+                "version": number,
+                "dependencies": dict(deps),
+            }
+            for number, deps in all_versions.items()
+        },
+    }
+
+
+def synthetic_packuments(count: int, fanout: int = 4, seed: int = 0, versions: int = 1) -> Dict[str, dict]:
+    """
+    Генерирует детерминированный набор пакетов pkg0..pkgN-1 (DAG с общими поддеревьями).
+    При versions > 1 у каждого пакета версии 1.0.0..1.<versions-1>.0, а зависимости
+    заданы разными диапазонами semver.
+    """
+    rng = random.Random(seed)
+    packuments = {}
+    for i in range(count):
+        candidates = range(i + 1, count)
+        k = min(fanout, len(candidates))
+        history = {}
+        for minor in range(versions):
+            deps = {}
+            for j in sorted(rng.sample(candidates, k)):
+                r = rng.randrange(versions)
+                deps[f"pkg{j}"] = rng.choice(["^1.0.0", f"~1.{r}.0", "1.x", f">=1.0.0 <1.{r + 1}.0"])
+            history[f"1.{minor}.0"] = deps
+        latest = f"1.{versions - 1}.0"
+        packuments[f"pkg{i}"] = make_packument(f"pkg{i}", history.pop(latest), latest, history)
+    return packuments
+
+
+ABBREVIATED_TYPE = "application/vnd.npm.install-v1+json"
+
+# Поля версии, которые реестр оставляет в сокращённом (install-v1) документе
+ABBREVIATED_VERSION_FIELDS = (
+    "name", "version", "dependencies", "optionalDependencies", "devDependencies",
+    "peerDependencies", "peerDependenciesMeta", "bundleDependencies", "bin",
+    "directories", "dist", "engines", "deprecated", "_hasShrinkwrap", "hasInstallScript",
+)
+
+
+def abbreviate_packument(packument: dict) -> dict:
+    """
+    Сокращённый документ install-v1 из полного packument.
+    """
+    return {
+        "name": packument.get("name"),
+        "modified": packument.get("time", {}).get("modified", ""),
+        "dist-tags": packument.get("dist-tags", {}),
+        "versions": {
+            number: {k: v for k, v in data.items() if k in ABBREVIATED_VERSION_FIELDS}
+            for number, data in packument.get("versions", {}).items()
+        },
+    }
+
+
+class _RegistryServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class MockRegistry:
+    """
+    Локальный HTTP-реестр npm для офлайн-проверок и бенчмарков.
+    Отдаёт packument-ы из словаря с искусственной задержкой latency (секунды);
+    первые flaky запросов к каждому пакету получают 503.
+    """
+
+    def __init__(self, packuments: Dict[str, dict], latency: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 flaky: int = 0):
+        self.packuments = packuments
+        self.latency = latency
+        self.flaky = flaky
+        self._failures: Dict[str, int] = {}
+        self.request_count = 0
+        self.not_modified_count = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = _RegistryServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockRegistry":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockRegistry":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def _should_fail(self, name: str) -> bool:
+        with self._lock:
+            failures = self._failures.get(name, 0)
+            if failures >= self.flaky:
+                return False
+            self._failures[name] = failures + 1
+            return True
+
+    def _count_bytes(self, amount: int):
+        with self._lock:
+            self.bytes_sent += amount
+
+    def _count_revalidation(self):
+        with self._lock:
+            self.not_modified_count += 1
+
+    def _make_handler(self):
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                registry._count_request()
+                if registry.latency:
+                    time.sleep(registry.latency)
+
+                name = unquote(self.path.lstrip("/"))
+                if registry.flaky and registry._should_fail(name):
+                    self._send(503, b'{"error":"Service Unavailable"}')
+                    return
+
+                packument = registry.packuments.get(name)
+                if packument is None:
+                    self._send(404, b'{"error":"Not found"}')
+                    return
+                content_type = "application/json"
+                if ABBREVIATED_TYPE in self.headers.get("Accept", ""):
+                    packument = abbreviate_packument(packument)
+                    content_type = ABBREVIATED_TYPE
+
+                body = json.dumps(packument).encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    registry._count_revalidation()
+                    self._send(304, b"", etag)
+                    return
+
+                encoding = None
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=6)
+                    encoding = "gzip"
+                self._send(200, body, etag, content_type, encoding)
+
+            def _send(self, status: int, body: bytes, etag: Optional[str] = None,
+                      content_type: str = "application/json", encoding: Optional[str] = None):
+                registry._count_bytes(len(body))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                if encoding:
+                    self.send_header("Content-Encoding", encoding)
+                if etag:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -2,87 +2,187 @@ import subprocess
 import json
 import tempfile
 import os
-from typing import List, Set, Dict
+import bisect
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
 
 
 class NPMComparator:
-    def __init__(self):
+    """
+    Сравнение нашего порядка загрузки с деревом, которое строит npm.
+    Дерево npm берётся из lockfile: готового, либо полученного через
+    npm install --package-lock-only (без загрузки tarball-ов). Порядок из готового lockfile кэшируется
+    по его содержимому, порядок, разрешённый через реестр, - не дольше order_ttl секунд.
+    """
+
+    def __init__(self, npm_command: Optional[List[str]] = None, lockfile: Optional[str] = None,
+                 cache_dir: Optional[str] = None, timeout: float = 120.0, order_ttl: float = 3600.0):
+        self.npm_command = npm_command or ["npm"]
+        self.lockfile = lockfile
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.order_ttl = order_ttl
         self.actual_install_order: List[str] = []
+        # (package, version, sha256 lockfile) -> (порядок, время получения)
+        self._orders: Dict[Tuple[str, str, str], Tuple[List[str], float]] = {}
     
     def get_actual_npm_install_order(self, package: str, version: str = "latest") -> List[str]:
         """
-        Получает реальный порядок установки зависимостей через npm.
+        Получает порядок пакетов в дереве npm; повторный запрос того же (package, version) берётся из кэша.
         """
         try:
-            # Создаем временную директорию для npm install
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Создаем package.json
-                package_json = {
-                    "name": "test-package",
-                    "version": "1.0.0",
-                    "dependencies": {
-                        package: version
-                    }
-                }
-                
-                with open(os.path.join(temp_dir, "package.json"), "w") as f:
-                    json.dump(package_json, f)
-                
-                # Запускаем npm install с выводом в JSON
-                result = subprocess.run(
-                    ["npm", "install", "--json"],
-                    cwd=temp_dir,
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                
-                if result.returncode == 0:
-                    npm_output = json.loads(result.stdout)
-                    return self._extract_install_order(npm_output)
-                else:
-                    print(f"npm install failed: {result.stderr}")
-                    return []
-                    
-        except Exception as e:
-            print(f"Error getting npm install order: {e}")
+            key = (package, version, self._lockfile_digest())
+        except OSError as e:
+            logger.warning("Error getting npm install order: %s", e)
             return []
+        
+        order = self._recall(key)
+        if order is None:
+            try:
+                if self.lockfile:
+                    order = self._order_from_lockfile(self.lockfile)
+                else:
+                    order = self._resolve_lock_only(package, version)
+            except Exception as e:
+                logger.warning("Error getting npm install order: %s", e)
+                return []
+            if order:
+                self._remember(key, order)
+        
+        self.actual_install_order = order
+        return order
     
-    def _extract_install_order(self, npm_output: dict) -> List[str]:
+    def _lockfile_digest(self) -> str:
         """
-        Извлекает порядок установки из вывода npm.
+        sha256 содержимого lockfile: правка файла даёт новый ключ кэша. Без lockfile - пустая строка.
         """
-        order = []
-        
-        def extract_from_deps(deps: dict):
-            for dep_name, dep_info in deps.items():
-                if dep_name not in order:
-                    order.append(dep_name)
-                if "dependencies" in dep_info:
-                    extract_from_deps(dep_info["dependencies"])
-        
-        if "dependencies" in npm_output:
-            extract_from_deps(npm_output["dependencies"])
+        if not self.lockfile:
+            return ""
+        digest = hashlib.sha256()
+        with open(self.lockfile, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _is_fresh(self, key: Tuple[str, str, str], stored_at: float) -> bool:
+        # Порядок из lockfile неизменен при том же содержимом; разрешённый через реестр устаревает
+        return bool(key[2]) or time.time() - stored_at < self.order_ttl
+    
+    def _recall(self, key: Tuple[str, str, str]) -> Optional[List[str]]:
+        entry = self._orders.get(key) or self._load_cached(key)
+        if entry is None or not self._is_fresh(key, entry[1]):
+            return None
+        self._orders[key] = entry
+        return entry[0]
+    
+    def _remember(self, key: Tuple[str, str, str], order: List[str]):
+        entry = (order, time.time())
+        self._orders[key] = entry
+        self._store_cached(key, entry)
+    
+    def _resolve_lock_only(self, package: str, version: str) -> List[str]:
+        """
+        Только разрешение дерева: npm пишет package-lock.json, ничего не скачивая в node_modules.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            package_json = {
+                "name": "test-package",
+                "version": "1.0.0",
+                "dependencies": {
+                    package: version
+                }
+            }
+            
+            with open(os.path.join(temp_dir, "package.json"), "w") as f:
+                json.dump(package_json, f)
+            
+            result = subprocess.run(
+                self.npm_command + ["install", "--package-lock-only", "--ignore-scripts",
+                                    "--no-audit", "--no-fund", "--loglevel=error"],
+                cwd=temp_dir,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout
+            )
+            
+            lock_path = os.path.join(temp_dir, "package-lock.json")
+            if result.returncode != 0 or not os.path.exists(lock_path):
+                logger.warning("npm install --package-lock-only failed: %s", result.stderr.strip())
+                return []
+            return self._order_from_lockfile(lock_path)
+    
+    def _order_from_lockfile(self, path: str) -> List[str]:
+        """
+        Имена пакетов в порядке записей "packages" lockfile (так npm раскладывает node_modules),
+        без корня и без пакетов, нужных только devDependencies.
+        """
+        from lockfile import read_lockfile
         
-        return order
+        index = read_lockfile(path, include_dev=False)
+        root = index.paths.get("")
+        # Записи "dev": true нужны только для разработки корня - npm install --omit=dev их не ставит
+        return _unique(name for i, name in enumerate(index.names) if i != root and i not in index.dev)
     
-    def compare_orders(self, our_order: List[str], npm_order: List[str]) -> Dict[str, any]:
+    def _cache_path(self, key: Tuple[str, str, str]) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256("|".join(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "npm-orders", f"{digest}.json")
+    
+    def _load_cached(self, key: Tuple[str, str, str]) -> Optional[Tuple[List[str], float]]:
+        path = self._cache_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return list(data["order"]), float(data["stored_at"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
+    
+    def _store_cached(self, key: Tuple[str, str, str], entry: Tuple[List[str], float]):
+        path = self._cache_path(key)
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"order": entry[0], "stored_at": entry[1]}, f)
+    
+    def compare_orders(self, our_order: List[str], npm_order: List[str]) -> Dict[str, Any]:
         """
-        Сравнивает наш порядок с порядком npm.
+        Сравнивает наш порядок с порядком npm: состав, tau Кендалла и LCS по общим пакетам.
         """
+        our_order = _unique(our_order)
+        npm_order = _unique(npm_order)
         our_set = set(our_order)
         npm_set = set(npm_order)
         
+        # Общие пакеты в нашем порядке, заменённые позициями в порядке npm
+        npm_position = {name: i for i, name in enumerate(npm_order)}
+        ranks = [npm_position[name] for name in our_order if name in npm_position]
+        n = len(ranks)
+        inversions = count_inversions(ranks)
+        pairs = n * (n - 1) // 2
+        lcs = longest_increasing_subsequence(ranks)
+        
         return {
             "common_packages": our_set & npm_set,
             "only_in_our_order": our_set - npm_set,
             "only_in_npm_order": npm_set - our_set,
             "order_matches": our_order == npm_order,
             "our_order_length": len(our_order),
-            "npm_order_length": len(npm_order)
+            "npm_order_length": len(npm_order),
+            "inversions": inversions,
+            "kendall_tau": 1.0 - 2.0 * inversions / pairs if pairs else 1.0,
+            "lcs_length": lcs,
+            "lcs_ratio": lcs / n if n else 1.0
         }
     
-    def explain_differences(self, comparison: Dict[str, any], our_order: List[str], npm_order: List[str]):
+    def explain_differences(self, comparison: Dict[str, Any], our_order: List[str], npm_order: List[str]):
         """
         Объясняет расхождения между нашим порядком и порядком npm.
         """
@@ -97,6 +197,9 @@ class NPMComparator:
         print(f"Only in our order: {len(comparison['only_in_our_order'])}")
         print(f"Only in NPM order: {len(comparison['only_in_npm_order'])}")
         
+        print(f"\nKendall tau over common packages: {comparison['kendall_tau']:.3f} ({comparison['inversions']} inverted pairs)")
+        print(f"Longest common subsequence: {comparison['lcs_length']} ({comparison['lcs_ratio']:.1%} of common packages)")
+        
         if comparison["order_matches"]:
             print("\n Orders match perfectly!")
         else:
@@ -114,4 +217,62 @@ class NPMComparator:
             print("2. NPM использует более сложный алгоритм разрешения версий")
             print("3. NPM может объединять дублирующиеся зависимости")
             print("4. Наш алгоритм использует простую топологическую сортировку")
-            print("5. NPM учитывает package-lock.json и семантическое версионирование")
\ No newline at end of file
+            print("5. NPM учитывает package-lock.json и семантическое версионирование")
+
+
+def _unique(items: Iterable[str]) -> List[str]:
+    """
+    Удаляет повторы с сохранением порядка первого вхождения (O(n) через set).
+    """
+    seen = set()
+    result = []
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            result.append(item)
+    return result
+
+
+def count_inversions(values: List[int]) -> int:
+    """
+    Число пар i < j с values[i] > values[j]; сортировка слиянием снизу вверх, O(n log n).
+    """
+    values = list(values)
+    n = len(values)
+    buffer = [0] * n
+    inversions = 0
+    width = 1
+    while width < n:
+        for low in range(0, n, 2 * width):
+            mid = min(low + width, n)
+            high = min(low + 2 * width, n)
+            i, j, k = low, mid, low
+            while i < mid and j < high:
+                if values[i] <= values[j]:
+                    buffer[k] = values[i]
+                    i += 1
+                else:
+                    buffer[k] = values[j]
+                    inversions += mid - i
+                    j += 1
+                k += 1
+            buffer[k:k + mid - i] = values[i:mid]
+            k += mid - i
+            buffer[k:k + high - j] = values[j:high]
+        values, buffer = buffer, values
+        width *= 2
+    return inversions
+
+
+def longest_increasing_subsequence(values: List[int]) -> int:
+    """
+    Длина LIS (терпеливая сортировка, O(n log n)). Для перестановки общих пакетов равна их LCS.
+    """
+    tails: List[int] = []
+    for value in values:
+        i = bisect.bisect_left(tails, value)
+        if i == len(tails):
+            tails.append(value)
+        else:
+            tails[i] = value
+    return len(tails)
@@ -1,84 +1,188 @@
+import http.client
+import io
 import json
-import urllib.request
-import urllib.error
-from typing import Dict, Set
+import logging
+from typing import Dict, Set, Optional, Sequence, Tuple
 
+from packument_stream import PackageResolution, Selector, decode_body, iter_chunks, stream_package
+from profiling import count, phase, timed
+from registry_client import RegistryClient, RegistryHTTPError, RegistryResponse, default_client
+from repository_format import iter_repository_lines
+from semver import VersionIndex
 
-def fetch_npm_metadata(package: str, version: str, repository_url: str) -> dict:
+logger = logging.getLogger(__name__)
+
+
+def fetch_npm_metadata(package: str, version: str, repository_url: str,
+                       client: Optional[RegistryClient] = None) -> dict:
     """
     Загружает JSON метаданные npm-пакета.
     """
+    client = client or default_client()
     base_url = repository_url.rstrip('/')
     
     if version == "latest":
         url = f"{base_url}/{package}"
     else:
         url = f"{base_url}/{package}/{version}"
-        
-    print(f"Downloading: {url}")
+    
+    body = _get(client, url, package, version, {"Accept-Encoding": "gzip"})
+    with phase("parse"):
+        return json.loads(decode_body(body))
+
+
+ABBREVIATED_ACCEPT = "application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8, */*"
+
+
+def fetch_npm_dependencies(package: str, version: str, repository_url: str,
+                           client: Optional[RegistryClient] = None) -> Dict[str, str]:
+    """
+    Загружает сокращённые метаданные (install-v1, gzip) и потоково извлекает
+    зависимости одной версии, не строя дерево объектов всего packument.
+    """
+    resolution = resolve_npm_package(package, (version,), repository_url, client)
+    resolved = resolution.versions[version]
+    if resolved is None:
+        raise RuntimeError(f"No version of '{package}' satisfies '{version}'")
+    return resolution.dependencies.get(resolved, {})
 
+
+def resolve_npm_package(package: str, specs: Sequence[str], repository_url: str,
+                        client: Optional[RegistryClient] = None, abbreviated: bool = True,
+                        select: Optional[Selector] = None) -> PackageResolution:
+    """
+    Разрешает спецификаторы зависимостей (dist-tag, версия, диапазон semver) одного пакета
+    за один запрос packument. Возвращает индекс версий и зависимости выбранных версий;
+    select выбирает блоки зависимостей версии (dependencies, peer, optional, dev).
+    """
+    client = client or default_client()
+    url = f"{repository_url.rstrip('/')}/{package}"
+    
+    if not abbreviated:
+        metadata = fetch_npm_metadata(package, "latest", repository_url, client)
+        index = VersionIndex(metadata.get("versions", {}).keys(), metadata.get("dist-tags"))
+        select = select or (lambda data: data.get("dependencies") or {})
+        candidates = {
+            number: select(data)
+            for number, data in metadata.get("versions", {}).items()
+        }
+        return PackageResolution.build(index, specs, candidates)
+    
+    headers = {"Accept": ABBREVIATED_ACCEPT, "Accept-Encoding": "gzip"}
+    body = _get(client, url, package, specs[0], headers, cache_key=f"{url}#install-v1")
+    return parse_packument(body, specs, select)
+
+
+def fetch_packument(package: str, repository_url: str, client: Optional[RegistryClient] = None,
+                    validators: Optional[Dict[str, str]] = None, abbreviated: bool = True) -> RegistryResponse:
+    """
+    Сокращённый (или полный при abbreviated=False) packument вместе с заголовками ответа (ETag, Last-Modified).
+    С validators запрос условный и идёт мимо дискового кэша: при ответе 304 тело пустое.
+    """
+    client = client or default_client()
+    url = f"{repository_url.rstrip('/')}/{package}"
+    if not abbreviated:
+        headers = {"Accept-Encoding": "gzip"}
+        cache_key = url
+    else:
+        headers = {"Accept": ABBREVIATED_ACCEPT, "Accept-Encoding": "gzip"}
+        cache_key = f"{url}#install-v1"
+    if validators is None:
+        return _fetch(client, url, package, "latest", headers, cache_key=cache_key)
+    
+    logger.debug("Revalidating: %s", url)
+    return _fetch(client, url, package, "latest", headers, validators=validators)
+
+
+def parse_packument(body: bytes, specs: Sequence[str], select: Optional[Selector] = None) -> PackageResolution:
+    count("packuments_parsed")
     try:
-        with urllib.request.urlopen(url) as response:
-            data = response.read()
-            return json.loads(data)
-    except urllib.error.HTTPError as e:
-        if e.code == 404:
+        with phase("parse"):
+            return stream_package(iter_chunks(io.BytesIO(body)), specs, select)
+    except Exception as e:
+        raise RuntimeError(f"Failed to parse metadata: {e}") from e
+
+
+def node_key(package: str, version: str) -> str:
+    return f"{package}@{version}"
+
+
+def split_node_key(node: str) -> Tuple[str, Optional[str]]:
+    """
+    "name@version" -> (name, version); учитывает scoped-имена вида @scope/name.
+    """
+    index = node.rfind("@")
+    if index <= 0:
+        return node, None
+    return node[:index], node[index + 1:]
+
+
+def _get(client: RegistryClient, url: str, package: str, version: str,
+         headers: Dict[str, str], cache_key: Optional[str] = None) -> bytes:
+    if not client.offline:
+        logger.debug("Downloading: %s", url)
+    return _fetch(client, url, package, version, headers, cache_key).body
+
+
+def _fetch(client: RegistryClient, url: str, package: str, version: str, headers: Dict[str, str],
+           cache_key: Optional[str] = None, validators: Optional[Dict[str, str]] = None) -> RegistryResponse:
+    try:
+        with phase("fetch"):
+            if validators is not None:
+                return client.get_if_modified(url, validators, headers)
+            return client.get(url, headers, cache_key)
+    except RegistryHTTPError as e:
+        if client.offline:
+            raise RuntimeError(f"Package '{package}' is not available in the offline cache.") from e
+        if e.status == 404:
             raise RuntimeError(f"Package '{package}' or version '{version}' not found in repository.") from e
         else:
-            raise RuntimeError(f"HTTP Error {e.code}: {e.reason}") from e
-    except urllib.error.URLError as e:
-        raise RuntimeError(f"Network error: {e.reason}") from e
+            raise RuntimeError(f"HTTP Error {e.status}: {e.reason}") from e
+    except (OSError, http.client.HTTPException) as e:
+        raise RuntimeError(f"Network error: {e}") from e
     except Exception as e:
         raise RuntimeError(f"Failed to fetch metadata: {e}") from e
 
 
-def extract_dependencies(metadata: dict) -> dict:
+@timed("extract_dependencies")
+def extract_dependencies(metadata: dict, version: str = "latest") -> dict:
     """
     Извлекает прямые зависимости из npm JSON.
+    version - dist-tag, точная версия или диапазон semver.
     """
     deps = {}
     
 
     if "dependencies" in metadata:
         deps = metadata["dependencies"]
-        print(f"   Found dependencies in root: {len(deps)}")
+        logger.debug("   Found dependencies in root: %d", len(deps))
     
 
     elif "versions" in metadata and "dist-tags" in metadata:
-        latest_version = metadata["dist-tags"].get("latest")
-        if latest_version and latest_version in metadata["versions"]:
-            version_data = metadata["versions"][latest_version]
+        resolved = VersionIndex(metadata["versions"].keys(), metadata["dist-tags"]).resolve(version)
+        if resolved and resolved in metadata["versions"]:
+            version_data = metadata["versions"][resolved]
             if "dependencies" in version_data:
                 deps = version_data["dependencies"]
-                print(f"   Found dependencies in versions/{latest_version}: {len(deps)}")
+                logger.debug("   Found dependencies in versions/%s: %d", resolved, len(deps))
     
-    if deps:
-        print(f"   Dependencies: {list(deps.keys())}")
-    else:
-        print(f"   No dependencies found")
+    if logger.isEnabledFor(logging.DEBUG):
+        if deps:
+            logger.debug("   Dependencies: %s", list(deps.keys()))
+        else:
+            logger.debug("   No dependencies found")
         
     return deps
 
 
+@timed("parse_repository")
 def parse_test_repository(file_path: str) -> Dict[str, Set[str]]:
     """
-    Парсит тестовый репозиторий из файла.
+    Парсит тестовый репозиторий из файла в словарь.
+    Для больших файлов - repository_format.load_repository (компактный граф или снимок).
     """
-    graph = {}
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                if ':' in line:
-                    package, deps_str = line.split(':', 1)
-                    package = package.strip()
-                    dependencies = {dep.strip() for dep in deps_str.split(',') if dep.strip()}
-                    
-                    graph[package] = dependencies
-                    
-        return graph
-    except Exception as e:
-        raise RuntimeError(f"Failed to parse test repository: {e}")
\ No newline at end of file
+    graph: Dict[str, Set[str]] = {}
+    for package, dependencies in iter_repository_lines(file_path):
+        # Повторная строка пакета перекрывает прежнюю
+        graph[package] = set(dependencies)
+    return graph
@@ -0,0 +1,244 @@
+import codecs
+import json
+import zlib
+from json.decoder import scanstring
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from semver import VersionIndex
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+_WHITESPACE = " \t\n\r"
+
+DEPENDENCY_FIELDS = ("dependencies", "optionalDependencies", "peerDependencies", "devDependencies")
+
+Selector = Callable[[dict], Dict[str, str]]
+
+
+def _plain_dependencies(version_data: dict) -> Dict[str, str]:
+    return version_data.get("dependencies") or {}
+
+
+@dataclass
+class PackageResolution:
+    """
+    Итог разрешения пакета: индекс версий, spec -> версия и зависимости всех версий пакета
+(одинаковые словари зависимостей разных версий - один объект).
+    """
+    index: VersionIndex
+    versions: Dict[str, Optional[str]]
+    dependencies: Dict[str, Dict[str, str]]
+
+    @classmethod
+    def build(cls, index: VersionIndex, specs: Sequence[str], candidates: Dict[str, Dict[str, str]]) -> "PackageResolution":
+        versions = {spec: index.resolve(spec) for spec in specs}
+        return cls(index, versions, candidates)
+
+
+def decode_body(body: bytes) -> bytes:
+    """
+    Распаковывает тело ответа, если оно сжато gzip.
+    """
+    if body[:2] == GZIP_MAGIC:
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    return body
+
+
+def iter_chunks(fp, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Читает бинарный поток кусками, прозрачно распаковывая gzip (по сигнатуре).
+    """
+    first = fp.read(chunk_size)
+    if not first:
+        return
+    if first[:2] != GZIP_MAGIC:
+        yield first
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    # Ограничиваем размер распакованного куска: сжатие у JSON бывает 20-100x
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    chunk = first
+    while chunk:
+        while chunk:
+            data = decompressor.decompress(chunk, chunk_size)
+            if data:
+                yield data
+            chunk = decompressor.unconsumed_tail
+        chunk = fp.read(chunk_size)
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+class JsonStreamReader:
+    """
+    Инкрементальный разбор JSON поверх потока байтов: объекты верхних уровней
+    обходятся по ключам, а значения декодируются (или пропускаются) по одному,
+    так что в памяти одновременно находится лишь небольшой фрагмент документа.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.bytes_read = 0
+
+    def _fill(self, min_chars: int = 1) -> bool:
+        # Отбрасываем уже разобранный префикс, чтобы буфер не рос вместе с документом
+        if self.pos > 65536 and self.pos > len(self.buf) // 2:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        added = 0
+        parts = []
+        while added < min_chars and not self.eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.eof = True
+                parts.append(self._decoder.decode(b"", final=True))
+                break
+            self.bytes_read += len(chunk)
+            text = self._decoder.decode(chunk)
+            parts.append(text)
+            added += len(text)
+        if parts:
+            self.buf += "".join(parts)
+        return added > 0
+
+    def _skip_ws(self):
+        while True:
+            buf, pos = self.buf, self.pos
+            n = len(buf)
+            while pos < n and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < n or not self._fill():
+                return
+
+    def peek(self) -> str:
+        self._skip_ws()
+        if self.pos >= len(self.buf):
+            raise ValueError("Unexpected end of JSON stream")
+        return self.buf[self.pos]
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, got '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def read_value(self):
+        """
+        Декодирует очередное JSON-значение целиком (C-декодером json).
+        """
+        self._skip_ws()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill(max(len(self.buf) - self.pos, 65536))
+                continue
+            # Значение, упирающееся в конец буфера, может быть обрезанным числом
+            if end >= len(self.buf) and not self.eof:
+                self._fill(65536)
+                continue
+            self.pos = end
+            return value
+
+    def skip_value(self):
+        self.read_value()
+
+    def _read_key(self) -> str:
+        self.expect('"')
+        while True:
+            try:
+                key, end = scanstring(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill(65536)
+                continue
+            self.pos = end
+            self.expect(":")
+            return key
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Перебирает ключи объекта; значение каждого ключа обязан поглотить вызывающий
+        (read_value, skip_value или вложенный iter_object).
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            yield self._read_key()
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}")
+
+
+def stream_package(chunks: Iterable[bytes], specs: Sequence[str] = ("latest",),
+                   select: Optional[Selector] = None) -> PackageResolution:
+    """
+    Потоково разбирает packument и разрешает спецификаторы specs (dist-tag, версия или диапазон).
+    Сохраняются только номера версий и словари зависимостей каждой версии: следующий spec
+    того же пакета разрешается без повторной загрузки. select выбирает, какие блоки
+    зависимостей учитывать (по умолчанию только dependencies).
+    """
+    select = select or _plain_dependencies
+    reader = JsonStreamReader(chunks)
+    dist_tags: Optional[dict] = None
+    numbers: List[str] = []
+    kept: Dict[str, Dict[str, str]] = {}
+    # Соседние версии обычно объявляют одни и те же зависимости - храним один словарь на всех
+    shared: Dict[Tuple[Tuple[str, str], ...], Dict[str, str]] = {}
+    root_version: Optional[str] = None
+    root_fields: Dict[str, dict] = {}
+
+    for key in reader.iter_object():
+        if key == "dist-tags":
+            dist_tags = reader.read_value()
+        elif key in DEPENDENCY_FIELDS and key not in root_fields:
+            # Документ конкретной версии (/<package>/<version>)
+            root_fields[key] = reader.read_value() or {}
+        elif key == "version" and root_version is None:
+            root_version = reader.read_value()
+        elif key == "versions":
+            for number in reader.iter_object():
+                numbers.append(number)
+                dependencies = select(reader.read_value() or {})
+                kept[number] = shared.setdefault(tuple(dependencies.items()), dependencies)
+        else:
+            reader.skip_value()
+
+    if "dependencies" in root_fields and not numbers:
+        numbers = [root_version] if root_version else []
+        kept = {root_version: select(root_fields)} if root_version else {}
+        dist_tags = dist_tags or ({"latest": root_version} if root_version else {})
+
+    return PackageResolution.build(VersionIndex(numbers, dist_tags), specs, kept)
+
+
+def stream_dependencies(chunks: Iterable[bytes], version: str = "latest") -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    Потоково извлекает зависимости одной версии из packument.
+    Возвращает (разрешённая версия, dependencies); packument целиком не материализуется.
+    """
+    resolution = stream_package(chunks, (version,))
+    resolved = resolution.versions.get(version)
+    return resolved, resolution.dependencies.get(resolved, {})
+
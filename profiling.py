@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Dict, List, Optional
+
+# Границы корзин гистограммы задержек запросов, миллисекунды
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_NULL = nullcontext()
+_active: Optional["Profiler"] = None
+
+
+class PhaseStats:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler:
+    """
+    Таймеры фаз и счётчики одного запуска. Фазы могут вкладываться и вызываться из рабочих потоков,
+    поэтому сумма фаз не обязана совпадать с общим временем. С trace=True каждое
+    вхождение в фазу сохраняется событием для Chrome trace (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self, trace: bool = False):
+        self.trace = trace
+        self.started = time.perf_counter()
+        self.phases: Dict[str, PhaseStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started, time.perf_counter())
+
+    def record(self, name: str, started: float, finished: float):
+        elapsed = finished - started
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.calls += 1
+            stats.total += elapsed
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if self.trace:
+                self.events.append({
+                    "name": name, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                    "ts": round((started - self.started) * 1e6, 1), "dur": round(elapsed * 1e6, 1),
+                })
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def wall(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self, client=None, nodes: int = 0, edges: int = 0) -> dict:
+        """
+        Машиночитаемая сводка: фазы, счётчики, гистограмма задержек и скорость обхода.
+        """
+        wall = self.wall()
+        report = {
+            "wall_seconds": round(wall, 6),
+            "phases": {
+                name: {"calls": s.calls, "total_seconds": round(s.total, 6), "max_seconds": round(s.max, 6)}
+                for name, s in sorted(self.phases.items(), key=lambda item: -item[1].total)
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "nodes_per_second": round(nodes / wall, 1) if wall else 0.0,
+            "edges_per_second": round(edges / wall, 1) if wall else 0.0,
+        }
+        if client is not None:
+            report["requests"] = client.requests
+            report["bytes_downloaded"] = client.bytes_received
+            # Гистограмма - по последним сохранённым замерам клиента
+            report["latency_histogram_ms"] = latency_histogram(t.total * 1000 for t in list(client.timings))
+        return report
+
+    def format_report(self, client=None, nodes: int = 0, edges: int = 0) -> str:
+        summary = self.summary(client, nodes, edges)
+        wall = summary["wall_seconds"]
+        lines = [f"Profile: wall {wall:.3f}s, {nodes} nodes, {edges} edges "
+                 f"({summary['nodes_per_second']:.0f} nodes/s, {summary['edges_per_second']:.0f} edges/s)"]
+        lines.append(f"  {'phase':<22} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'% wall':>7}")
+        for name, s in summary["phases"].items():
+            mean = s["total_seconds"] / s["calls"] * 1000 if s["calls"] else 0.0
+            share = s["total_seconds"] / wall * 100 if wall else 0.0
+            lines.append(f"  {name:<22} {s['calls']:>7} {s['total_seconds']:>9.3f} {mean:>9.3f} "
+                         f"{s['max_seconds'] * 1000:>9.3f} {share:>6.1f}%")
+        for name, value in summary["counters"].items():
+            lines.append(f"  {name:<22} {value:>7}")
+        if "requests" in summary:
+            lines.append(f"  requests={summary['requests']} downloaded={summary['bytes_downloaded']} bytes")
+            histogram = summary["latency_histogram_ms"]
+            peak = max(histogram.values(), default=0)
+            for bucket, amount in histogram.items():
+                bar = "#" * (round(amount / peak * 30) if peak else 0)
+                lines.append(f"  {bucket:>10} ms {amount:>7} {bar}")
+        return "\n".join(lines)
+
+    def write_trace(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+def latency_histogram(latencies_ms) -> Dict[str, int]:
+    labels = [f"<{bound}" for bound in LATENCY_BUCKETS_MS] + [f">={LATENCY_BUCKETS_MS[-1]}"]
+    histogram = dict.fromkeys(labels, 0)
+    for value in latencies_ms:
+        for bound, label in zip(LATENCY_BUCKETS_MS, labels):
+            if value < bound:
+                histogram[label] += 1
+                break
+        else:
+            histogram[labels[-1]] += 1
+    return histogram
+
+
+def enable(profiler: Optional[Profiler]):
+    global _active
+    _active = profiler
+
+
+def phase(name: str):
+    """
+    Таймер фазы активного профайлера; без него - общий пустой контекст, почти без накладных расходов.
+    """
+    profiler = _active
+    if profiler is None:
+        return _NULL
+    return profiler.phase(name)
+
+
+def timed(name: str):
+    """
+    Декоратор: вызов функции - фаза name; без активного профайлера - одна лишняя проверка.
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, amount: int = 1):
+    profiler = _active
+    if profiler is not None:
+        profiler.count(name, amount)
@@ -0,0 +1,355 @@
+import http.client
+import random
+import socket
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from metadata_cache import MetadataCache
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+
+class RegistryHTTPError(RuntimeError):
+    def __init__(self, status: int, reason: str, url: str):
+        super().__init__(f"HTTP Error {status}: {reason}")
+        self.status = status
+        self.reason = reason
+        self.url = url
+
+
+@dataclass
+class RequestTiming:
+    url: str
+    status: int = 0
+    dns: float = 0.0
+    connect: float = 0.0
+    tls: float = 0.0
+    ttfb: float = 0.0
+    body: float = 0.0
+    bytes: int = 0
+    reused: bool = False
+    attempts: int = 1
+
+    @property
+    def total(self) -> float:
+        return self.dns + self.connect + self.tls + self.ttfb + self.body
+
+
+@dataclass
+class RegistryResponse:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    timing: Optional[RequestTiming] = None
+    from_cache: bool = False
+
+
+def _split_url(url: str) -> Tuple[Tuple[str, str, int], str]:
+    parts = urlsplit(url)
+    scheme = parts.scheme or "http"
+    port = parts.port or (443 if scheme == "https" else 80)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return (scheme, parts.hostname or "", port), path
+
+
+class _TimedConnectMixin:
+    """
+    Соединение, которое отдельно замеряет DNS и TCP connect.
+    """
+    dns_time = 0.0
+    connect_time = 0.0
+    tls_time = 0.0
+
+    def _timed_connect(self):
+        started = time.perf_counter()
+        infos = socket.getaddrinfo(self.host, self.port, 0, socket.SOCK_STREAM)
+        resolved = time.perf_counter()
+
+        sock = None
+        last_error: Optional[OSError] = None
+        for family, socktype, proto, _canonname, address in infos:
+            try:
+                sock = socket.socket(family, socktype, proto)
+                sock.settimeout(self.timeout)
+                sock.connect(address)
+                break
+            except OSError as e:
+                last_error = e
+                if sock is not None:
+                    sock.close()
+                sock = None
+        if sock is None:
+            raise last_error or OSError(f"Cannot connect to {self.host}:{self.port}")
+
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self.dns_time = resolved - started
+        self.connect_time = time.perf_counter() - resolved
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, http.client.HTTPConnection):
+    def connect(self):
+        self._timed_connect()
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, http.client.HTTPSConnection):
+    def connect(self):
+        self._timed_connect()
+        started = time.perf_counter()
+        self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host)
+        self.tls_time = time.perf_counter() - started
+
+
+class RegistryClient:
+    """
+    HTTP-клиент реестра с пулом keep-alive соединений на каждый хост,
+    таймаутами, повторами с экспоненциальной задержкой на 429/5xx,
+    дисковым кэшем и замерами каждого запроса (DNS/connect/TLS/TTFB/body).
+    Потокобезопасен: один экземпляр используют и рекурсивный, и параллельный обход.
+    """
+
+    def __init__(self, timeout: float = 30.0, connect_timeout: float = 10.0, max_retries: int = 3,
+                 backoff: float = 0.5, pool_size: int = 8, cache: Optional[MetadataCache] = None,
+                 offline: bool = False, max_timings: int = 100000):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.cache = cache
+        self.offline = offline
+        # Последние max_timings замеров - только для перцентилей; итоги считают счётчики ниже
+        self.timings: Deque[RequestTiming] = deque(maxlen=max_timings)
+        self.requests = 0
+        self.bytes_received = 0
+        self.reused_connections = 0
+        self.retries = 0
+        self.connections_opened = 0
+        self._pools: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, cache_key: Optional[str] = None) -> RegistryResponse:
+        """
+        GET с учётом кэша: свежая запись отдаётся без сети, устаревшая ревалидируется.
+        Коды, отличные от 2xx, поднимаются как RegistryHTTPError.
+        """
+        headers = dict(headers or {})
+        key = cache_key or url
+        entry = None
+        if self.cache is not None:
+            entry = self.cache.get(key)
+            if entry is not None and (self.offline or self.cache.is_fresh(entry)):
+                self.cache.record_hit()
+                return RegistryResponse(200, _validator_headers(entry), entry.body, from_cache=True)
+            headers.update(self.cache.validators(entry))
+
+        if self.offline:
+            raise RegistryHTTPError(504, "Not available in the offline cache", url)
+
+        response = self.request(url, headers)
+        if response.status == 304 and entry is not None:
+            self.cache.refresh(entry)
+            return RegistryResponse(200, response.headers, entry.body, response.timing, from_cache=True)
+        if not 200 <= response.status < 300:
+            raise RegistryHTTPError(response.status, http.client.responses.get(response.status, "Unknown"), url)
+
+        if self.cache is not None:
+            self.cache.put(key, response.body, response.headers.get("etag"), response.headers.get("last-modified"))
+        return response
+
+    def get_if_modified(self, url: str, validators: Dict[str, str],
+                        headers: Optional[Dict[str, str]] = None) -> RegistryResponse:
+        """
+        Условный GET по сохранённым валидаторам (If-None-Match / If-Modified-Since) мимо кэша.
+        Ответ 304 возвращается как есть, с пустым телом.
+        """
+        if self.offline:
+            raise RegistryHTTPError(504, "Not available in the offline cache", url)
+        response = self.request(url, {**(headers or {}), **validators})
+        if response.status == 304:
+            return response
+        if not 200 <= response.status < 300:
+            raise RegistryHTTPError(response.status, http.client.responses.get(response.status, "Unknown"), url)
+        return response
+
+    def request(self, url: str, headers: Optional[Dict[str, str]] = None, max_redirects: int = 5) -> RegistryResponse:
+        """
+        Один логический запрос: повторы, редиректы, замеры времени.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self._send(url, headers or {})
+            except (OSError, http.client.HTTPException):
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep_before_retry(attempt, None)
+                attempt += 1
+                continue
+
+            if response.status in REDIRECT_STATUSES and max_redirects > 0 and "location" in response.headers:
+                url = urljoin(url, response.headers["location"])
+                max_redirects -= 1
+                continue
+            if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                self._sleep_before_retry(attempt, response.headers.get("retry-after"))
+                attempt += 1
+                continue
+
+            response.timing.attempts = attempt + 1
+            return response
+
+    def _sleep_before_retry(self, attempt: int, retry_after: Optional[str]):
+        with self._lock:
+            self.retries += 1
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+    def _send(self, url: str, headers: Dict[str, str]) -> RegistryResponse:
+        host_key, path = _split_url(url)
+        conn, reused = self._acquire(host_key)
+        timing = RequestTiming(url=url, reused=reused)
+        try:
+            if not reused:
+                conn.connect()
+                conn.sock.settimeout(self.timeout)
+                timing.dns, timing.connect, timing.tls = conn.dns_time, conn.connect_time, conn.tls_time
+
+            started = time.perf_counter()
+            try:
+                conn.request("GET", path, headers={"Connection": "keep-alive", **headers})
+                raw = conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                if not reused:
+                    raise
+                # Сервер закрыл простаивавшее keep-alive соединение - повторяем на новом
+                conn.close()
+                return self._send_fresh(url, headers)
+            timing.ttfb = time.perf_counter() - started
+
+            started = time.perf_counter()
+            body = raw.read()
+            timing.body = time.perf_counter() - started
+        except BaseException:
+            conn.close()
+            raise
+
+        timing.status = raw.status
+        timing.bytes = len(body)
+        response_headers = {k.lower(): v for k, v in raw.getheaders()}
+        if raw.will_close:
+            conn.close()
+        else:
+            self._release(host_key, conn)
+
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += timing.bytes
+            self.reused_connections += reused
+        self.timings.append(timing)
+        return RegistryResponse(raw.status, response_headers, body, timing)
+
+    def _send_fresh(self, url: str, headers: Dict[str, str]) -> RegistryResponse:
+        host_key, _path = _split_url(url)
+        with self._lock:
+            # Остальные простаивающие соединения к этому хосту, скорее всего, тоже закрыты
+            for conn in self._pools.pop(host_key, []):
+                conn.close()
+        return self._send(url, headers)
+
+    def _acquire(self, host_key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            idle = self._pools.get(host_key)
+            if idle:
+                return idle.pop(), True
+            self.connections_opened += 1
+
+        scheme, host, port = host_key
+        connection_class = _TimedHTTPSConnection if scheme == "https" else _TimedHTTPConnection
+        return connection_class(host, port, timeout=self.connect_timeout), False
+
+    def _release(self, host_key: Tuple[str, str, int], conn: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._pools.setdefault(host_key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Сводные счётчики запросов для машиночитаемого отчёта.
+        """
+        return {
+            "requests": self.requests,
+            "connections": self.connections_opened,
+            "reused": self.reused_connections,
+            "retries": self.retries,
+            "bytes": self.bytes_received,
+        }
+
+    def format_metrics(self) -> str:
+        timings = list(self.timings)
+        if not timings:
+            return "HTTP metrics: no network requests"
+
+        def percentiles(values: List[float]) -> str:
+            values = sorted(values)
+            p50 = values[len(values) // 2]
+            p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+            return f"p50={p50 * 1000:.1f}ms p95={p95 * 1000:.1f}ms"
+
+        fresh = [t for t in timings if not t.reused]
+        lines = ["HTTP metrics: " + " ".join(f"{k}={v}" for k, v in self.summary().items())]
+        if fresh:
+            lines.append(f"  dns      {percentiles([t.dns for t in fresh])}")
+            lines.append(f"  connect  {percentiles([t.connect for t in fresh])}")
+            if any(t.tls for t in fresh):
+                lines.append(f"  tls      {percentiles([t.tls for t in fresh])}")
+        lines.append(f"  ttfb     {percentiles([t.ttfb for t in timings])}")
+        lines.append(f"  body     {percentiles([t.body for t in timings])}")
+        lines.append(f"  total    {percentiles([t.total for t in timings])}")
+        return "\n".join(lines)
+
+
+def _validator_headers(entry) -> Dict[str, str]:
+    headers = {}
+    if entry.etag:
+        headers["etag"] = entry.etag
+    if entry.last_modified:
+        headers["last-modified"] = entry.last_modified
+    return headers
+
+
+_default_client: Optional[RegistryClient] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> RegistryClient:
+    """
+    Общий клиент процесса для вызовов без явно переданного клиента.
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = RegistryClient()
+        return _default_client
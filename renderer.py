@@ -0,0 +1,259 @@
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from html import escape
+from typing import Dict, Iterable, List, Optional, Set, TextIO
+
+logger = logging.getLogger(__name__)
+
+# Выше этого числа узлов dot раскладывает граф минутами - переходим на sfdp
+DOT_NODE_LIMIT = 2000
+
+_COLUMN = 190
+# Ширина встроенного SVG ограничена: слой шире этого числа узлов переносится на несколько строк
+SVG_MAX_COLUMNS = 40
+_ROW = 90
+_BOX_HEIGHT = 26
+_MARGIN = 20
+# Глубже этого уровня дерево продолжается отдельным разделом, чтобы отступы не росли без предела
+TREE_MAX_INDENT = 24
+
+
+def _edges(graph) -> Dict[str, Set[str]]:
+    return graph.get_all_dependencies()
+
+
+def _node_count(graph) -> int:
+    # CompactDependencyGraph считает узлы сам: get_all_dependencies() у него строит копию графа
+    node_count = getattr(graph, "node_count", None)
+    if node_count is not None:
+        return node_count()
+    return len(graph.get_all_dependencies())
+
+
+def find_roots(dependencies: Dict[str, Set[str]]) -> List[str]:
+    """
+    Узлы, от которых никто не зависит; если весь граф - один цикл, берётся наименьший узел.
+    """
+    targets: Set[str] = set()
+    for deps in dependencies.values():
+        targets.update(deps)
+    roots = sorted(node for node in dependencies if node not in targets)
+    if not roots and dependencies:
+        roots = [min(dependencies)]
+    return roots
+
+
+def _cycle_nodes(graph) -> Set[str]:
+    return {node for group in graph.find_cycles() for node in group}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def write_dot(graph, out: TextIO):
+    """
+    Пишет граф в формате Graphviz DOT построчно; пакеты из циклов выделены цветом.
+    """
+    dependencies = _edges(graph)
+    cyclic = _cycle_nodes(graph)
+    out.write("digraph dependencies {\n")
+    out.write("  rankdir=TB;\n  node [shape=box, fontsize=10, fontname=\"Helvetica\"];\n")
+    for node in sorted(cyclic):
+        out.write(f"  {_quote(node)} [style=filled, fillcolor=\"#f8d7da\"];\n")
+    for node, deps in sorted(dependencies.items()):
+        if not deps:
+            out.write(f"  {_quote(node)};\n")
+        for dependency in sorted(deps):
+            out.write(f"  {_quote(node)} -> {_quote(dependency)};\n")
+    out.write("}\n")
+
+
+def layered_layout(graph) -> List[List[str]]:
+    """
+    Слои для встроенной SVG-раскладки: волны установки, корни сверху.
+    Внутри слоя узлы упорядочены по среднему положению зависящих от них (один проход барицентра).
+    """
+    dependencies = _edges(graph)
+    layers = [list(wave) for wave in reversed(graph.get_install_waves())]
+    position: Dict[str, float] = {}
+    parents: Dict[str, List[str]] = {}
+    for node, deps in dependencies.items():
+        for dependency in deps:
+            parents.setdefault(dependency, []).append(node)
+
+    for layer in layers:
+        def barycenter(node: str) -> float:
+            placed = [position[p] for p in parents.get(node, ()) if p in position]
+            return sum(placed) / len(placed) if placed else float("inf")
+        layer.sort(key=lambda node: (barycenter(node), node))
+        for i, node in enumerate(layer):
+            position[node] = i
+    return layers
+
+
+def write_svg(graph, out: TextIO, max_columns: int = SVG_MAX_COLUMNS):
+    """
+    Встроенная раскладка без Graphviz: слои по волнам установки, элементы пишутся в поток по одному.
+    Слой шире max_columns узлов сворачивается в несколько строк, так что ширина холста ограничена.
+    """
+    dependencies = _edges(graph)
+    cyclic = _cycle_nodes(graph)
+    layers = layered_layout(graph)
+    max_columns = max(1, max_columns)
+    coordinates: Dict[str, tuple] = {}
+    layer_of: Dict[str, int] = {}
+    row = 0
+    for number, layer in enumerate(layers):
+        for i, node in enumerate(layer):
+            column = i % max_columns
+            coordinates[node] = (_MARGIN + column * _COLUMN, _MARGIN + (row + i // max_columns) * _ROW)
+            layer_of[node] = number
+        row += max(1, -(-len(layer) // max_columns))
+
+    width = _MARGIN * 2 + min(max((len(layer) for layer in layers), default=0), max_columns) * _COLUMN
+    height = _MARGIN * 2 + row * _ROW
+    box = _COLUMN - 30
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+              f'viewBox="0 0 {width} {height}" font-family="Helvetica" font-size="10">\n')
+    out.write('<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="6" '
+              'markerHeight="6" orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="#555"/></marker></defs>\n')
+
+    out.write('<g stroke="#999" fill="none" marker-end="url(#arrow)">\n')
+    for node, deps in sorted(dependencies.items()):
+        x1, y1 = coordinates[node]
+        for dependency in sorted(deps):
+            x2, y2 = coordinates[dependency]
+            if y1 == y2:
+                # Ребро внутри строки слоя (цикл) - дугой над узлами
+                out.write(f'<path d="M{x1 + box / 2},{y1} Q{(x1 + x2 + box) / 2},{y1 - _ROW / 2} '
+                          f'{x2 + box / 2},{y2}" stroke="#c0392b"/>\n')
+            elif layer_of[node] == layer_of[dependency]:
+                # Ребро внутри слоя, свёрнутого на несколько строк
+                start, end = (y1 + _BOX_HEIGHT, y2) if y1 < y2 else (y1, y2 + _BOX_HEIGHT)
+                out.write(f'<path d="M{x1 + box / 2},{start} L{x2 + box / 2},{end}" stroke="#c0392b"/>\n')
+            else:
+                out.write(f'<path d="M{x1 + box / 2},{y1 + _BOX_HEIGHT} L{x2 + box / 2},{y2}"/>\n')
+    out.write('</g>\n')
+
+    out.write('<g>\n')
+    for node, (x, y) in coordinates.items():
+        fill = "#f8d7da" if node in cyclic else "#eef3fb"
+        label = node if len(node) <= 30 else node[:28] + "…"
+        out.write(f'<g><title>{escape(node)}</title><rect x="{x}" y="{y}" width="{box}" height="{_BOX_HEIGHT}" '
+                  f'rx="4" fill="{fill}" stroke="#4a6fa5"/>'
+                  f'<text x="{x + box / 2}" y="{y + 17}" text-anchor="middle">{escape(label)}</text></g>\n')
+    out.write('</g>\n</svg>\n')
+
+
+def write_ascii_tree(graph, out: TextIO, roots: Optional[Iterable[str]] = None, max_indent: int = TREE_MAX_INDENT):
+    """
+    Дерево зависимостей в тексте. Каждое поддерево раскрывается один раз, повторные вхождения
+    даются ссылкой "(*)", обратные рёбра - пометкой "(cycle)". Поддеревья глубже max_indent
+    выносятся отдельными разделами ниже, так что размер вывода O((V + E) * max_indent).
+    """
+    dependencies = _edges(graph)
+    sections = list(roots) if roots is not None else find_roots(dependencies)
+    expanded: Set[str] = set()
+    shared = False
+
+    i = 0
+    while i < len(sections):
+        root = sections[i]
+        i += 1
+        if i > 1 and root in expanded:
+            continue
+        out.write(f"\n{root}\n" if i > 1 else f"{root}\n")
+        expanded.add(root)
+        on_path = {root}
+        stack = [(root, sorted(dependencies.get(root, ())), 0, "")]
+        while stack:
+            node, children, index, prefix = stack[-1]
+            if index == len(children):
+                stack.pop()
+                on_path.discard(node)
+                continue
+            stack[-1] = (node, children, index + 1, prefix)
+            child = children[index]
+            last = index == len(children) - 1
+            branch = "└── " if last else "├── "
+            grandchildren = dependencies.get(child)
+            if child in on_path:
+                out.write(f"{prefix}{branch}{child} (cycle)\n")
+            elif child in expanded and grandchildren:
+                out.write(f"{prefix}{branch}{child} (*)\n")
+                shared = True
+            elif grandchildren and len(stack) >= max_indent:
+                out.write(f"{prefix}{branch}{child} (continued below)\n")
+                sections.append(child)
+            else:
+                out.write(f"{prefix}{branch}{child}\n")
+                expanded.add(child)
+                if grandchildren:
+                    on_path.add(child)
+                    stack.append((child, sorted(grandchildren), 0, prefix + ("    " if last else "│   ")))
+    if shared:
+        out.write("(*) subtree already shown above\n")
+
+
+def graphviz_engine(node_count: int) -> Optional[str]:
+    engine = "dot" if node_count <= DOT_NODE_LIMIT else "sfdp"
+    if shutil.which(engine):
+        return engine
+    return shutil.which("dot") and "dot"
+
+
+def render(graph, output: str) -> str:
+    """
+    Рендерит граф в файл по расширению output: .dot, .svg, .png (или другой формат Graphviz), .txt (дерево).
+    SVG и PNG строятся Graphviz, если он установлен; иначе SVG - встроенной раскладкой,
+    а вместо PNG пишется SVG рядом. Возвращает путь к записанному файлу.
+    """
+    extension = os.path.splitext(output)[1].lower().lstrip(".") or "dot"
+    if extension in ("dot", "gv"):
+        with open(output, "w", encoding="utf-8") as f:
+            write_dot(graph, f)
+        return output
+    if extension == "txt":
+        with open(output, "w", encoding="utf-8") as f:
+            write_ascii_tree(graph, f)
+        return output
+
+    engine = graphviz_engine(_node_count(graph))
+    if engine is not None:
+        return _render_graphviz(graph, output, extension, engine)
+
+    if extension != "svg":
+        svg_output = os.path.splitext(output)[0] + ".svg"
+        logger.warning("Graphviz not found: writing %s with the built-in layout instead of %s", svg_output, output)
+        output = svg_output
+    with open(output, "w", encoding="utf-8") as f:
+        write_svg(graph, f)
+    return output
+
+
+def _render_graphviz(graph, output: str, extension: str, engine: str) -> str:
+    # DOT пишется во временный файл потоком, затем Graphviz читает его сам
+    with tempfile.NamedTemporaryFile("w", suffix=".dot", encoding="utf-8", delete=False) as f:
+        write_dot(graph, f)
+        dot_path = f.name
+    try:
+        result = subprocess.run(
+            [engine, f"-T{extension}", "-o", output, dot_path],
+            capture_output=True,
+            text=True
+        )
+    finally:
+        os.remove(dot_path)
+    if result.returncode != 0:
+        raise RuntimeError(f"Graphviz {engine} failed: {result.stderr.strip()}")
+    return output
+
+
+def print_ascii_tree(graph):
+    write_ascii_tree(graph, sys.stdout)
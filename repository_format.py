@@ -0,0 +1,98 @@
+import random
+from typing import Dict, Iterator, List, Tuple
+
+from compact_graph import SNAPSHOT_MAGIC, CompactDependencyGraph
+from profiling import timed
+
+
+class RepositoryFormatError(RuntimeError):
+    """
+    Ошибка в файле тестового репозитория с указанием строки.
+    """
+
+    def __init__(self, path: str, line_number: int, message: str):
+        super().__init__(f"{path}:{line_number}: {message}")
+        self.path = path
+        self.line_number = line_number
+
+
+def iter_repository_lines(file_path: str) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Потоково читает файл вида "PACKAGE: DEP1, DEP2" и выдаёт (пакет, зависимости) по строке.
+    Пустые строки и комментарии (#) пропускаются, строка без ':' - ошибка с её номером.
+    """
+    try:
+        f = open(file_path, "r", encoding="utf-8")
+    except OSError as e:
+        raise RuntimeError(f"Failed to open test repository: {e}") from e
+
+    with f:
+        line_number = 0
+        try:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                package, separator, deps_str = line.partition(":")
+                package = package.strip()
+                if not separator:
+                    raise RepositoryFormatError(file_path, line_number, f"expected 'PACKAGE: DEPS', got '{line[:80]}'")
+                if not package:
+                    raise RepositoryFormatError(file_path, line_number, "empty package name")
+                yield package, [dep for dep in map(str.strip, deps_str.split(",")) if dep]
+        except UnicodeDecodeError as e:
+            raise RepositoryFormatError(file_path, line_number + 1, f"invalid UTF-8: {e}") from e
+
+
+def is_snapshot(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+@timed("parse_repository")
+def load_repository(file_path: str) -> CompactDependencyGraph:
+    """
+    Тестовый репозиторий как компактный граф: бинарный снимок открывается через mmap,
+    текстовый файл разбирается потоково, рёбра сразу интернируются в целые id.
+    """
+    try:
+        if is_snapshot(file_path):
+            return CompactDependencyGraph.load(file_path)
+    except OSError as e:
+        raise RuntimeError(f"Failed to open test repository: {e}") from e
+
+    graph = CompactDependencyGraph()
+    # Как и parse_test_repository: из повторных строк пакета действует последняя
+    repeated: Dict[str, List[str]] = {}
+    for package, dependencies in iter_repository_lines(file_path):
+        if package in graph:
+            repeated[package] = dependencies
+        else:
+            graph.add_dependencies(package, dependencies)
+    if repeated:
+        graph.replace_dependencies(repeated)
+    graph.edge_count()
+    return graph
+
+
+def generate_repository(file_path: str, packages: int, fanout: int = 5, cycle_ratio: float = 0.001,
+                        seed: int = 0, window: int = 1000) -> int:
+    """
+    Пишет синтетический репозиторий в текстовом формате; рёбра в основном идут к пакетам
+    с большими номерами (не дальше window), небольшая доля - назад (циклы). Возвращает число рёбер.
+    Малое window даёт длинные цепочки, window порядка packages - неглубокий граф, как у реестра.
+    """
+    rng = random.Random(seed)
+    names = [f"PKG{i:07d}" for i in range(packages)]
+    edges = 0
+    with open(file_path, "w", encoding="utf-8") as f:
+        for i, name in enumerate(names):
+            targets = set()
+            for _ in range(rng.randint(0, 2 * fanout)):
+                if rng.random() < cycle_ratio and i > 0:
+                    targets.add(rng.randrange(i))
+                elif i + 1 < packages:
+                    targets.add(rng.randrange(i + 1, min(packages, i + window)))
+            edges += len(targets)
+            f.write(f"{name}: {', '.join(names[t] for t in sorted(targets))}\n")
+    return edges
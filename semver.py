@@ -0,0 +1,237 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Ключ сортировки версии: (major, minor, patch, нет_prerelease, prerelease-идентификаторы)
+VersionKey = Tuple[int, int, int, int, Tuple[Tuple[int, object], ...]]
+Comparator = Tuple[str, VersionKey]
+
+_VERSION_RE = re.compile(
+    r"^\s*[v=]*\s*(\d+)\.(\d+)\.(\d+)"
+    r"(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?"
+    r"(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?\s*$"
+)
+_PARTIAL_RE = re.compile(
+    r"^[v=]*(\*|[xX]|\d+)(?:\.(\*|[xX]|\d+)(?:\.(\*|[xX]|\d+)"
+    r"(?:-([0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*))?"
+    r"(?:\+[0-9A-Za-z-]+(?:\.[0-9A-Za-z-]+)*)?)?)?$"
+)
+_COMPARATOR_RE = re.compile(r"^(\^|~>?|>=|<=|>|<|=)?\s*(.*)$")
+_HYPHEN_RE = re.compile(r"^\s*(\S+)\s+-\s+(\S+)\s*$")
+# Лишние пробелы после операторов: ">= 1.2.3" -> ">=1.2.3"
+_OPERATOR_SPACE_RE = re.compile(r"(\^|~>?|>=|<=|>|<|=)\s+")
+
+def _prerelease_key(prerelease: Optional[str]) -> Tuple[Tuple[int, object], ...]:
+    if not prerelease:
+        return ()
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in prerelease.split("."))
+
+
+def _key(major: int, minor: int, patch: int, prerelease: Optional[str] = None) -> VersionKey:
+    return (major, minor, patch, 0 if prerelease else 1, _prerelease_key(prerelease))
+
+
+@lru_cache(maxsize=65536)
+def parse_version(version: str) -> Optional[VersionKey]:
+    """
+    Разбирает точную версию semver в ключ сравнения; None для некорректных строк.
+    """
+    match = _VERSION_RE.match(version)
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return _key(int(major), int(minor), int(patch), prerelease)
+
+
+def _is_wild(part: Optional[str]) -> bool:
+    return part is None or part in ("*", "x", "X")
+
+
+def _partial(text: str):
+    match = _PARTIAL_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid version in range: '{text}'")
+    major, minor, patch, prerelease = match.groups()
+    return major, minor, patch, prerelease
+
+
+def _upper(major: int, minor: int = 0, patch: int = 0) -> VersionKey:
+    # "<X.Y.Z-0": исключает и сам X.Y.Z, и все его prerelease
+    return _key(major, minor, patch, "0")
+
+
+def _desugar(operator: str, text: str) -> List[Comparator]:
+    major, minor, patch, prerelease = _partial(text)
+    if _is_wild(major):
+        if operator in ("<", ">"):
+            return [("<", _key(0, 0, 0, "0"))]
+        return []
+
+    M = int(major)
+    if _is_wild(minor):
+        m, p, level = 0, 0, 1
+    elif _is_wild(patch):
+        m, p, level = int(minor), 0, 2
+    else:
+        m, p, level = int(minor), int(patch), 3
+
+    low = _key(M, m, p, prerelease if level == 3 else None)
+
+    if operator == "^":
+        if M > 0 or level == 1:
+            return [(">=", low), ("<", _upper(M + 1))]
+        if m > 0 or level == 2:
+            return [(">=", low), ("<", _upper(0, m + 1))]
+        return [(">=", low), ("<", _upper(0, 0, p + 1))]
+
+    if operator in ("~", "~>"):
+        if level == 1:
+            return [(">=", low), ("<", _upper(M + 1))]
+        return [(">=", low), ("<", _upper(M, m + 1))]
+
+    if level < 3:
+        upper = _upper(M + 1) if level == 1 else _upper(M, m + 1)
+        if operator in ("", "="):
+            return [(">=", low), ("<", upper)]
+        if operator == ">":
+            return [(">=", _key(M + 1, 0, 0) if level == 1 else _key(M, m + 1, 0))]
+        if operator == ">=":
+            return [(">=", low)]
+        if operator == "<":
+            return [("<", _key(M, m, 0, "0") if level == 2 else _key(M, 0, 0, "0"))]
+        if operator == "<=":
+            return [("<", upper)]
+
+    return [(operator or "=", low)]
+
+
+def _parse_comparator_set(text: str) -> Tuple[Comparator, ...]:
+    text = text.strip()
+    hyphen = _HYPHEN_RE.match(text)
+    if hyphen:
+        low_text, high_text = hyphen.groups()
+        comparators = [c for c in _desugar(">=", low_text) if c[0] == ">="]
+        major, minor, patch, _ = _partial(high_text)
+        if _is_wild(major):
+            return tuple(comparators)
+        if _is_wild(minor):
+            comparators.append(("<", _upper(int(major) + 1)))
+        elif _is_wild(patch):
+            comparators.append(("<", _upper(int(major), int(minor) + 1)))
+        else:
+            comparators.extend(_desugar("<=", high_text))
+        return tuple(comparators)
+
+    comparators: List[Comparator] = []
+    for token in _OPERATOR_SPACE_RE.sub(r"\1", text).split():
+        operator, version = _COMPARATOR_RE.match(token).groups()
+        comparators.extend(_desugar(operator or "", version))
+    return tuple(comparators)
+
+
+@lru_cache(maxsize=16384)
+def compile_range(spec: str) -> Tuple[Tuple[Comparator, ...], ...]:
+    """
+    Компилирует диапазон npm (^, ~, x-range, дефисы, ||) в набор компараторов.
+    Результат кэшируется: одинаковые диапазоны в графе встречаются тысячи раз.
+    """
+    return tuple(_parse_comparator_set(part) for part in spec.split("||"))
+
+
+def _test_set(key: VersionKey, comparators: Tuple[Comparator, ...]) -> bool:
+    for operator, bound in comparators:
+        if operator == ">=":
+            if key < bound:
+                return False
+        elif operator == "<":
+            if key >= bound:
+                return False
+        elif operator == ">":
+            if key <= bound:
+                return False
+        elif operator == "<=":
+            if key > bound:
+                return False
+        elif key != bound:
+            return False
+
+    if key[3] == 0:
+        # Prerelease подходит, только если в наборе есть компаратор с тем же X.Y.Z и prerelease
+        return any(bound[:3] == key[:3] and bound[3] == 0 for _, bound in comparators)
+    return True
+
+
+def satisfies(version: str, spec: str) -> bool:
+    key = parse_version(version)
+    if key is None:
+        return False
+    return any(_test_set(key, comparators) for comparators in compile_range(spec))
+
+
+def max_satisfying(versions: Iterable[str], spec: str) -> Optional[str]:
+    """
+    Наибольшая версия из versions, удовлетворяющая диапазону spec.
+    """
+    return VersionIndex(versions).max_satisfying(spec)
+
+
+def resolve_version(versions: Iterable[str], spec: str, dist_tags: Optional[Dict[str, str]] = None) -> Optional[str]:
+    return VersionIndex(versions, dist_tags).resolve(spec)
+
+
+class VersionIndex:
+    """
+    Отсортированный список версий пакета и dist-tags; разрешённые спецификаторы
+    запоминаются, так что повторное ребро с тем же диапазоном стоит один поиск в dict.
+    """
+
+    __slots__ = ("dist_tags", "versions", "_sorted", "_resolved")
+
+    def __init__(self, versions: Iterable[str], dist_tags: Optional[Dict[str, str]] = None):
+        self.dist_tags = dict(dist_tags or {})
+        self.versions = frozenset(versions)
+        parsed = ((parse_version(v), v) for v in self.versions)
+        self._sorted = sorted(((k, v) for k, v in parsed if k is not None), reverse=True)
+        self._resolved: Dict[str, Optional[str]] = {}
+
+    def max_satisfying(self, spec: str) -> Optional[str]:
+        sets = compile_range(spec)
+        for key, version in self._sorted:
+            for comparators in sets:
+                if _test_set(key, comparators):
+                    return version
+        return None
+
+    def resolve(self, spec: str) -> Optional[str]:
+        """
+        Разрешает спецификатор зависимости так же, как npm: dist-tag, точная версия
+        или диапазон; если dist-tags.latest удовлетворяет диапазону, выбирается он.
+        """
+        try:
+            return self._resolved[spec]
+        except KeyError:
+            pass
+
+        text = (spec or "").strip() or "*"
+        if text in self.dist_tags:
+            result = self.dist_tags[text]
+        else:
+            try:
+                sets = compile_range(text)
+            except ValueError:
+                sets = None
+            if sets is None:
+                # git/url/file-спецификаторы через реестр не разрешаются - берём latest
+                result = self.dist_tags.get("latest")
+            else:
+                result = None
+                latest = self.dist_tags.get("latest")
+                if latest in self.versions:
+                    key = parse_version(latest)
+                    if key is not None and any(_test_set(key, comparators) for comparators in sets):
+                        result = latest
+                if result is None:
+                    result = self.max_satisfying(text)
+
+        self._resolved[spec] = result
+        return result
@@ -0,0 +1,181 @@
+import logging
+import multiprocessing
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Dict, List, Optional, Set, Tuple
+
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from metadata_cache import DependencyMemo, MetadataCache
+from registry_client import RegistryClient
+
+logger = logging.getLogger(__name__)
+
+# Запись пакета в ответе шарда: (пакет, spec, "name@version", зависимости парами или None)
+ShardEntry = Tuple[str, str, str, Optional[Tuple[Tuple[str, str], ...]]]
+
+# Состояние процесса-шарда, создаётся инициализатором пула
+_worker: Optional["_ShardWorker"] = None
+
+
+def shard_of(package: str, shards: int) -> int:
+    """
+    Номер шарда пакета. crc32 одинаков во всех процессах и запусках, в отличие от hash() со случайной солью.
+    """
+    return zlib.crc32(package.encode("utf-8")) % shards
+
+
+@dataclass
+class ClientOptions:
+    """
+    Настройки RegistryClient, передаваемые в процессы-шарды (сам клиент с пулом соединений не сериализуется).
+    """
+    timeout: float = 30.0
+    max_retries: int = 3
+    pool_size: int = 8
+    cache_dir: Optional[str] = None
+    cache_ttl: float = 3600.0
+    offline: bool = False
+
+    @classmethod
+    def from_client(cls, client: RegistryClient) -> "ClientOptions":
+        cache = client.cache
+        return cls(client.timeout, client.max_retries, client.pool_size,
+                   cache.cache_dir if cache is not None else None,
+                   cache.ttl if cache is not None else 3600.0, client.offline)
+
+    def build(self) -> RegistryClient:
+        cache = MetadataCache(self.cache_dir, ttl=self.cache_ttl) if self.cache_dir else None
+        return RegistryClient(timeout=self.timeout, max_retries=self.max_retries, pool_size=self.pool_size,
+                              cache=cache, offline=self.offline)
+
+
+class _ShardWorker:
+    """
+    Процесс-шард: свой клиент, memo и пул потоков для ввода-вывода. Разбор JSON и выбор
+    версий идут здесь, вне GIL координатора. Зависимости узла отправляются координатору один раз.
+    """
+
+    def __init__(self, options: ClientOptions, abbreviated: bool, dependency_filter: DependencyFilter,
+                 concurrency: int):
+        self.graph = DependencyGraph(client=options.build(), abbreviated=abbreviated,
+                                     dependency_filter=dependency_filter)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        self.sent: Set[str] = set()
+        self._reported = (0, 0)
+
+    def resolve(self, packages: List[Tuple[str, List[str]]],
+                repository_url: str) -> Tuple[List[ShardEntry], int, int]:
+        names = [name for name, _ in packages]
+        results = self.pool.map(
+            self.graph._resolve_many_safe, names, (specs for _, specs in packages), repeat(repository_url)
+        )
+        entries: List[ShardEntry] = []
+        for name, result in zip(names, results):
+            for spec, (node, dependencies) in result.items():
+                # Узел уже отправлен раньше: координатор его либо раскрыл, либо он глубже max_depth
+                if dependencies is None or node in self.sent:
+                    entries.append((name, spec, node, None))
+                else:
+                    self.sent.add(node)
+                    entries.append((name, spec, node, tuple(dependencies.items())))
+
+        # Координатору уходит прирост счётчиков клиента за этот вызов
+        client = self.graph.client
+        totals = (client.requests, client.bytes_received)
+        requests, downloaded = totals[0] - self._reported[0], totals[1] - self._reported[1]
+        self._reported = totals
+        return entries, requests, downloaded
+
+
+def _start_worker(options: ClientOptions, abbreviated: bool, dev: bool, peer: bool, optional: bool,
+                  concurrency: int, log_level: int):
+    global _worker
+    logging.basicConfig(level=log_level, format="%(message)s", stream=sys.stderr)
+    # Шаблоны --filter применяет координатор; шарду нужен только выбор блоков зависимостей
+    _worker = _ShardWorker(options, abbreviated, DependencyFilter(dev=dev, peer=peer, optional=optional),
+                           concurrency)
+
+
+def _resolve_shard(packages: List[Tuple[str, List[str]]], repository_url: str):
+    return _worker.resolve(packages, repository_url)
+
+
+class ShardedDependencyGraph(DependencyGraph):
+    """
+    Поуровневый обход, где пакеты фронтира загружают и разбирают workers процессов.
+    Пакет всегда попадает в один и тот же шард (crc32 имени), поэтому memo и соединения шарда
+    переиспользуются между уровнями. Координатор только раскладывает запросы по шардам,
+    собирает компактные пакеты рёбер, убирает повторы и строит следующий фронтир.
+    Результат совпадает с bfs_concurrent.
+    """
+
+    def __init__(self, workers: int, concurrency: int = 8, client: Optional[RegistryClient] = None,
+                 memo: Optional[DependencyMemo] = None, abbreviated: bool = True,
+                 dependency_filter: Optional[DependencyFilter] = None):
+        super().__init__(client=client, memo=memo, abbreviated=abbreviated, dependency_filter=dependency_filter)
+        self.workers = max(1, workers)
+        self.concurrency = concurrency
+        self.shard_stats: List[Dict[str, int]] = [
+            {"packages": 0, "requests": 0, "bytes": 0, "edges": 0} for _ in range(self.workers)
+        ]
+        self._shards: List[ProcessPoolExecutor] = []
+
+    def _start(self):
+        # spawn: координатор к этому моменту уже держит потоки, fork с ними небезопасен
+        context = multiprocessing.get_context("spawn")
+        options = ClientOptions.from_client(self.client)
+        initargs = (options, self.abbreviated, self.filter.dev, self.filter.peer, self.filter.optional,
+                    self.concurrency, logging.getLogger().getEffectiveLevel())
+        # Отдельный однопроцессный пул на шард: ProcessPoolExecutor не умеет направлять задачу конкретному процессу
+        self._shards = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_start_worker, initargs=initargs)
+            for _ in range(self.workers)
+        ]
+        logger.info("Started %d crawler worker processes", self.workers)
+
+    def close(self):
+        for shard in self._shards:
+            shard.shutdown()
+        self._shards = []
+
+    def __enter__(self) -> "ShardedDependencyGraph":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _resolve_level(self, pool: ThreadPoolExecutor, requests: Dict[str, Set[str]],
+                       repository_url: str) -> Dict[str, Dict[str, Tuple[str, Optional[Dict[str, str]]]]]:
+        if not self._shards:
+            self._start()
+        batches: List[List[Tuple[str, List[str]]]] = [[] for _ in range(self.workers)]
+        for name in sorted(requests):
+            batches[shard_of(name, self.workers)].append((name, sorted(requests[name])))
+
+        futures = [
+            (index, self._shards[index].submit(_resolve_shard, batch, repository_url))
+            for index, batch in enumerate(batches) if batch
+        ]
+        results: Dict[str, Dict[str, Tuple[str, Optional[Dict[str, str]]]]] = {}
+        for index, future in futures:
+            entries, requests_made, downloaded = future.result()
+            stats = self.shard_stats[index]
+            stats["packages"] += len(batches[index])
+            stats["requests"] += requests_made
+            stats["bytes"] += downloaded
+            for name, spec, node, dependencies in entries:
+                if dependencies is not None:
+                    stats["edges"] += len(dependencies)
+                results.setdefault(name, {})[spec] = (node, dict(dependencies) if dependencies is not None else None)
+        return results
+
+    def format_shard_stats(self) -> str:
+        lines = ["Shards:"]
+        for index, stats in enumerate(self.shard_stats):
+            lines.append(f"  #{index}: packages={stats['packages']} requests={stats['requests']} "
+                         f"edges={stats['edges']} downloaded={stats['bytes']} bytes")
+        return "\n".join(lines)
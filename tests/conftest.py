@@ -0,0 +1,43 @@
+import os
+import random
+import sys
+from typing import Dict, List, Set
+
+import pytest
+
+# Модули проекта лежат в корне репозитория, как и для benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def random_graph(rng: random.Random, nodes: int, edges: int, self_loops: bool = True) -> Dict[str, Set[str]]:
+    """
+    Случайный ориентированный граф с именами n000..; часть узлов без исходящих рёбер.
+    """
+    names = [f"n{i:03d}" for i in range(nodes)]
+    graph: Dict[str, Set[str]] = {name: set() for name in names}
+    for _ in range(edges):
+        source, target = rng.choice(names), rng.choice(names)
+        if source != target or self_loops:
+            graph[source].add(target)
+    return graph
+
+
+def reachable(graph: Dict[str, Set[str]], start: str) -> Set[str]:
+    """
+    Оракул: всё, что достижимо из start хотя бы одним ребром (start - только через цикл).
+    """
+    seen: Set[str] = set()
+    stack: List[str] = list(graph.get(start, ()))
+    while stack:
+        node = stack.pop()
+        if node not in seen:
+            seen.add(node)
+            stack.extend(graph.get(node, ()))
+    return seen
+
+
+@pytest.fixture(params=range(30))
+def graph_case(request) -> Dict[str, Set[str]]:
+    rng = random.Random(request.param)
+    nodes = rng.randint(1, 40)
+    return random_graph(rng, nodes, rng.randint(0, nodes * 3))
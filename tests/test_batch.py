@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from batch import BatchRoot, batch_stats, crawl_batch, read_roots
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, make_packument
+from registry_client import RegistryClient
+
+
+def packuments() -> dict:
+    return {
+        "web": make_packument("web", {"http": "^1.0.0", "log": "^1.0.0"}),
+        "worker": make_packument("worker", {"queue": "^1.0.0", "log": "^1.0.0"}, "2.0.0",
+                                 {"1.0.0": {"log": "^1.0.0"}}),
+        "http": make_packument("http", {"util": "^1.0.0"}),
+        "queue": make_packument("queue", {"util": "^1.0.0"}),
+        "log": make_packument("log", {"util": "^1.0.0"}),
+        "util": make_packument("util", {}),
+    }
+
+
+@pytest.fixture
+def registry():
+    with MockRegistry(packuments()) as server:
+        yield server
+
+
+def test_read_roots(tmp_path):
+    roots_file = tmp_path / "roots.txt"
+    roots_file.write_text("web\n# comment\n\nworker@^1.0.0  # pinned\n@scope/tool@~2.1\n", encoding="utf-8")
+    manifest = tmp_path / "service" / "package.json"
+    manifest.parent.mkdir()
+    manifest.write_text(json.dumps({"dependencies": {"log": "^1.0.0"}}), encoding="utf-8")
+
+    roots = read_roots([str(roots_file), str(manifest)])
+    assert [(r.label, r.package, r.spec) for r in roots[:3]] == [
+        ("web", "web", "latest"), ("worker@^1.0.0", "worker", "^1.0.0"), ("@scope/tool@~2.1", "@scope/tool", "~2.1"),
+    ]
+    assert (roots[3].package, roots[3].spec) == ("service", "0.0.0")
+    assert roots[3].dependencies == {"dependencies": {"log": "^1.0.0"}}
+
+
+def test_shared_crawl_matches_separate_crawls(registry):
+    roots = [
+        BatchRoot("web", "web"),
+        BatchRoot("worker", "worker"),
+        BatchRoot("worker@1", "worker", "^1.0.0"),
+        BatchRoot("service", "service", "1.0.0", {"dependencies": {"log": "^1.0.0", "queue": "^1.0.0"}}),
+        BatchRoot("missing", "nope"),
+    ]
+    graph = DependencyGraph(client=RegistryClient())
+    result = crawl_batch(graph, roots, 5, registry.url, concurrency=4)
+
+    # Каждый пакет загружен один раз на все корни, нерешаемый корень пропущен
+    assert registry.request_count == 7
+    assert set(result.graphs) == {"web", "worker", "worker@1", "service"}
+    for root in roots[:3]:
+        separate = DependencyGraph(client=RegistryClient())
+        visited = separate.bfs_concurrent(root.package, 5, registry.url, version=root.spec)
+        assert result.visited[root.label] == visited
+        assert result.graphs[root.label].graph == separate.graph
+    assert result.graphs["service"].graph["service@1.0.0"] == {"log@1.0.0", "queue@1.0.0"}
+
+    stats = batch_stats(result)
+    assert stats["analyzed_roots"] == 4 and stats["roots"] == 5
+    assert stats["packages"] == 6
+    assert stats["naive_fetches"] > stats["packages"]
+    assert stats["naive_expanded"] > stats["expanded"]
+
+
+def test_depth_limit_applies_per_root(registry):
+    roots = [BatchRoot("web", "web"), BatchRoot("log", "log")]
+    result = crawl_batch(DependencyGraph(client=RegistryClient()), roots, 2, registry.url)
+    assert result.visited["web"] == {"web@1.0.0", "http@1.0.0", "log@1.0.0"}
+    # log - корень сам по себе: его util на глубине 1 виден, хотя из web он глубже max_depth
+    assert result.visited["log"] == {"log@1.0.0", "util@1.0.0"}
@@ -0,0 +1,88 @@
+import http.client
+import json
+
+import pytest
+
+from daemon import TOKEN_HEADER, DaemonClient, DepvisDaemon, GraphRequest, split_address
+from mock_registry import MockRegistry, make_packument
+from registry_client import RegistryClient
+
+
+def packuments() -> dict:
+    documents = {
+        "a": make_packument("a", {"b": "^1.0.0"}),
+        "b": make_packument("b", {}),
+        "c": make_packument("c", {}),
+    }
+    documents["b"]["versions"]["1.0.0"]["peerDependencies"] = {"c": "^1.0.0"}
+    return documents
+
+
+@pytest.fixture
+def registry():
+    with MockRegistry(packuments()) as server:
+        yield server
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    with DepvisDaemon("127.0.0.1:0", client=RegistryClient(), token_file=str(tmp_path / "daemon.token")) as server:
+        yield server
+
+
+def raw_request(daemon: DepvisDaemon, method: str, path: str, body: bytes = None, headers: dict = None):
+    connection = http.client.HTTPConnection(*split_address(daemon.address), timeout=5)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_request_without_token_is_rejected(daemon):
+    assert raw_request(daemon, "GET", "/health")[0] == 403
+    status, document = raw_request(daemon, "POST", "/graph", b"{}", {"Content-Type": "application/json"})
+    assert status == 403 and "token" in document["error"]
+    assert raw_request(daemon, "GET", "/health", headers={TOKEN_HEADER: "0" * 64})[0] == 403
+
+    with pytest.raises(RuntimeError, match="token"):
+        DaemonClient(daemon.address, token="wrong").stats()
+
+
+def test_post_body_must_be_json(daemon):
+    status, _ = raw_request(daemon, "POST", "/shutdown", b"{}",
+                            {TOKEN_HEADER: daemon.token, "Content-Type": "text/plain"})
+    assert status == 415
+
+
+def test_graph_request_and_cache(daemon, registry):
+    client = DaemonClient(daemon.address, token=daemon.token)
+    request = GraphRequest("a", registry.url, max_depth=5, views=["graph", "load_order"])
+    first = client.graph(request)
+    assert not first["cached"]
+    assert first["graph"] == {"a@1.0.0": ["b@1.0.0"]}
+    assert first["load_order"] == ["b@1.0.0", "a@1.0.0"]
+
+    second = client.graph(request)
+    assert second["cached"] and second["graph"] == first["graph"]
+    assert client.stats()["graphs"]["hits"] == 1
+
+
+def test_memo_is_not_shared_between_dependency_flags(daemon, registry):
+    client = DaemonClient(daemon.address, token=daemon.token)
+    with_peer = client.graph(GraphRequest("a", registry.url, max_depth=5, include_peer=True))
+    assert with_peer["graph"] == {"a@1.0.0": ["b@1.0.0"], "b@1.0.0": ["c@1.0.0"]}
+
+    # То же дерево без peer: ребро b -> c из первого обхода не должно просочиться
+    without_peer = client.graph(GraphRequest("a", registry.url, max_depth=5))
+    assert not without_peer["cached"]
+    assert without_peer["graph"] == {"a@1.0.0": ["b@1.0.0"]}
+    assert "c@1.0.0" not in without_peer["visited"]
+
+
+def test_unknown_request_field_is_bad_request(daemon):
+    status, document = raw_request(daemon, "POST", "/graph", json.dumps({"package": "a", "repository": "x",
+                                                                          "depth": 1}).encode(),
+                                   {TOKEN_HEADER: daemon.token, "Content-Type": "application/json"})
+    assert status == 400 and "depth" in document["error"]
@@ -0,0 +1,66 @@
+import pytest
+
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, make_packument
+from registry_client import RegistryClient
+
+
+@pytest.mark.parametrize("text, allowed, rejected", [
+    ("eslint-*", ["eslint-plugin-x"], ["eslint", "prettier"]),
+    ("re:^@types/", ["@types/node"], ["types", "@babel/types"]),
+    ("@babel", ["@babel/core"], ["@babelx/core", "babel"]),
+    ("lodash", ["lodash"], ["lodash.get"]),
+    ("!@types !re:-test$", ["react", "@babel/core"], ["@types/node", "jest-test"]),
+    ("@babel, !@babel/core", ["@babel/types"], ["@babel/core", "react"]),
+])
+def test_patterns(text, allowed, rejected):
+    dependency_filter = DependencyFilter.parse(text)
+    assert all(dependency_filter.allows(name) for name in allowed)
+    assert not any(dependency_filter.allows(name) for name in rejected)
+
+
+def test_invalid_regex_is_value_error():
+    with pytest.raises(ValueError, match="Invalid filter pattern"):
+        DependencyFilter.parse("re:(")
+
+
+def test_prune_counts_dropped_edges_and_packages():
+    dependency_filter = DependencyFilter.parse("!@types")
+    kept = dependency_filter.prune({"react": "^18", "@types/node": "*", "@types/react": "*"})
+    dependency_filter.prune({"@types/node": "*"})
+    assert kept == {"react": "^18"}
+    assert dependency_filter.pruned_edges == 3
+    assert dependency_filter.pruned_packages == {"@types/node", "@types/react"}
+
+
+def test_select_toggles():
+    version = {
+        "dependencies": {"a": "1", "opt": "1"},
+        "optionalDependencies": {"opt": "1"},
+        "peerDependencies": {"peer": "1"},
+        "devDependencies": {"dev": "1"},
+    }
+    assert DependencyFilter().select(version) == {"a": "1", "opt": "1"}
+    assert DependencyFilter(optional=False).select(version) == {"a": "1"}
+    assert DependencyFilter(peer=True).select(version) == {"a": "1", "opt": "1", "peer": "1"}
+    # devDependencies учитываются только у корня
+    assert DependencyFilter(dev=True).select(version) == {"a": "1", "opt": "1"}
+    assert DependencyFilter(dev=True).select(version, root=True) == {"a": "1", "opt": "1", "dev": "1"}
+    # В lockfile optionalDependencies не продублированы в dependencies
+    assert DependencyFilter().select({"optionalDependencies": {"opt": "1"}}) == {"opt": "1"}
+
+
+def test_excluded_subtree_is_never_fetched():
+    packuments = {
+        "app": make_packument("app", {"lib": "^1.0.0", "@types/lib": "^1.0.0"}),
+        "lib": make_packument("lib", {}),
+        "@types/lib": make_packument("@types/lib", {"@types/deep": "^1.0.0"}),
+        "@types/deep": make_packument("@types/deep", {}),
+    }
+    with MockRegistry(packuments) as registry:
+        graph = DependencyGraph(client=RegistryClient(), dependency_filter=DependencyFilter.parse("!@types"))
+        visited = graph.bfs_concurrent("app", 5, registry.url)
+        assert visited == {"app@1.0.0", "lib@1.0.0"}
+        assert registry.request_count == 2
+        assert graph.filter.pruned_packages == {"@types/lib"}
@@ -0,0 +1,94 @@
+from typing import Dict, List, Set
+
+from conftest import reachable
+from dependency_graph import DependencyGraph
+from graph_algorithms import find_cycles, install_waves, strongly_connected_components, topological_batches
+
+
+def oracle_components(graph: Dict[str, Set[str]]) -> Dict[str, frozenset]:
+    closure = {node: reachable(graph, node) for node in graph}
+    return {node: frozenset({node} | {other for other in closure[node] if node in closure[other]})
+            for node in graph}
+
+
+def oracle_levels(graph: Dict[str, Set[str]], component: Dict[str, frozenset]) -> Dict[frozenset, int]:
+    # Длина самого длинного пути по конденсации до стока
+    levels: Dict[frozenset, int] = {}
+
+    def level(group: frozenset) -> int:
+        if group not in levels:
+            below = {component[t] for node in group for t in graph[node]} - {group}
+            levels[group] = 1 + max(map(level, below)) if below else 0
+        return levels[group]
+
+    for group in set(component.values()):
+        level(group)
+    return levels
+
+
+def test_scc_matches_mutual_reachability(graph_case):
+    components = strongly_connected_components(graph_case, graph_case.__getitem__)
+    expected = oracle_components(graph_case)
+    assert sorted(map(sorted, components)) == sorted(map(sorted, set(expected.values())))
+
+    # Компоненты идут в обратном топологическом порядке: зависимость - не позже зависимого
+    position = {node: i for i, component in enumerate(components) for node in component}
+    for node, targets in graph_case.items():
+        for target in targets:
+            assert position[target] <= position[node]
+
+
+def test_find_cycles_are_nontrivial_components_and_self_loops(graph_case):
+    expected = sorted(
+        sorted(group) for group in set(oracle_components(graph_case).values())
+        if len(group) > 1 or next(iter(group)) in graph_case[next(iter(group))]
+    )
+    assert find_cycles(graph_case, graph_case.__getitem__) == expected
+
+
+def test_long_chain_does_not_recurse():
+    size = 50000
+    graph = {f"p{i}": {f"p{i + 1}"} for i in range(size)}
+    graph[f"p{size}"] = {"p0"}
+    components = strongly_connected_components(graph, graph.__getitem__)
+    assert len(components) == 1 and len(components[0]) == size + 1
+    assert len(topological_batches(graph, graph.__getitem__)) == 1
+
+
+def test_dependency_graph_cycles_include_undeclared_leaves():
+    graph = DependencyGraph()
+    graph.graph = {"app": {"a", "b"}, "a": {"b", "leaf"}, "b": {"a"}}
+    assert graph.find_cycles() == [["a", "b"]]
+    assert not DependencyGraph().has_cycles()
+
+
+def test_topological_batches_put_dependencies_first(graph_case):
+    batches = topological_batches(graph_case, graph_case.__getitem__)
+    component = oracle_components(graph_case)
+    assert sorted(node for batch in batches for node in batch) == sorted(graph_case)
+    assert all(frozenset(batch) == component[batch[0]] for batch in batches)
+
+    position = {node: i for i, batch in enumerate(batches) for node in batch}
+    for node, targets in graph_case.items():
+        for target in targets:
+            assert position[target] <= position[node]
+            if component[target] != component[node]:
+                assert position[target] < position[node]
+
+
+def test_install_waves_are_longest_path_levels(graph_case):
+    waves = install_waves(graph_case, graph_case.__getitem__)
+    component = oracle_components(graph_case)
+    levels = oracle_levels(graph_case, component)
+    assert sorted(node for wave in waves for node in wave) == sorted(graph_case)
+    for i, wave in enumerate(waves):
+        for node in wave:
+            assert levels[component[node]] == i
+
+
+def test_dependency_graph_load_order_includes_undeclared_leaves():
+    graph = DependencyGraph()
+    graph.graph = {"app": {"a", "b"}, "a": {"b", "leaf"}, "b": {"a"}}
+    order: List[str] = graph.get_load_order()
+    assert order.index("leaf") < order.index("a")
+    assert order[-1] == "app"
@@ -0,0 +1,98 @@
+import random
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+import pytest
+
+from compact_graph import CompactDependencyGraph
+from conftest import random_graph, reachable
+from graph_query import DependencyIndex
+
+
+def build(graph: Dict[str, Set[str]]) -> CompactDependencyGraph:
+    compact = CompactDependencyGraph()
+    for package, dependencies in graph.items():
+        compact.add_dependencies(package, sorted(dependencies))
+    compact.edge_count()
+    return compact
+
+
+def distances(graph: Dict[str, Set[str]], sources: List[str]) -> Dict[str, int]:
+    depth = {source: 0 for source in sources}
+    queue = deque(sources)
+    while queue:
+        node = queue.popleft()
+        for child in graph[node]:
+            if child not in depth:
+                depth[child] = depth[node] + 1
+                queue.append(child)
+    return depth
+
+
+def assert_chain(graph: Dict[str, Set[str]], chain: List[str]):
+    for source, target in zip(chain, chain[1:]):
+        assert target in graph[source]
+
+
+@pytest.fixture(params=[(seed, labels) for seed in range(12) for labels in (1, 3)])
+def indexed(request):
+    seed, labels = request.param
+    rng = random.Random(1000 + seed)
+    nodes = rng.randint(2, 60)
+    graph = random_graph(rng, nodes, rng.randint(nodes // 2, nodes * 2), self_loops=False)
+    return graph, DependencyIndex(build(graph), labels=labels, seed=seed)
+
+
+def test_dependencies_and_dependents_match_closure(indexed):
+    graph, index = indexed
+    reverse: Dict[str, Set[str]] = {node: set() for node in graph}
+    for node, targets in graph.items():
+        for target in targets:
+            reverse[target].add(node)
+    for node in graph:
+        assert index.dependencies(node) == sorted(reachable(graph, node) - {node})
+        assert index.dependents(node) == sorted(reachable(reverse, node) - {node})
+        assert index.dependencies(node, direct=True) == sorted(graph[node])
+        assert index.dependents(node, direct=True) == sorted(reverse[node])
+
+
+def test_reaches_and_shortest_path_match_bfs(indexed):
+    graph, index = indexed
+    for source in graph:
+        depth = distances(graph, [source])
+        for target in graph:
+            chain: Optional[List[str]] = index.path(source, target)
+            if target not in depth:
+                assert chain is None
+                assert not index.reaches(source, target)
+                continue
+            assert chain[0] == source and chain[-1] == target
+            assert len(chain) == depth[target] + 1
+            assert_chain(graph, chain)
+
+
+def test_depth_and_why_from_roots(indexed):
+    graph, index = indexed
+    targets = {t for deps in graph.values() for t in deps}
+    roots = sorted(node for node in graph if node not in targets) or [min(graph)]
+    assert index.root_names() == roots
+    depth = distances(graph, roots)
+    for node in graph:
+        assert index.depth_of(node) == depth.get(node)
+        chain = index.why(node)
+        if node not in depth:
+            assert chain is None
+        else:
+            assert chain[0] in roots and chain[-1] == node and len(chain) == depth[node] + 1
+            assert_chain(graph, chain)
+
+
+def test_package_name_matches_all_versions():
+    graph = {"app@1.0.0": {"lib@1.0.0", "util@2.0.0"}, "util@2.0.0": {"lib@2.0.0"},
+             "lib@1.0.0": set(), "lib@2.0.0": set(), "lib-extra@1.0.0": set()}
+    index = DependencyIndex(build(graph))
+    assert index.dependents("lib") == ["app@1.0.0", "util@2.0.0"]
+    assert index.path("app", "lib@2.0.0") == ["app@1.0.0", "util@2.0.0", "lib@2.0.0"]
+    assert index.depth_of("lib") == 1
+    with pytest.raises(RuntimeError):
+        index.resolve("missing")
@@ -0,0 +1,75 @@
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from incremental import CrawlState, IncrementalDependencyGraph, diff_graphs
+from mock_registry import MockRegistry, make_packument
+from registry_client import RegistryClient
+
+
+def packuments() -> dict:
+    return {
+        "app": make_packument("app", {"a": "^1.0.0", "b": "^1.0.0"}),
+        "a": make_packument("a", {"c": "^1.0.0"}),
+        "b": make_packument("b", {"c": "^1.0.0"}),
+        "c": make_packument("c", {}),
+        "d": make_packument("d", {"a": "^1.0.0"}),
+    }
+
+
+def crawl(registry: MockRegistry, previous=None, dependency_filter=None) -> IncrementalDependencyGraph:
+    graph = IncrementalDependencyGraph(previous, client=RegistryClient(), dependency_filter=dependency_filter)
+    graph.begin("app", "latest", registry.url)
+    graph.bfs_concurrent("app", 10, registry.url)
+    graph.finish()
+    return graph
+
+
+def saved(graph: IncrementalDependencyGraph, tmp_path) -> CrawlState:
+    path = str(tmp_path / "state.json")
+    graph.state.save(path)
+    return CrawlState.load(path)
+
+
+def test_unchanged_registry_is_only_revalidated(tmp_path):
+    with MockRegistry(packuments()) as registry:
+        first = crawl(registry)
+        previous = saved(first, tmp_path)
+        requests = registry.request_count
+
+        second = crawl(registry, previous)
+        assert second.state.graph == first.state.graph
+        assert registry.request_count - requests == 4 and registry.not_modified_count == 4
+        assert second.stats == {"unchanged": 4, "changed": 0, "fetched": 0}
+        assert diff_graphs(previous.graph, second.state.graph).empty
+
+
+def test_version_bump_is_diffed_and_refetched_alone(tmp_path):
+    with MockRegistry(packuments()) as registry:
+        previous = saved(crawl(registry), tmp_path)
+
+        # c публикует 1.1.0 с новой зависимостью, которая замыкает цикл через a
+        registry.packuments["c"] = make_packument("c", {"d": "^1.0.0"}, "1.1.0", {"1.0.0": {}})
+        graph = crawl(registry, previous)
+        assert graph.stats == {"unchanged": 3, "changed": 1, "fetched": 1}
+
+        # Результат совпадает с обходом с нуля
+        fresh = DependencyGraph(client=RegistryClient())
+        fresh.bfs_concurrent("app", 10, registry.url)
+        assert graph.state.graph == fresh.graph
+
+        diff = diff_graphs(previous.graph, graph.state.graph)
+        assert diff.version_changes == {"c": (["1.0.0"], ["1.1.0"])}
+        assert diff.added_nodes == ["c@1.1.0", "d@1.0.0"]
+        assert diff.removed_nodes == ["c@1.0.0"]
+        assert ("a@1.0.0", "c@1.1.0") in diff.added_edges and ("c@1.1.0", "d@1.0.0") in diff.added_edges
+        assert ("a@1.0.0", "c@1.0.0") in diff.removed_edges
+        assert [sorted(group) for group in diff.new_cycles] == [["a@1.0.0", "c@1.1.0", "d@1.0.0"]]
+        assert not diff.resolved_cycles
+        assert diff.to_dict()["version_changes"] == {"c": {"from": ["1.0.0"], "to": ["1.1.0"]}}
+
+
+def test_state_with_other_settings_is_not_reused(tmp_path):
+    with MockRegistry(packuments()) as registry:
+        previous = saved(crawl(registry), tmp_path)
+        graph = crawl(registry, previous, DependencyFilter(peer=True))
+        assert graph.previous is None
+        assert graph.stats["unchanged"] == 0 and registry.not_modified_count == 0
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from lockfile import read_lockfile
+from npm_comparison import NPMComparator
+
+LOCKFILE = {
+    "name": "app",
+    "version": "1.0.0",
+    "lockfileVersion": 3,
+    "packages": {
+        "": {"name": "app", "version": "1.0.0", "dependencies": {"a": "^1", "b": "^1"},
+             "devDependencies": {"jest": "^29"}},
+        "node_modules/a": {"version": "1.0.0", "dependencies": {"c": "^2"}},
+        "node_modules/a/node_modules/c": {"version": "2.0.0"},
+        "node_modules/b": {"version": "1.1.0", "dependencies": {"c": "^1", "missing": "^1"}},
+        "node_modules/c": {"version": "1.5.0"},
+        "node_modules/jest": {"version": "29.0.0", "dev": True, "dependencies": {"c": "^1"}},
+    },
+}
+
+
+@pytest.fixture
+def lockfile_path(tmp_path):
+    path = tmp_path / "package-lock.json"
+    path.write_text(json.dumps(LOCKFILE))
+    return str(path)
+
+
+def test_nested_node_modules_resolve_like_node(lockfile_path):
+    graph, visited = read_lockfile(lockfile_path, include_dev=False).build_graph()
+    assert graph.get_all_dependencies() == {
+        "app@1.0.0": {"a@1.0.0", "b@1.1.0"},
+        "a@1.0.0": {"c@2.0.0"},
+        "b@1.1.0": {"c@1.5.0", "missing"},
+        "c@2.0.0": set(),
+        "c@1.5.0": set(),
+    }
+    assert "jest@29.0.0" not in visited
+
+
+def test_dev_dependencies_of_root_are_optional(lockfile_path):
+    graph, _ = read_lockfile(lockfile_path, include_dev=True).build_graph()
+    assert "jest@29.0.0" in graph.get_all_dependencies()["app@1.0.0"]
+
+
+def test_subtree_import(lockfile_path):
+    graph, visited = read_lockfile(lockfile_path).build_graph("b")
+    assert visited == {"b@1.1.0", "c@1.5.0"}
+    with pytest.raises(RuntimeError):
+        read_lockfile(lockfile_path).build_graph("absent")
+
+
+def test_lockfile_without_packages_is_rejected(tmp_path):
+    path = tmp_path / "package-lock.json"
+    path.write_text(json.dumps({"name": "old", "lockfileVersion": 1, "dependencies": {}}))
+    with pytest.raises(RuntimeError):
+        read_lockfile(str(path))
+
+
+def test_npm_order_skips_dev_only_packages(lockfile_path, tmp_path):
+    comparator = NPMComparator(lockfile=lockfile_path, cache_dir=str(tmp_path / "cache"))
+    assert comparator.get_actual_npm_install_order("app") == ["a", "c", "b"]
+
+    # Правка lockfile не должна отдавать закэшированный порядок
+    changed = dict(LOCKFILE, packages={**LOCKFILE["packages"], "node_modules/zzz": {"version": "1.0.0"}})
+    with open(lockfile_path, "w") as f:
+        json.dump(changed, f)
+    comparator = NPMComparator(lockfile=lockfile_path, cache_dir=str(tmp_path / "cache"))
+    assert comparator.get_actual_npm_install_order("app") == ["a", "c", "b", "zzz"]
@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+import pytest
+
+from metadata_cache import MetadataCache
+from mock_registry import MockRegistry, make_packument
+from registry_client import RegistryClient, RegistryHTTPError
+
+
+@pytest.fixture
+def registry():
+    with MockRegistry({"a": make_packument("a", {"b": "^1.0.0"}), "b": make_packument("b", {})}) as server:
+        yield server
+
+
+def test_fresh_entry_is_served_without_network(tmp_path, registry):
+    client = RegistryClient(cache=MetadataCache(str(tmp_path)))
+    first = client.get(f"{registry.url}/a")
+    second = client.get(f"{registry.url}/a")
+    assert second.from_cache and second.body == first.body
+    assert registry.request_count == 1
+    assert client.cache.stats["hits"] == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path, registry):
+    cache = MetadataCache(str(tmp_path), ttl=0)
+    client = RegistryClient(cache=cache)
+    first = client.get(f"{registry.url}/a")
+    assert first.headers.get("etag")
+
+    second = client.get(f"{registry.url}/a")
+    assert registry.request_count == 2 and registry.not_modified_count == 1
+    assert second.from_cache and second.body == first.body
+    assert cache.stats["revalidated"] == 1 and cache.stats["stored"] == 1
+
+    # Пакет опубликован заново: ETag другой, тело обновляется
+    registry.packuments["a"] = make_packument("a", {"b": "^1.0.0"}, "1.1.0")
+    third = client.get(f"{registry.url}/a")
+    assert not third.from_cache and b"1.1.0" in third.body
+    assert cache.get(f"{registry.url}/a").body == third.body
+
+
+def test_offline_serves_stale_entries_and_refuses_misses(tmp_path, registry):
+    client = RegistryClient(cache=MetadataCache(str(tmp_path), ttl=0))
+    body = client.get(f"{registry.url}/a").body
+
+    offline = RegistryClient(cache=MetadataCache(str(tmp_path), ttl=0), offline=True)
+    assert offline.get(f"{registry.url}/a").body == body
+    with pytest.raises(RegistryHTTPError) as error:
+        offline.get(f"{registry.url}/b")
+    assert error.value.status == 504
+    assert registry.request_count == 1
+
+
+def test_equal_bodies_are_stored_once(tmp_path):
+    cache = MetadataCache(str(tmp_path))
+    cache.put("http://one/a", b"same body", etag='"1"')
+    cache.put("http://two/a", b"same body", etag='"2"')
+    blobs = [name for _, _, files in os.walk(tmp_path / "blobs") for name in files]
+    assert len(blobs) == 1
+    assert cache.get("http://one/a").etag == '"1"'
+    assert cache.get("http://two/a").body == b"same body"
+
+
+def test_eviction_removes_least_recently_used(tmp_path):
+    cache = MetadataCache(str(tmp_path), max_bytes=10_000)
+    for index in range(3):
+        cache.put(f"http://r/{index}", bytes([index]) * 3000)
+    # mtime - отметка использования; задаём её явно, чтобы порядок не зависел от точности часов
+    for index, used_at in enumerate((100, 300, 200)):
+        entry_path = cache._path(f"http://r/{index}")
+        os.utime(entry_path, (used_at, used_at))
+        blob_path = cache._blob_path(hashlib.sha256(bytes([index]) * 3000).hexdigest())
+        os.utime(blob_path, (used_at, used_at))
+
+    cache.put("http://r/3", b"\x03" * 3000)
+    assert cache.stats["evicted"] >= 1
+    assert cache.get("http://r/0") is None
+    assert cache.get("http://r/1") is not None and cache.get("http://r/3") is not None
+    assert cache._scan_size() <= cache.max_bytes
@@ -0,0 +1,119 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from mirror import MirrorStore
+from packument_stream import decode_body
+
+
+def packument(name: str, size: int = 3) -> bytes:
+    versions = {f"1.0.{i}": {"dependencies": {f"dep{i}": "^1.0.0"}} for i in range(size)}
+    return json.dumps({"name": name, "dist-tags": {"latest": f"1.0.{size - 1}"}, "versions": versions}).encode()
+
+
+def crash(store: MirrorStore):
+    # Процесс умер до close(): индекса в конце файла нет
+    store._file.close()
+
+
+def fill(path: str, names, full: bool = False) -> MirrorStore:
+    store = MirrorStore(path, writable=True, full=full)
+    for name in names:
+        store.put(name, packument(name))
+    return store
+
+
+def test_round_trip_with_index(tmp_path):
+    path = str(tmp_path / "mirror.dvm")
+    names = ["a", "@scope/b", "пакет", "c"]
+    with fill(path, names, full=True):
+        pass
+
+    with MirrorStore(path) as store:
+        assert not store.recovered and store.full
+        assert len(store) == len(names)
+        for name in names:
+            body = store.get(name)
+            assert body[:2] == b"\x1f\x8b"
+            assert decode_body(body) == packument(name)
+        assert store.get("missing") is None
+
+
+def test_put_keeps_gzip_bodies_as_is(tmp_path):
+    path = str(tmp_path / "mirror.dvm")
+    body = gzip.compress(packument("a"))
+    with MirrorStore(path, writable=True) as store:
+        assert store.put("a", body) == body
+        assert store.get("a") == body
+
+
+def test_interrupted_fetch_is_recovered_by_scanning(tmp_path):
+    path = str(tmp_path / "mirror.dvm")
+    crash(fill(path, ["a", "b", "c"]))
+
+    with MirrorStore(path) as store:
+        assert store.recovered
+        assert sorted(store.index) == ["a", "b", "c"]
+        assert decode_body(store.get("c")) == packument("c")
+
+
+@pytest.mark.parametrize("tail", [1, 5, 20])
+def test_torn_last_record_is_dropped(tmp_path, tail):
+    path = str(tmp_path / "mirror.dvm")
+    crash(fill(path, ["a", "b", "c"]))
+    os.truncate(path, os.path.getsize(path) - tail)
+
+    with MirrorStore(path) as store:
+        assert store.recovered
+        assert sorted(store.index) == ["a", "b"]
+        assert decode_body(store.get("b")) == packument("b")
+
+
+def test_resume_after_crash_appends_and_writes_index(tmp_path):
+    path = str(tmp_path / "mirror.dvm")
+    crash(fill(path, ["a", "b"]))
+    os.truncate(path, os.path.getsize(path) - 3)
+
+    with MirrorStore(path, writable=True) as store:
+        assert store.recovered and "b" not in store
+        store.put("b", packument("b"))
+        store.put("c", packument("c"))
+
+    with MirrorStore(path) as store:
+        assert not store.recovered
+        assert sorted(store.index) == ["a", "b", "c"]
+        for name in "abc":
+            assert decode_body(store.get(name)) == packument(name)
+
+
+def test_damaged_footer_falls_back_to_scan(tmp_path):
+    path = str(tmp_path / "mirror.dvm")
+    with fill(path, ["a", "b"]):
+        pass
+    os.truncate(path, os.path.getsize(path) - 2)
+
+    with MirrorStore(path) as store:
+        assert store.recovered
+        assert sorted(store.index) == ["a", "b"]
+
+
+def test_reopen_for_writing_replaces_old_index(tmp_path):
+    path = str(tmp_path / "mirror.dvm")
+    with fill(path, ["a"]):
+        pass
+    with MirrorStore(path, writable=True) as store:
+        store.put("b", packument("b"))
+    with MirrorStore(path) as store:
+        assert not store.recovered
+        assert sorted(store.index) == ["a", "b"]
+
+
+def test_foreign_file_is_rejected(tmp_path):
+    path = tmp_path / "not-a-mirror"
+    path.write_bytes(b"hello world, definitely not a mirror")
+    with pytest.raises(RuntimeError):
+        MirrorStore(str(path))
+    with pytest.raises(RuntimeError):
+        MirrorStore(str(tmp_path / "absent.dvm"))
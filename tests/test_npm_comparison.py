@@ -0,0 +1,57 @@
+import itertools
+import random
+
+import pytest
+
+from npm_comparison import NPMComparator, count_inversions, longest_increasing_subsequence
+
+
+def brute_inversions(values):
+    return sum(1 for i, j in itertools.combinations(range(len(values)), 2) if values[i] > values[j])
+
+
+def brute_lis(values):
+    best = 0
+    for size in range(len(values), 0, -1):
+        for picked in itertools.combinations(values, size):
+            if all(a < b for a, b in zip(picked, picked[1:])):
+                return size
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_rank_metrics_match_brute_force(seed):
+    rng = random.Random(seed)
+    values = list(range(rng.randint(0, 10)))
+    rng.shuffle(values)
+    assert count_inversions(values) == brute_inversions(values)
+    assert longest_increasing_subsequence(values) == brute_lis(values)
+
+
+def test_compare_orders():
+    comparison = NPMComparator().compare_orders(["a", "b", "c", "x"], ["c", "b", "a", "y"])
+    assert comparison["common_packages"] == {"a", "b", "c"}
+    assert comparison["only_in_our_order"] == {"x"}
+    assert comparison["only_in_npm_order"] == {"y"}
+    assert comparison["inversions"] == 3
+    assert comparison["kendall_tau"] == -1.0
+    assert comparison["lcs_length"] == 1
+    assert not comparison["order_matches"]
+
+
+def test_registry_resolved_order_expires(tmp_path):
+    comparator = NPMComparator(cache_dir=str(tmp_path), order_ttl=60)
+    calls = []
+    comparator._resolve_lock_only = lambda package, version: calls.append(package) or ["dep"]
+    assert comparator.get_actual_npm_install_order("pkg") == ["dep"]
+    assert comparator.get_actual_npm_install_order("pkg") == ["dep"]
+    assert len(calls) == 1
+
+    # Новый процесс с тем же кэшем: свежая запись берётся с диска, просроченная разрешается заново
+    fresh = NPMComparator(cache_dir=str(tmp_path), order_ttl=60)
+    fresh._resolve_lock_only = lambda package, version: calls.append(package) or ["dep"]
+    fresh.get_actual_npm_install_order("pkg")
+    expired = NPMComparator(cache_dir=str(tmp_path), order_ttl=0)
+    expired._resolve_lock_only = lambda package, version: calls.append(package) or ["dep", "new"]
+    assert expired.get_actual_npm_install_order("pkg") == ["dep", "new"]
+    assert len(calls) == 2
@@ -0,0 +1,83 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from mock_registry import abbreviate_packument, make_packument
+from packument_stream import JsonStreamReader, decode_body, iter_chunks, stream_dependencies, stream_package
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def packument() -> dict:
+    document = make_packument("пакет", {"b": "^2.0.0", "c": "~1.0.0"}, "2.0.0",
+                              {"1.0.0": {"b": "^1.0.0"}, "1.5.0": {"b": "^1.0.0"}})
+    document["description"] = "строка с \"кавычками\" и \\ обратной чертой"
+    document["time"] = {"created": "2020-01-01T00:00:00.000Z"}
+    document["versions"]["2.0.0"]["dist"] = {"size": 123456789012, "integrity": "sha512-x"}
+    return document
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 16])
+def test_stream_package_is_independent_of_chunk_boundaries(size):
+    body = json.dumps(packument(), ensure_ascii=False, indent=1).encode("utf-8")
+    resolution = stream_package(chunked(body, size), ["^1.0.0", "latest"])
+    assert resolution.versions == {"^1.0.0": "1.5.0", "latest": "2.0.0"}
+    assert resolution.dependencies["2.0.0"] == {"b": "^2.0.0", "c": "~1.0.0"}
+    # Одинаковые словари зависимостей соседних версий хранятся одним объектом
+    assert resolution.dependencies["1.0.0"] is resolution.dependencies["1.5.0"]
+
+
+def test_gzip_stream_is_decompressed_in_bounded_pieces():
+    body = json.dumps(abbreviate_packument(packument())).encode("utf-8")
+    compressed = gzip.compress(body)
+    pieces = list(iter_chunks(io.BytesIO(compressed), chunk_size=16))
+    assert b"".join(pieces) == body
+    assert max(len(piece) for piece in pieces) <= 16
+    assert decode_body(compressed) == body == decode_body(body)
+    assert stream_dependencies(pieces, "^1.0.0") == ("1.5.0", {"b": "^1.0.0"})
+
+
+def test_version_document_without_versions_key():
+    body = json.dumps({"name": "a", "version": "3.1.0", "dependencies": {"b": "1.x"}}).encode()
+    resolution = stream_package([body], ["latest", "3.1.0", "^4"])
+    assert resolution.versions == {"latest": "3.1.0", "3.1.0": "3.1.0", "^4": None}
+    assert resolution.dependencies == {"3.1.0": {"b": "1.x"}}
+
+
+def test_select_chooses_dependency_blocks():
+    document = make_packument("a", {"b": "^1.0.0"})
+    document["versions"]["1.0.0"]["peerDependencies"] = {"react": "^18"}
+    body = json.dumps(document).encode()
+    resolution = stream_package([body], ["latest"], select=lambda data: {**data.get("dependencies", {}),
+                                                                         **data.get("peerDependencies", {})})
+    assert resolution.dependencies["1.0.0"] == {"b": "^1.0.0", "react": "^18"}
+
+
+def test_unknown_package_spec_and_empty_versions():
+    body = json.dumps({"name": "a", "dist-tags": {}, "versions": {}}).encode()
+    resolution = stream_package([body], ["latest", "^1.0.0"])
+    assert resolution.versions == {"latest": None, "^1.0.0": None}
+    assert resolution.dependencies == {}
+
+
+def test_reader_walks_nested_objects():
+    reader = JsonStreamReader(chunked(b' { "a" : {"x": [1, {"y": null}], "z": {}}, "b\\"q" : -1.5e3 } ', 3))
+    seen = {}
+    for key in reader.iter_object():
+        if key == "a":
+            seen[key] = {}
+            for inner in reader.iter_object():
+                seen[key][inner] = reader.read_value()
+        else:
+            seen[key] = reader.read_value()
+    assert seen == {"a": {"x": [1, {"y": None}], "z": {}}, 'b"q': -1500.0}
+
+
+@pytest.mark.parametrize("body", [b'{"versions": {"1.0.0": {}', b'{"a" 1}', b'{"a": 1 "b": 2}', b"", b"[1, 2]"])
+def test_malformed_documents_raise(body):
+    with pytest.raises(ValueError):
+        stream_package(chunked(body, 4), ["latest"])
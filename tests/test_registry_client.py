@@ -0,0 +1,76 @@
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mock_registry import MockRegistry, make_packument
+from registry_client import RegistryClient, RegistryHTTPError
+
+
+def packuments(count: int = 4) -> dict:
+    return {f"p{i}": make_packument(f"p{i}", {}) for i in range(count)}
+
+
+def test_retries_503_with_backoff():
+    with MockRegistry(packuments(), flaky=2) as registry:
+        client = RegistryClient(max_retries=3, backoff=0.001)
+        response = client.get(f"{registry.url}/p0")
+        assert response.status == 200 and b'"p0"' in response.body
+        assert response.timing.attempts == 3
+        assert registry.request_count == 3
+        assert client.summary()["retries"] == 2
+
+
+def test_gives_up_after_max_retries():
+    with MockRegistry(packuments(), flaky=5) as registry:
+        client = RegistryClient(max_retries=2, backoff=0.001)
+        with pytest.raises(RegistryHTTPError) as error:
+            client.get(f"{registry.url}/p0")
+        assert error.value.status == 503
+        assert registry.request_count == 3
+
+
+def test_client_errors_are_not_retried():
+    with MockRegistry(packuments()) as registry:
+        client = RegistryClient(max_retries=3, backoff=0.001)
+        with pytest.raises(RegistryHTTPError) as error:
+            client.get(f"{registry.url}/missing")
+        assert error.value.status == 404
+        assert registry.request_count == 1 and client.retries == 0
+
+
+def test_sequential_requests_reuse_one_connection():
+    with MockRegistry(packuments()) as registry:
+        client = RegistryClient()
+        for i in range(4):
+            client.get(f"{registry.url}/p{i}")
+        assert client.summary() == {
+            "requests": 4, "connections": 1, "reused": 3, "retries": 0, "bytes": registry.bytes_sent,
+        }
+        assert [t.reused for t in client.timings] == [False, True, True, True]
+
+
+def test_pool_is_bounded_under_concurrency():
+    with MockRegistry(packuments(16), latency=0.01) as registry:
+        client = RegistryClient(pool_size=2)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: client.get(f"{registry.url}/p{i}"), range(16)))
+        assert client.requests == 16
+        # Одновременно занято не больше соединений, чем потоков
+        assert client.connections_opened <= 8
+        assert len(client._pools[next(iter(client._pools))]) <= 2
+        client.close()
+        assert client._pools == {}
+
+
+def test_reconnects_after_server_closed_idle_connection():
+    with MockRegistry(packuments()) as registry:
+        # Без повторов: новое соединение должен открыть сам _send, а не цикл retry
+        client = RegistryClient(max_retries=0)
+        client.get(f"{registry.url}/p0")
+        # Сервер закрыл keep-alive соединение, пока оно простаивало в пуле
+        for idle in client._pools.values():
+            for connection in idle:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+        assert client.get(f"{registry.url}/p1").status == 200
+        assert client.connections_opened == 2
@@ -0,0 +1,43 @@
+import pytest
+
+from npm_parser import parse_test_repository
+from repository_format import RepositoryFormatError, load_repository
+
+REPOSITORY = """\
+# комментарий
+A: B, C
+B: C
+C:
+
+A: D
+D: B
+"""
+
+
+@pytest.fixture
+def repository(tmp_path):
+    path = tmp_path / "repo.txt"
+    path.write_text(REPOSITORY, encoding="utf-8")
+    return str(path)
+
+
+def test_repeated_package_line_wins(repository):
+    expected = {"A": {"D"}, "B": {"C"}, "C": set(), "D": {"B"}}
+    assert parse_test_repository(repository) == expected
+    assert load_repository(repository).get_all_dependencies() == expected
+
+
+def test_line_without_colon_is_an_error_with_its_number(tmp_path):
+    path = tmp_path / "repo.txt"
+    path.write_text("A: B\nB C\n", encoding="utf-8")
+    for load in (parse_test_repository, load_repository):
+        with pytest.raises(RepositoryFormatError) as error:
+            load(str(path))
+        assert error.value.line_number == 2
+
+
+def test_empty_package_name_is_an_error(tmp_path):
+    path = tmp_path / "repo.txt"
+    path.write_text(": B\n", encoding="utf-8")
+    with pytest.raises(RepositoryFormatError):
+        load_repository(str(path))
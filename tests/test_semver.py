@@ -0,0 +1,146 @@
+import json
+
+import pytest
+
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, make_packument, synthetic_packuments
+from packument_stream import stream_package
+from registry_client import RegistryClient
+from semver import VersionIndex, max_satisfying, satisfies
+
+# (версия, диапазон, ответ npm semver.satisfies) - случаи из документации node-semver
+SATISFIES = [
+    # caret
+    ("1.2.3", "^1.2.3", True),
+    ("1.9.9", "^1.2.3", True),
+    ("2.0.0", "^1.2.3", False),
+    ("1.2.2", "^1.2.3", False),
+    ("0.2.5", "^0.2.3", True),
+    ("0.3.0", "^0.2.3", False),
+    ("0.0.3", "^0.0.3", True),
+    ("0.0.4", "^0.0.3", False),
+    ("0.9.0", "^0.x", True),
+    ("1.0.0", "^0.x", False),
+    ("0.0.9", "^0.0", True),
+    ("0.1.0", "^0.0", False),
+    ("1.2.4-beta.2", "^1.2.3-beta.2", False),
+    ("1.2.3-beta.4", "^1.2.3-beta.2", True),
+    ("1.2.4-beta.2", "^1.2.3", False),
+    # tilde
+    ("1.2.9", "~1.2.3", True),
+    ("1.3.0", "~1.2.3", False),
+    ("1.9.0", "~1", True),
+    ("2.0.0", "~1", False),
+    ("0.2.9", "~0.2", True),
+    ("0.3.0", "~0.2", False),
+    ("1.2.5", "~>1.2.3", True),
+    # x-ranges и частичные версии
+    ("1.2.0", "1.2.x", True),
+    ("1.3.0", "1.2.x", False),
+    ("1.5.0", "1", True),
+    ("2.0.0", "1.x", False),
+    ("3.4.5", "*", True),
+    ("3.4.5", "", True),
+    ("1.0.0-rc.1", "*", False),
+    ("1.2.3", "=1.2.3", True),
+    ("1.2.3", "v1.2.3", True),
+    ("1.2.4", "1.2.3", False),
+    # сравнения, в том числе с частичными версиями
+    ("1.2.3", ">1.2.2", True),
+    ("1.2.2", ">1.2.2", False),
+    ("2.0.0", ">1", True),
+    ("1.9.9", ">1", False),
+    ("1.3.0", ">1.2", True),
+    ("1.2.9", ">1.2", False),
+    ("1.1.9", "<1.2", True),
+    ("1.2.0", "<1.2", False),
+    ("1.2.9", "<=1.2", True),
+    ("1.3.0", "<=1.2", False),
+    ("1.2.0", ">= 1.2.0 < 2", True),
+    ("2.0.0", ">=1.2.0 <2", False),
+    # дефисные диапазоны
+    ("2.3.4", "1.2.3 - 2.3.4", True),
+    ("2.3.5", "1.2.3 - 2.3.4", False),
+    ("2.3.9", "1.2.3 - 2.3", True),
+    ("2.4.0", "1.2.3 - 2.3", False),
+    ("2.9.9", "1.2 - 2", True),
+    ("1.1.9", "1.2 - 2", False),
+    # объединение
+    ("1.2.7", "1.2.7 || >=1.2.9 <2.0.0", True),
+    ("1.2.8", "1.2.7 || >=1.2.9 <2.0.0", False),
+    ("1.4.6", "1.2.7 || >=1.2.9 <2.0.0", True),
+    ("2.0.0", "1.2.7 || >=1.2.9 <2.0.0", False),
+    # prerelease подходит только к компаратору с тем же major.minor.patch
+    ("1.2.3-alpha.7", ">1.2.3-alpha.3", True),
+    ("1.2.3-alpha.2", ">1.2.3-alpha.3", False),
+    ("3.4.5-alpha.9", ">1.2.3-alpha.3", False),
+    ("3.4.5", ">1.2.3-alpha.3", True),
+    ("1.0.0-alpha.1", "1.0.0-alpha.1", True),
+    ("1.0.0-beta", ">=1.0.0-alpha <1.0.0", True),
+    ("1.0.0-alpha.beta", ">1.0.0-alpha.1", True),
+    ("1.0.0-alpha.10", ">1.0.0-alpha.9", True),
+    ("1.0.0", ">1.0.0-rc.1", True),
+    ("2.0.0-0", "<2.0.0", False),
+    # сборочные метаданные не влияют на сравнение
+    ("1.2.3+build.5", "1.2.3", True),
+    ("1.2.3+build.5", "^1.2.3", True),
+    # некорректная версия ничему не удовлетворяет
+    ("not-a-version", "*", False),
+    ("1.2", "1.2", False),
+]
+
+
+@pytest.mark.parametrize("version, spec, expected", SATISFIES)
+def test_satisfies_matches_npm(version, spec, expected):
+    assert satisfies(version, spec) is expected
+
+
+@pytest.mark.parametrize("spec", ["^1.x.bad", ">=a.b.c", "1.2.3.4"])
+def test_invalid_range_is_rejected(spec):
+    with pytest.raises(ValueError):
+        satisfies("1.2.3", spec)
+
+
+VERSIONS = ["0.9.0", "1.0.0", "1.2.0", "1.2.5", "1.3.0-beta.1", "1.3.0", "2.0.0-rc.1", "2.0.0", "2.1.0"]
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("^1.0.0", "1.3.0"),
+    ("~1.2.0", "1.2.5"),
+    ("<2", "1.3.0"),
+    (">=2.0.0-rc.1 <2.0.0", "2.0.0-rc.1"),
+    ("^3", None),
+    ("*", "2.1.0"),
+])
+def test_max_satisfying(spec, expected):
+    assert max_satisfying(VERSIONS, spec) == expected
+
+
+def test_resolve_prefers_dist_tag_and_latest():
+    index = VersionIndex(VERSIONS, {"latest": "1.2.5", "next": "2.0.0-rc.1"})
+    assert index.resolve("next") == "2.0.0-rc.1"
+    assert index.resolve("latest") == "1.2.5"
+    # latest удовлетворяет диапазону - npm берёт его, а не наибольшую подходящую версию
+    assert index.resolve("^1.0.0") == "1.2.5"
+    assert index.resolve("^2.0.0") == "2.1.0"
+    assert index.resolve("1.3.0") == "1.3.0"
+    assert index.resolve("^9") is None
+
+
+@pytest.mark.parametrize("spec", ["1.2.3", "=1.2.3", "v1.2.3", " =v1.2.3 "])
+def test_stream_package_resolves_exact_spec_spellings(spec):
+    packument = make_packument("a", {"c": "^2.0.0"}, "2.0.0", {"1.2.3": {"b": "^1.0.0"}})
+    resolution = stream_package([json.dumps(packument).encode()], [spec])
+    assert resolution.versions[spec] == "1.2.3"
+    assert resolution.dependencies["1.2.3"] == {"b": "^1.0.0"}
+
+
+@pytest.mark.parametrize("crawl", ["bfs_with_recursion", "bfs_concurrent"])
+def test_crawl_fetches_each_packument_once(crawl):
+    # Разные рёбра требуют разные версии одного пакета - все разрешаются из первого ответа
+    with MockRegistry(synthetic_packuments(15, fanout=3, seed=1, versions=4)) as registry:
+        graph = DependencyGraph(client=RegistryClient())
+        getattr(graph, crawl)("pkg0", 20, registry.url)
+        packages = {node.rsplit("@", 1)[0] for node in graph.graph}
+        packages.update(dep.rsplit("@", 1)[0] for deps in graph.graph.values() for dep in deps)
+        assert registry.request_count == len(packages)
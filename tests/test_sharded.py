@@ -0,0 +1,42 @@
+import pytest
+
+from dependency_filter import DependencyFilter
+from dependency_graph import DependencyGraph
+from mock_registry import MockRegistry, synthetic_packuments
+from registry_client import RegistryClient
+from sharded import ShardedDependencyGraph, shard_of
+
+
+@pytest.fixture(scope="module")
+def registry():
+    with MockRegistry(synthetic_packuments(60, fanout=4, seed=3, versions=3)) as server:
+        yield server
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("react", 4) == shard_of("react", 4)
+    assert {shard_of(f"pkg{i}", 3) for i in range(50)} == {0, 1, 2}
+    assert shard_of("anything", 1) == 0
+
+
+@pytest.mark.parametrize("filter_text, max_depth", [("", 20), ("!re:[05]$", 20), ("", 3)])
+def test_sharded_crawl_matches_serial(registry, filter_text, max_depth):
+    serial = DependencyGraph(client=RegistryClient(), dependency_filter=DependencyFilter.parse(filter_text))
+    expected = serial.bfs_concurrent("pkg0", max_depth, registry.url)
+
+    requests = registry.request_count
+    with ShardedDependencyGraph(2, concurrency=4, client=RegistryClient(),
+                                dependency_filter=DependencyFilter.parse(filter_text)) as sharded:
+        visited = sharded.bfs_concurrent("pkg0", max_depth, registry.url)
+    assert visited == expected
+    assert sharded.graph == serial.graph
+    assert sharded.filter.pruned_packages == serial.filter.pruned_packages
+
+    # Корень разрешает координатор, остальное - шарды; каждый пакет загружается один раз за обход
+    stats = sharded.shard_stats
+    packages = {node.rsplit("@", 1)[0] for node in sharded.graph} | sharded.filter.pruned_packages
+    packages.update(dep.rsplit("@", 1)[0] for deps in sharded.graph.values() for dep in deps)
+    fetched = sum(s["requests"] for s in stats) + sharded.client.requests
+    assert fetched == registry.request_count - requests
+    assert fetched == len(packages - sharded.filter.pruned_packages)
+    assert all(s["packages"] for s in stats)
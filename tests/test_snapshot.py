@@ -0,0 +1,70 @@
+import os
+import random
+
+import pytest
+
+from compact_graph import CompactDependencyGraph
+from conftest import random_graph
+from repository_format import is_snapshot, load_repository
+
+
+def compact(graph):
+    result = CompactDependencyGraph()
+    for package, dependencies in graph.items():
+        result.add_dependencies(package, sorted(dependencies))
+    return result
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_snapshot_round_trip(tmp_path, seed):
+    rng = random.Random(seed)
+    graph = random_graph(rng, rng.randint(1, 200), rng.randint(0, 600))
+    # Узел, который только упоминается как зависимость, и имя не из ASCII
+    graph["n000"].add("leaf-only")
+    graph["пакет@1.0.0"] = {"n000"}
+    path = str(tmp_path / "graph.dvs")
+    original = compact(graph)
+    original.save(path)
+
+    assert is_snapshot(path)
+    for loaded in (CompactDependencyGraph.load(path), load_repository(path)):
+        assert loaded.get_all_dependencies() == original.get_all_dependencies()
+        assert sorted(loaded.keys()) == sorted(graph)
+        assert "leaf-only" not in loaded
+        assert loaded.find_cycles() == original.find_cycles()
+        assert loaded.get_load_order() == original.get_load_order()
+
+
+def test_empty_snapshot(tmp_path):
+    path = str(tmp_path / "empty.dvs")
+    CompactDependencyGraph().save(path)
+    assert CompactDependencyGraph.load(path).get_all_dependencies() == {}
+
+
+def test_torn_snapshot_is_rejected(tmp_path):
+    path = str(tmp_path / "graph.dvs")
+    compact(random_graph(random.Random(7), 50, 150)).save(path)
+    size = os.path.getsize(path)
+    for cut in (size - 4, size // 2, 10):
+        torn = str(tmp_path / f"torn-{cut}.dvs")
+        with open(path, "rb") as src, open(torn, "wb") as dst:
+            dst.write(src.read(cut))
+        with pytest.raises(RuntimeError):
+            CompactDependencyGraph.load(torn)
+
+
+def test_bad_magic_is_rejected(tmp_path):
+    path = str(tmp_path / "graph.dvs")
+    compact({"a": {"b"}}).save(path)
+    with open(path, "r+b") as f:
+        f.write(b"NOTASNAP")
+    with pytest.raises(RuntimeError):
+        CompactDependencyGraph.load(path)
+
+
+def test_save_replaces_atomically(tmp_path):
+    path = str(tmp_path / "graph.dvs")
+    compact({"a": {"b"}}).save(path)
+    compact({"c": {"d"}}).save(path)
+    assert CompactDependencyGraph.load(path).get_all_dependencies() == {"c": {"d"}}
+    assert os.listdir(tmp_path) == ["graph.dvs"]